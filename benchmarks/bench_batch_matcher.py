@@ -0,0 +1,46 @@
+"""Throughput of BitsetMatcher batches against one SQL proposal query per pantry profile.
+
+    python benchmarks/bench_batch_matcher.py --catalogue 100000 --queries 2000
+"""
+import argparse
+import time
+from argparse import Namespace
+
+from synthetic import create_database, populate, random_queries
+from blog import OptionalArguments
+from batch_matcher import BitsetMatcher
+
+
+def run(catalogue, queries, sql_queries):
+    db = create_database()
+    populate(db, catalogue)
+    workload = random_queries(queries, seed=2)
+
+    start = time.perf_counter()
+    matcher = BitsetMatcher(db)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_results = matcher.match_many(workload)
+    batch_seconds = time.perf_counter() - start
+
+    # The SQL path is slow, so it runs on a prefix of the same workload.
+    start = time.perf_counter()
+    sql_results = [OptionalArguments(db, Namespace(ingredients=",".join(i), meals=",".join(m))).propose_recipes()
+                   for i, m in workload[:sql_queries]]
+    sql_seconds = time.perf_counter() - start
+
+    assert sql_results == batch_results[:sql_queries]
+    db.close()
+    print(f"{catalogue:>8} recipes | matrix build {build_seconds:6.2f}s | "
+          f"batch {queries / batch_seconds:9.1f} queries/s | sql {sql_queries / sql_seconds:7.1f} queries/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalogue", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--sql-queries", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.catalogue:
+        run(size, args.queries, args.sql_queries)
@@ -0,0 +1,76 @@
+"""Compares the memory of in-memory catalogue representations at about a million quantity rows.
+
+    python benchmarks/bench_catalogue_memory.py --recipes 167000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from synthetic import create_database, populate
+from catalogue import ColumnarCatalogue, RecipeRecord, ServeRecord, QuantityRecord
+
+
+class DictRow:
+    # What a plain class without __slots__ costs per row.
+    def __init__(self, *values):
+        self.values = values
+
+
+class DictQuantity:
+    def __init__(self, measure_id, ingredient_id, quantity, recipe_id):
+        self.measure_id = measure_id
+        self.ingredient_id = ingredient_id
+        self.quantity = quantity
+        self.recipe_id = recipe_id
+
+
+def fetchall_tuples(db):
+    return (db.conn.execute("SELECT recipe_id, recipe_name, recipe_description FROM recipes").fetchall(),
+            db.conn.execute("SELECT meal_id, recipe_id FROM serve").fetchall(),
+            db.conn.execute("SELECT measure_id, ingredient_id, quantity, recipe_id FROM quantity").fetchall())
+
+
+def dict_objects(db):
+    recipes, serves, quantities = fetchall_tuples(db)
+    return [DictRow(*x) for x in recipes], [DictRow(*x) for x in serves], [DictQuantity(*x) for x in quantities]
+
+
+def records(db):
+    recipes, serves, quantities = fetchall_tuples(db)
+    return ([RecipeRecord(*x) for x in recipes], [ServeRecord(*x) for x in serves],
+            [QuantityRecord(*x) for x in quantities])
+
+
+def columnar(db):
+    return ColumnarCatalogue.load(db)
+
+
+def measure(build, db):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(db)
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak, seconds
+
+
+def run(recipes):
+    db = create_database()
+    populate(db, recipes)
+    quantity_rows = db.conn.execute("SELECT COUNT(*) FROM quantity").fetchone()[0]
+    print(f"{recipes} recipes, {quantity_rows} quantity rows")
+    for build in (fetchall_tuples, dict_objects, records, columnar):
+        current, peak, seconds = measure(build, db)
+        print(f"{build.__name__:<16} {current / 2 ** 20:8.1f} MiB held | {peak / 2 ** 20:8.1f} MiB peak | "
+              f"{current / quantity_rows:6.1f} B/quantity row | {seconds:6.2f}s")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=167000, help="167000 recipes give about 1M quantity rows.")
+    run(parser.parse_args().recipes)
@@ -0,0 +1,49 @@
+"""Runs propose_recipes from N threads against one database through the ConnectionPool.
+
+    python benchmarks/bench_concurrency.py --catalogue 20000 --threads 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from argparse import Namespace
+
+from synthetic import populate, random_queries
+from blog import OptionalArguments
+from db_handler import ConnectionPool, Data
+
+
+def worker(pool, workload):
+    db = pool.reader()
+    for ingredients, meals in workload:
+        OptionalArguments(db, Namespace(ingredients=",".join(ingredients), meals=",".join(meals))).propose_recipes()
+
+
+def run(catalogue, thread_counts, queries, profile):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "concurrency.db"), profile)
+        with pool.writer() as db:
+            Data(db).migrate()
+            populate(db, catalogue)
+        workload = random_queries(queries)
+        for count in thread_counts:
+            threads = [threading.Thread(target=worker, args=(pool, workload[i::count])) for i in range(count)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = time.perf_counter() - start
+            print(f"{count:>3} threads | {queries / seconds:8.1f} queries/s")
+        pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalogue", type=int, default=20000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=80)
+    parser.add_argument("--profile", default="performance")
+    args = parser.parse_args()
+    run(args.catalogue, args.threads, args.queries, args.profile)
@@ -0,0 +1,61 @@
+"""Compares connection profiles on the interactive insert path and the proposal path.
+
+    python benchmarks/bench_connection_profile.py --recipes 500 --catalogue 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+from argparse import Namespace
+
+from synthetic import populate, random_queries
+from blog import RecipesDBStore, OptionalArguments, Recipe
+from db_handler import DBConnection, Data, PROFILES
+
+
+def open_database(db_name, profile):
+    db = DBConnection(db_name, profile)
+    db.turn_on_foreign_keys()
+    Data(db).migrate()
+    return db
+
+
+def bench_inserts(db, recipes):
+    # Same statement sequence as the interactive loop: every row is its own commit.
+    recipes_db_store = RecipesDBStore(db)
+    start = time.perf_counter()
+    for i in range(recipes):
+        recipe_id = recipes_db_store.create_recipe(Recipe(f"recipe {i}", "Benchmark recipe."))
+        recipes_db_store.create_serve([1, 3], recipe_id)
+        for ingredient_id in (1, 2, 6):
+            recipes_db_store.create_quantity(1, ingredient_id, 10, recipe_id)
+    return time.perf_counter() - start
+
+
+def bench_proposals(db, queries):
+    workload = random_queries(queries)
+    start = time.perf_counter()
+    for ingredients, meals in workload:
+        OptionalArguments(db, Namespace(ingredients=",".join(ingredients), meals=",".join(meals))).propose_recipes()
+    return time.perf_counter() - start
+
+
+def run(recipes, catalogue, queries):
+    for profile in sorted(PROFILES):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = open_database(os.path.join(tmp, "profile.db"), profile)
+            insert_seconds = bench_inserts(db, recipes)
+            populate(db, catalogue)
+            proposal_seconds = bench_proposals(db, queries)
+            db.close()
+        print(f"{profile:<12} inserts {recipes / insert_seconds:9.0f} recipes/s | "
+              f"proposals {proposal_seconds / queries * 1000:8.3f} ms/query")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=500, help="Recipes inserted row by row.")
+    parser.add_argument("--catalogue", type=int, default=20000, help="Synthetic recipes queried by proposals.")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    run(args.recipes, args.catalogue, args.queries)
@@ -0,0 +1,45 @@
+"""Compares the SQL proposal query with the in-memory IngredientIndex.
+
+    python benchmarks/bench_ingredient_index.py --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+from argparse import Namespace
+
+from synthetic import create_database, populate, random_queries
+from blog import OptionalArguments
+from ingredient_index import IngredientIndex
+
+
+def run(size, queries):
+    db = create_database()
+    populate(db, size)
+
+    start = time.perf_counter()
+    index = IngredientIndex(db)
+    build_seconds = time.perf_counter() - start
+
+    workload = random_queries(queries)
+    start = time.perf_counter()
+    sql_results = [OptionalArguments(db, Namespace(ingredients=",".join(i), meals=",".join(m))).propose_recipes()
+                   for i, m in workload]
+    sql_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_results = [index.propose_recipes(i, m) for i, m in workload]
+    index_seconds = time.perf_counter() - start
+
+    assert sql_results == index_results
+    db.close()
+    print(f"{size:>9} recipes | index build {build_seconds:7.2f}s | "
+          f"sql {sql_seconds / queries * 1000:9.3f} ms/query | index {index_seconds / queries * 1000:9.3f} ms/query | "
+          f"speedup {sql_seconds / index_seconds:7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries)
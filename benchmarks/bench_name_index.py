@@ -0,0 +1,49 @@
+"""Compares linear scans with PrefixTrie/SubstringIndex for measure and ingredient disambiguation.
+
+    python benchmarks/bench_name_index.py --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+from synthetic import random_words
+from name_index import PrefixTrie, SubstringIndex
+
+
+def timed(lookup, fragments):
+    start = time.perf_counter()
+    for fragment in fragments:
+        lookup(fragment)
+    return (time.perf_counter() - start) / len(fragments) * 1e6
+
+
+def run(size, lookups):
+    names = random_words(size)
+    rng = random.Random(1)
+    # Fragments of real names, as a user would type them: mostly conclusive, some ambiguous.
+    fragments = []
+    for name in rng.sample(names, min(lookups, len(names))):
+        start = rng.randint(0, len(name) - 3)
+        fragments.append(name[start:start + rng.randint(3, 6)])
+    prefixes = [name[:rng.randint(2, 6)] for name in rng.sample(names, min(lookups, len(names)))]
+
+    start = time.perf_counter()
+    trie = PrefixTrie(names)
+    index = SubstringIndex(names)
+    build_seconds = time.perf_counter() - start
+
+    scan_prefix = timed(lambda p: [x for x in names if x.startswith(p)], prefixes)
+    trie_prefix = timed(lambda p: trie.starting_with(p, limit=2), prefixes)
+    scan_substring = timed(lambda f: [x for x in names if f in x], fragments)
+    index_substring = timed(lambda f: index.containing(f, limit=2), fragments)
+    print(f"{size:>7} names | build {build_seconds:6.2f}s | prefix scan {scan_prefix:9.1f} us, trie {trie_prefix:6.1f} us"
+          f" | substring scan {scan_substring:9.1f} us, n-gram index {index_substring:6.1f} us")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.lookups)
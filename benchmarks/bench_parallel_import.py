@@ -0,0 +1,36 @@
+"""Scaling of ParallelRecipeImporter across worker counts, against the single-process importer.
+
+    python benchmarks/bench_parallel_import.py --recipes 50000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+
+from synthetic import create_database, write_import_file
+from bulk_import import RecipeImporter, ParallelRecipeImporter
+
+
+def run(recipes, worker_counts, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = os.path.join(tmp, "feed.jsonl")
+        write_import_file(feed, recipes)
+        for workers in [None] + worker_counts:
+            db = create_database(os.path.join(tmp, f"import_{workers}.db"))
+            if workers is None:
+                stats = RecipeImporter(db, batch_size).import_file(feed)
+                label = "serial"
+            else:
+                stats = ParallelRecipeImporter(db, batch_size, workers).import_file(feed)
+                label = f"{workers} workers"
+            db.close()
+            stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stats.stages.items())
+            print(f"{label:>10} | {stats.rows_per_second:9.0f} rows/s | {stats.seconds:6.2f}s total | {stages}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=list(range(1, (os.cpu_count() or 1) + 1)))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.recipes, args.workers, args.batch_size)
@@ -0,0 +1,82 @@
+"""Compares FTS5 keyword search with a LIKE '%word%' scan over recipe names and descriptions.
+
+    python benchmarks/bench_search.py --recipes 1000000
+"""
+import argparse
+import itertools
+import random
+import time
+
+from synthetic import create_database, random_words
+from recipe_search import RecipeSearch
+
+
+def fill(db, recipes, vocabulary, seed=0, batch=10000):
+    rng = random.Random(seed)
+    # Zipf-like word frequencies, as in real text: a few words are everywhere, most are rare.
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    c = db.conn.cursor()
+    for start in range(1, recipes + 1, batch):
+        recipe_rows, serve_rows = [], []
+        for recipe_id in range(start, min(start + batch, recipes + 1)):
+            name = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(2, 3)))
+            description = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(6, 12)))
+            recipe_rows.append((recipe_id, name, description))
+            serve_rows.append((rng.randint(1, 4), recipe_id))
+        c.executemany("INSERT INTO recipes(recipe_id, recipe_name, recipe_description) VALUES (?,?,?)", recipe_rows)
+        c.executemany("INSERT INTO serve(meal_id, recipe_id) VALUES (?,?)", serve_rows)
+    db.conn.commit()
+
+
+def like_search(db, text, meals, limit):
+    conditions = []
+    params = []
+    for word in text.split():
+        conditions.append("(recipe_name LIKE ? OR recipe_description LIKE ?)")
+        params.extend([f"%{word}%", f"%{word}%"])
+    meal_filter = ""
+    if meals:
+        meal_filter = f"""AND recipe_id IN (SELECT s.recipe_id FROM serve s JOIN meals m ON m.meal_id = s.meal_id
+                          WHERE meal_name IN ({', '.join("?" for _ in meals)}))"""
+        params.extend(meals)
+    return db.conn.execute(f"""SELECT recipe_id, recipe_name FROM recipes
+                           WHERE {' AND '.join(conditions)} {meal_filter}
+                           LIMIT ?""", params + [limit]).fetchall()
+
+
+def timed(function, queries):
+    latencies = []
+    for text, meals in queries:
+        start = time.perf_counter()
+        function(text, meals)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+
+
+def run(recipes, queries, limit):
+    db = create_database()
+    vocabulary = random_words(5000)
+    start = time.perf_counter()
+    fill(db, recipes, vocabulary)
+    print(f"{recipes} recipes inserted and indexed in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    # Words from the whole frequency range, alone or in pairs, with and without a meal filter.
+    workload = [(" ".join(rng.sample(vocabulary[:1000], rng.randint(1, 2))),
+                 rng.choice([None, ["breakfast"], ["lunch", "supper"]])) for _ in range(queries)]
+    search = RecipeSearch(db)
+    for label, function in (("fts5 + bm25", lambda text, meals: search.search(text, meals, limit)),
+                            ("like scan", lambda text, meals: like_search(db, text, meals, limit))):
+        p50, p99 = timed(function, workload)
+        print(f"{label:<12} p50 {p50 * 1000:9.3f} ms | p99 {p99 * 1000:9.3f} ms")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    run(args.recipes, args.queries, args.limit)
@@ -0,0 +1,60 @@
+"""Compares one database file with a sharded catalogue: batched insert throughput and proposal latency.
+
+    python benchmarks/bench_sharding.py --recipes 200000 --shards 1 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from synthetic import create_database, catalogue_batches, random_queries
+from sharding import ShardedCatalogue
+
+
+def build(directory, recipes, shard_count):
+    # The batches are generated once against a plain file, which also holds the ingredient dictionary to replicate.
+    source = create_database(os.path.join(directory, f"source-{shard_count}.db"))
+    batches = list(catalogue_batches(source, recipes))
+    ingredients = source.conn.execute("SELECT ingredient_id, ingredient_name FROM ingredients").fetchall()
+    source.close()
+    catalogue = ShardedCatalogue.create(os.path.join(directory, f"catalogue-{shard_count}.json"), shard_count)
+    for db in catalogue.shards:
+        db.conn.executemany("INSERT OR IGNORE INTO ingredients(ingredient_id, ingredient_name) VALUES (?,?)",
+                            ingredients)
+        db.conn.commit()
+    start = time.perf_counter()
+    for recipe_rows, serve_rows, quantity_rows in batches:
+        catalogue.write_recipes(recipe_rows, serve_rows, quantity_rows)
+    rows = sum(len(r) + len(s) + len(q) for r, s, q in batches)
+    return catalogue, rows / (time.perf_counter() - start)
+
+
+def latencies(catalogue, queries, limit):
+    timings = []
+    for ingredients, meals in queries:
+        start = time.perf_counter()
+        catalogue.propose_recipes(ingredients, list(meals), limit)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[min(len(timings) - 1, int(0.99 * len(timings)))]
+
+
+def run(recipes, shard_counts, queries, limit):
+    workload = random_queries(queries)
+    with tempfile.TemporaryDirectory() as directory:
+        for shard_count in shard_counts:
+            catalogue, rows_per_second = build(directory, recipes, shard_count)
+            p50, p99 = latencies(catalogue, workload, limit)
+            print(f"{shard_count:>2} shards | insert {rows_per_second:10.0f} rows/s | "
+                  f"propose p50 {p50 * 1000:8.3f} ms | p99 {p99 * 1000:8.3f} ms")
+            catalogue.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=200000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, help="Page size; all matches by default.")
+    args = parser.parse_args()
+    run(args.recipes, args.shards, args.queries, args.limit)
@@ -0,0 +1,50 @@
+"""Measures the cost of opening an existing database before the first query.
+
+    python benchmarks/bench_startup.py --runs 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import synthetic  # noqa: F401  (puts food_blog on sys.path)
+from db_handler import DBConnection, Data
+
+
+def legacy_schema(data):
+    data.create_tables()
+    data.seed_tables()
+
+
+def versioned_schema(data):
+    data.migrate()
+
+
+def startup(db_name, schema_step, statements=None):
+    db = DBConnection(db_name)
+    if statements is not None:
+        db.conn.set_trace_callback(statements.append)
+    db.turn_on_foreign_keys()
+    schema_step(Data(db))
+    db.close()
+
+
+def run(runs):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "startup.db")
+        startup(db_name, versioned_schema)
+        for schema_step in (legacy_schema, versioned_schema):
+            start = time.perf_counter()
+            for _ in range(runs):
+                startup(db_name, schema_step)
+            seconds = time.perf_counter() - start
+            statements = []
+            startup(db_name, schema_step, statements)
+            print(f"{schema_step.__name__:<16} {seconds / runs * 1000:8.3f} ms/startup | "
+                  f"{len(statements):2} statements")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    run(parser.parse_args().runs)
@@ -0,0 +1,220 @@
+"""Runs the benchmark suite on a synthetic catalogue and compares the results with a stored baseline.
+
+    python benchmarks/run.py                          # compare with benchmarks/baseline.json
+    python benchmarks/run.py --output results.json    # also keep the results
+    python benchmarks/run.py --save-baseline          # make this run the new baseline
+    python benchmarks/run.py --fail-on-regression     # exit 1 if a metric got worse than --tolerance
+
+Each metric records whether higher or lower is better; a change beyond the tolerance in the
+wrong direction is reported as a regression. Baselines are only comparable on the same
+machine and with the same scale settings.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import Namespace
+
+from synthetic import create_database, populate, catalogue_batches, random_queries
+from db_handler import DBConnection, Data
+from blog import RecipesDBStore, OptionalArguments, Recipe, RecipeUnitOfWork
+from ingredient_index import IngredientIndex
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def bench_insert_batched(tmp, config, metrics):
+    db = create_database(os.path.join(tmp, "batched.db"))
+    recipes_db_store = RecipesDBStore(db)
+    batches = list(catalogue_batches(db, config["recipes"], batch=1000, seed=config["seed"]))
+    start = time.perf_counter()
+    for recipe_rows, serve_rows, quantity_rows in batches:
+        recipes_db_store.create_recipes(recipe_rows)
+        recipes_db_store.create_serves(serve_rows)
+        recipes_db_store.create_quantities(quantity_rows)
+        db.conn.commit()
+    seconds = time.perf_counter() - start
+    db.close()
+    metrics["insert_batched"] = metric(config["recipes"] / seconds, "recipes/s", "higher")
+
+
+def bench_insert_single(tmp, config, metrics):
+    # The interactive path: one recipe, its serve rows and each quantity row committed separately.
+    db = create_database(os.path.join(tmp, "single.db"))
+    recipes_db_store = RecipesDBStore(db)
+    batches = list(catalogue_batches(db, config["single_recipes"], seed=config["seed"]))
+    start = time.perf_counter()
+    for recipe_rows, serve_rows, quantity_rows in batches:
+        for recipe_id, name, description in recipe_rows:
+            new_id = recipes_db_store.create_recipe(Recipe(name, description))
+            recipes_db_store.create_serve([x[0] for x in serve_rows if x[1] == recipe_id], new_id)
+            for measure_id, ingredient_id, quantity, _ in (x for x in quantity_rows if x[3] == recipe_id):
+                recipes_db_store.create_quantity(measure_id, ingredient_id, quantity, new_id)
+    seconds = time.perf_counter() - start
+    db.close()
+    metrics["insert_single"] = metric(config["single_recipes"] / seconds, "recipes/s", "higher")
+
+
+def bench_insert_unit_of_work(tmp, config, metrics):
+    # The interactive path since RecipeUnitOfWork: one transaction per recipe.
+    db = create_database(os.path.join(tmp, "unit_of_work.db"))
+    batches = list(catalogue_batches(db, config["single_recipes"], seed=config["seed"]))
+    start = time.perf_counter()
+    for recipe_rows, serve_rows, quantity_rows in batches:
+        for recipe_id, name, description in recipe_rows:
+            with RecipeUnitOfWork(db) as unit_of_work:
+                unit_of_work.add_recipe(Recipe(name, description))
+                unit_of_work.add_serve([x[0] for x in serve_rows if x[1] == recipe_id])
+                for measure_id, ingredient_id, quantity, _ in (x for x in quantity_rows if x[3] == recipe_id):
+                    unit_of_work.add_quantity(measure_id, ingredient_id, quantity)
+    seconds = time.perf_counter() - start
+    db.close()
+    metrics["insert_unit_of_work"] = metric(config["single_recipes"] / seconds, "recipes/s", "higher")
+
+
+def bench_proposals(catalogue, config, metrics):
+    db = DBConnection(catalogue)
+    latencies = []
+    for ingredients, meals in random_queries(config["queries"], seed=config["seed"] + 1):
+        args = Namespace(ingredients=",".join(ingredients), meals=",".join(meals))
+        start = time.perf_counter()
+        OptionalArguments(db, args).propose_recipes()
+        latencies.append(time.perf_counter() - start)
+    db.close()
+    latencies.sort()
+    metrics["proposal_p50"] = metric(percentile(latencies, 0.50) * 1000, "ms", "lower")
+    metrics["proposal_p99"] = metric(percentile(latencies, 0.99) * 1000, "ms", "lower")
+
+
+def bench_startup(catalogue, config, metrics):
+    timings = []
+    for _ in range(config["startup_runs"]):
+        start = time.perf_counter()
+        db = DBConnection(catalogue)
+        db.turn_on_foreign_keys()
+        Data(db).migrate()
+        timings.append(time.perf_counter() - start)
+        db.close()
+    metrics["startup"] = metric(statistics.median(timings) * 1000, "ms", "lower")
+
+
+def bench_memory(catalogue, config, metrics):
+    db = DBConnection(catalogue)
+    tracemalloc.start()
+    index = IngredientIndex(db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del index
+    db.close()
+    metrics["index_memory"] = metric(peak / 2 ** 20, "MiB", "lower")
+    try:
+        import resource
+    except ImportError:
+        return
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    metrics["max_rss"] = metric(max_rss / 2 ** 20, "MiB", "lower")
+
+
+def metric(value, unit, better):
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(config):
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_insert_batched(tmp, config, metrics)
+        bench_insert_single(tmp, config, metrics)
+        bench_insert_unit_of_work(tmp, config, metrics)
+        catalogue = os.path.join(tmp, "catalogue.db")
+        db = create_database(catalogue)
+        populate(db, config["recipes"], seed=config["seed"])
+        db.close()
+        bench_proposals(catalogue, config, metrics)
+        bench_startup(catalogue, config, metrics)
+        bench_memory(catalogue, config, metrics)
+    return {"config": config, "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(), "metrics": metrics}
+
+
+def compare(results, baseline, tolerance):
+    """Prints a table of changes against the baseline and returns the names of regressed metrics."""
+    if baseline["config"] != results["config"]:
+        print(f"Baseline was recorded with {baseline['config']}; not comparing.")
+        return []
+    regressions = []
+    print(f"{'metric':<20} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or previous["value"] == 0:
+            print(f"{name:<20} {'-':>12} {current['value']:>12.3f} {'new':>8}  {current['unit']}")
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        worse = change < -tolerance if current["better"] == "higher" else change > tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<20} {previous['value']:>12.3f} {current['value']:>12.3f} {change:>+8.1%}  "
+              f"{current['unit']}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=20000, help="Catalogue size for inserts and queries.")
+    parser.add_argument("--single-recipes", type=int, default=300, help="Recipes inserted one commit at a time.")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--startup-runs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON here.")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Relative change in the wrong direction that counts as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    config = {"recipes": args.recipes, "single_recipes": args.single_recipes, "queries": args.queries,
+              "startup_runs": args.startup_runs, "seed": args.seed}
+    results = run(config)
+    if args.output is not None:
+        write_json(args.output, results)
+
+    regressions = []
+    if args.save_baseline:
+        print_results(results)
+        write_json(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}.")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    else:
+        print_results(results)
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+def print_results(results):
+    for name, current in results["metrics"].items():
+        print(f"{name:<20} {current['value']:>12.3f}  {current['unit']}")
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, indent=2) + "\n")
+
+
+if __name__ == '__main__':
+    main()
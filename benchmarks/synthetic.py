@@ -0,0 +1,93 @@
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "food_blog"))
+
+from db_handler import DBConnection, Data  # noqa: E402
+
+MEALS = ("breakfast", "brunch", "lunch", "supper")
+
+
+def create_database(db_name=":memory:"):
+    db = DBConnection(db_name)
+    Data(db).migrate()
+    return db
+
+
+def populate(db: DBConnection, recipes, ingredients=1000, ingredients_per_recipe=(3, 10), seed=0):
+    """Fills a seeded database with a deterministic synthetic catalogue.
+
+    Ingredient popularity follows a 1/rank curve, so a few ingredients appear in many recipes.
+    """
+    c = db.conn.cursor()
+    for recipe_rows, serve_rows, quantity_rows in catalogue_batches(db, recipes, ingredients,
+                                                                    ingredients_per_recipe, seed):
+        c.executemany("INSERT INTO recipes(recipe_id, recipe_name, recipe_description) VALUES (?,?,?)", recipe_rows)
+        c.executemany("INSERT INTO serve(meal_id, recipe_id) VALUES (?,?)", serve_rows)
+        c.executemany("INSERT INTO quantity(measure_id, ingredient_id, quantity, recipe_id) VALUES (?,?,?,?)",
+                      quantity_rows)
+    db.conn.commit()
+
+
+def catalogue_batches(db: DBConnection, recipes, ingredients=1000, ingredients_per_recipe=(3, 10), seed=0,
+                      batch=10000):
+    """Adds the synthetic ingredients, then yields (recipe_rows, serve_rows, quantity_rows) batches
+    continuing after the highest recipe_id; rows have the shapes RecipesDBStore's batch methods take."""
+    rng = random.Random(seed)
+    c = db.conn.cursor()
+    c.executemany("INSERT OR IGNORE INTO ingredients(ingredient_name) VALUES (?)",
+                  [(ingredient_name(i),) for i in range(ingredients)])
+    db.conn.commit()
+    ingredient_ids = [x[0] for x in c.execute("SELECT ingredient_id FROM ingredients ORDER BY ingredient_id")]
+    measure_ids = [x[0] for x in c.execute("SELECT measure_id FROM measures")]
+    weights = [1 / (rank + 1) for rank in range(len(ingredient_ids))]
+    first_id = c.execute("SELECT COALESCE(MAX(recipe_id), 0) + 1 FROM recipes").fetchone()[0]
+
+    for start in range(first_id, first_id + recipes, batch):
+        recipe_rows, serve_rows, quantity_rows = [], [], []
+        for recipe_id in range(start, min(start + batch, first_id + recipes)):
+            recipe_rows.append((recipe_id, f"recipe {recipe_id}", f"Synthetic recipe number {recipe_id}."))
+            for meal_id in rng.sample(range(1, len(MEALS) + 1), rng.randint(1, 2)):
+                serve_rows.append((meal_id, recipe_id))
+            chosen = set(rng.choices(ingredient_ids, weights, k=rng.randint(*ingredients_per_recipe)))
+            for ingredient_id in chosen:
+                quantity_rows.append((rng.choice(measure_ids), ingredient_id, rng.randint(1, 500), recipe_id))
+        yield recipe_rows, serve_rows, quantity_rows
+
+
+def ingredient_name(i):
+    return f"ingredient{i}"
+
+
+def random_queries(count, ingredients=1000, seed=1):
+    """Returns (ingredient names, meal names) pairs biased towards popular ingredients."""
+    rng = random.Random(seed)
+    names = [ingredient_name(i) for i in range(min(ingredients, 50))]
+    return [(rng.sample(names, rng.randint(1, 3)), rng.sample(MEALS, rng.randint(1, 2))) for _ in range(count)]
+
+
+def random_words(count, seed=0, alphabet="abcdefghijklmnopqrstuvwxyz", length=(5, 14)):
+    """Returns count distinct pseudo-words, e.g. for large ingredient dictionaries."""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(alphabet) for _ in range(rng.randint(*length))))
+    return sorted(words)
+
+
+def write_import_file(path, recipes, ingredients=1000, seed=0):
+    """Writes a JSONL feed in the --import format with deterministic content."""
+    rng = random.Random(seed)
+    measures = ("ml", "g", "l", "cup", "tbsp", "tsp", "dsp", "")
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(recipes):
+            lines = []
+            for ingredient in rng.sample(range(ingredients), rng.randint(3, 10)):
+                measure = rng.choice(measures)
+                lines.append(f"{rng.randint(1, 500)} {measure} {ingredient_name(ingredient)}" if measure
+                             else f"{rng.randint(1, 500)} {ingredient_name(ingredient)}")
+            record = {"name": f"recipe {i}", "description": f"Synthetic recipe number {i}.",
+                      "meals": rng.sample(MEALS, rng.randint(1, 2)), "ingredients": lines}
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,118 @@
+import asyncio
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from blog import Recipe, RecipesDBStore, OptionalArguments
+from db_handler import ConnectionPool
+
+
+class AsyncRecipeStore:
+    """asyncio facade over the blocking store and proposal query.
+
+    Writes wait in a bounded queue; awaiting create_recipe() blocks once max_pending writes
+    are queued, which pushes back on producers when the writer falls behind. A single
+    writer thread drains the queue and commits everything waiting, up to max_batch
+    recipes, in one shared transaction. Proposals run on a separate reader pool.
+
+        async with AsyncRecipeStore(ConnectionPool("food_blog.db")) as store:
+            recipe_id = await store.create_recipe(Recipe("tea", "Brew."), [1], [(1, 1, 250)])
+            names = await store.propose(["milk"], ["breakfast"])
+    """
+
+    def __init__(self, pool: ConnectionPool, max_pending=1000, max_batch=500, read_workers=4):
+        self.pool = pool
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self._writer_executor = ThreadPoolExecutor(max_workers=1)
+        self._reader_executor = ThreadPoolExecutor(max_workers=read_workers)
+        self._queue = None
+        self._writer_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        # The queue belongs to the running event loop, so it is created here rather than in __init__.
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._writer_task = asyncio.ensure_future(self._drain())
+
+    async def close(self):
+        await self._queue.join()
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+        self._writer_executor.shutdown()
+        self._reader_executor.shutdown()
+
+    async def create_recipe(self, recipe: Recipe, meal_numbers: List, quantities: List = ()):
+        """Queues a recipe with its meals and (measure_id, ingredient_id, quantity) rows; returns its recipe_id."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((recipe, list(meal_numbers), list(quantities), future))
+        return await future
+
+    async def propose(self, ingredients: List, meals: List):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._reader_executor, self._propose, ingredients, meals)
+
+    def _propose(self, ingredients, meals):
+        args = Namespace(ingredients=",".join(ingredients), meals=",".join(meals))
+        return OptionalArguments(self.pool.reader(), args).propose_recipes()
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self._writer_executor, self._write_coalesced, batch)
+                for item, result in zip(batch, results):
+                    future = item[3]
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_coalesced(self, batch):
+        try:
+            return self._write(batch)
+        except Exception:
+            # One bad recipe must not fail its neighbours, so retry them one transaction each.
+            results = []
+            for item in batch:
+                try:
+                    results.extend(self._write([item]))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    def _write(self, batch):
+        with self.pool.writer() as db:
+            recipes_db_store = RecipesDBStore(db)
+            recipe_id = recipes_db_store.next_recipe_id()
+            recipe_ids = []
+            recipe_rows = []
+            serve_rows = []
+            quantity_rows = []
+            for recipe, meal_numbers, quantities, _ in batch:
+                recipe_rows.append((recipe_id, recipe.name, recipe.instruction))
+                serve_rows.extend((meal_id, recipe_id) for meal_id in meal_numbers)
+                quantity_rows.extend((measure_id, ingredient_id, quantity, recipe_id)
+                                     for measure_id, ingredient_id, quantity in quantities)
+                recipe_ids.append(recipe_id)
+                recipe_id += 1
+            recipes_db_store.create_recipes(recipe_rows)
+            recipes_db_store.create_serves(serve_rows)
+            recipes_db_store.create_quantities(quantity_rows)
+        return recipe_ids
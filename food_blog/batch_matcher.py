@@ -0,0 +1,109 @@
+import json
+from typing import List
+from db_handler import DBConnection
+from catalogue import ColumnarCatalogue
+from lookup_cache import LookupCache
+from custom_errors import ServerRequestError
+
+# Set bit positions of every byte value, used to decode bitsets a byte at a time.
+_BYTE_BITS = [[bit for bit in range(8) if value >> bit & 1] for value in range(256)]
+
+
+class BitsetMatcher:
+    """Recipe x ingredient boolean matrix stored as one packed bitset per ingredient and per meal.
+
+    Bit n of a bitset stands for the n-th recipe of the ColumnarCatalogue, i.e. in recipe_id
+    order. A query ANDs the bitsets of its ingredients and ORs those of its meals, so each
+    step touches every recipe at once, one machine word at a time.
+    """
+
+    def __init__(self, db: DBConnection, catalogue: ColumnarCatalogue = None):
+        self.db = db
+        self.lookup_cache = LookupCache.for_connection(db)
+        self.lookup_cache.refresh()
+        self.ingredient_ids = dict(db.conn.execute("SELECT ingredient_name, ingredient_id FROM ingredients"))
+        self.meal_ids = dict(db.conn.execute("SELECT meal_name, meal_id FROM meals"))
+        if catalogue is None:
+            catalogue = ColumnarCatalogue.load(db)
+        self.recipe_names = catalogue.recipe_names
+        positions = {recipe_id: n for n, recipe_id in enumerate(catalogue.recipe_ids)}
+        self.ingredient_bits = self._bitsets(
+            positions, zip(catalogue.quantity_ingredient_ids, catalogue.quantity_recipe_ids))
+        self.meal_bits = self._bitsets(positions, zip(catalogue.serve_meal_ids, catalogue.serve_recipe_ids))
+
+    @staticmethod
+    def _bitsets(positions, pairs):
+        grouped = {}
+        for key, recipe_id in pairs:
+            grouped.setdefault(key, []).append(positions[recipe_id])
+        size = (len(positions) + 7) // 8
+        bitsets = {}
+        for key, recipe_positions in grouped.items():
+            packed = bytearray(size)
+            for position in recipe_positions:
+                packed[position >> 3] |= 1 << (position & 7)
+            bitsets[key] = int.from_bytes(packed, "little")
+        return bitsets
+
+    def match(self, ingredients: List, meals: List):
+        bits = self._matching_bits(self.resolved(ingredients), meals)
+        return [self.recipe_names[x] for x in self._positions(bits)]
+
+    def match_many(self, queries):
+        """Answers (ingredients, meals) pairs in order, computing each distinct query once."""
+        answers = {}
+        results = []
+        for ingredients, meals in queries:
+            # Keyed on resolved names, so "Milk" and "milks" share one answer.
+            key = (frozenset(self.resolved(ingredients)), frozenset(meals))
+            if key not in answers:
+                answers[key] = self.match(ingredients, meals)
+            results.append(answers[key])
+        return results
+
+    def resolved(self, ingredients: List):
+        """Ingredient names as stored, via normalized spellings and aliases; unknown names are kept."""
+        return [self.lookup_cache.resolve_ingredient(x) or x for x in ingredients]
+
+    def match_file(self, in_path, out_path):
+        """Reads JSONL queries like {"id": 7, "ingredients": "milk,sugar", "meals": "breakfast"} and
+        writes one {"id": 7, "recipes": [...]} line per query, in input order."""
+        with open(in_path, encoding="utf-8") as f:
+            requests = [self._parse(line) for line in f if line.strip() != ""]
+        results = self.match_many((x[1], x[2]) for x in requests)
+        with open(out_path, "w", encoding="utf-8") as f:
+            for (request_id, _, _), recipes in zip(requests, results):
+                answer = {"recipes": recipes} if request_id is None else {"id": request_id, "recipes": recipes}
+                f.write(json.dumps(answer) + "\n")
+        return len(requests)
+
+    def _matching_bits(self, ingredients, meals):
+        ingredient_sets = [self.ingredient_bits.get(self.ingredient_ids.get(x), 0) for x in set(ingredients)]
+        if not ingredient_sets:
+            return 0
+        bits = ingredient_sets[0]
+        for ingredient_set in ingredient_sets[1:]:
+            bits &= ingredient_set
+        meal_bits = 0
+        for meal in set(meals):
+            meal_bits |= self.meal_bits.get(self.meal_ids.get(meal), 0)
+        return bits & meal_bits
+
+    @staticmethod
+    def _positions(bits):
+        packed = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        return [index * 8 + bit for index, value in enumerate(packed) if value for bit in _BYTE_BITS[value]]
+
+    @staticmethod
+    def _parse(line):
+        try:
+            request = json.loads(line)
+            ingredients = request["ingredients"]
+            meals = request["meals"]
+        except (ValueError, KeyError, TypeError):
+            raise ServerRequestError
+        if isinstance(ingredients, str):
+            ingredients = ingredients.split(",")
+        if isinstance(meals, str):
+            meals = meals.split(",")
+        return request.get("id"), list(ingredients), list(meals)
@@ -2,8 +2,12 @@ import sqlite3
 from typing import List
 import re
 from db_handler import DBConnection
+from lookup_cache import LookupCache
+from proposal_cache import ProposalCache, bump_generation
+from instrumentation import instrumented, instrumented_stream
+from recipe_signatures import RecipeSignatures
 from custom_errors import MealNumberError, QuantityError, MeasureError, IngredientError, UserIngredientError, \
-    UserMealError, NoIngredientsError, NoMealsError
+    UserMealError, NoIngredientsError, NoMealsError, PaginationError, UnknownMealError
 
 
 class UserInputCollector:
@@ -43,6 +47,10 @@ class UserInputCollector:
         recipe_info = input("Input quantity of ingredient <press enter to stop>:")
         if recipe_info == "":
             return False
+        return UserInputCollector.parse_recipe_info(recipe_info)
+
+    @staticmethod
+    def parse_recipe_info(recipe_info):
         quantity = recipe_info.split(" ")[0]
         if len(recipe_info.split(" ")) < 3:
             measure = ""
@@ -55,14 +63,23 @@ class UserInputCollector:
 
 class UserInputChecker:
 
-    def __init__(self, db: DBConnection, recipe_id):
+    def __init__(self, db: DBConnection, recipe_id, unit_of_work=None):
         self.db = db
         self.recipes_db_store = RecipesDBStore(self.db)
         self.quantity_table_data = QuantityTableData(self.db)
         self.recipe_id = recipe_id
+        # With a unit of work, quantities are buffered there instead of committed one by one.
+        self.unit_of_work = unit_of_work
+        self.lookup_cache = LookupCache.for_connection(self.db)
+        self.lookup_cache.refresh()
 
-        self.all_measures = self._get_all_measures()
-        self.all_ingredients = self._get_all_ingredients()
+    @property
+    def all_measures(self):
+        return self._get_all_measures()
+
+    @property
+    def all_ingredients(self):
+        return self._get_all_ingredients()
 
     @staticmethod
     def check_quantity(user_quantity):
@@ -73,7 +90,8 @@ class UserInputChecker:
         return user_quantity
 
     def check_measure(self, user_measure):
-        temp_measure = [m for m in self.all_measures if m.startswith(user_measure)]
+        # Two matches are enough to know the measure is ambiguous.
+        temp_measure = self.lookup_cache.measure_trie().starting_with(user_measure, limit=2)
         if user_measure == "":
             return user_measure
         if len(temp_measure) > 1 or temp_measure == []:
@@ -81,7 +99,11 @@ class UserInputChecker:
         return temp_measure[0]
 
     def check_ingredient(self, user_ingredient):
-        temp_ing = [ing for ing in self.all_ingredients if user_ingredient in ing]
+        # Exact names, aliases and normalized spellings resolve in one dict lookup; otherwise match a fragment.
+        ingredient_name = self.lookup_cache.resolve_ingredient(user_ingredient)
+        if ingredient_name is not None:
+            return ingredient_name
+        temp_ing = self.lookup_cache.ingredient_substrings().containing(user_ingredient, limit=2)
         if len(temp_ing) > 1 or temp_ing == []:
             raise IngredientError
         return temp_ing[0]
@@ -106,21 +128,20 @@ class UserInputChecker:
                 continue
             measure_id = self.quantity_table_data.gather_measure_id(measure_name)
             ingredient_id = self.quantity_table_data.gather_ingredient_id(ingredient_name)
-            self.recipes_db_store.create_quantity(measure_id, ingredient_id, quantity, self.recipe_id)
+            if self.unit_of_work is not None:
+                self.unit_of_work.add_quantity(measure_id, ingredient_id, quantity)
+            else:
+                self.recipes_db_store.create_quantity(measure_id, ingredient_id, quantity, self.recipe_id)
 
     def _get_all_measures(self):
-        return self._column_to_list('measures', 'measure_name')
+        return list(self.lookup_cache.measures())
 
     def _get_all_ingredients(self):
-        return self._column_to_list('ingredients', 'ingredient_name')
-
-    def _column_to_list(self, table, column_name):
-        c = self.db.conn.cursor()
-        result = c.execute(f"SELECT {column_name} FROM {table}")
-        return [x[0] for x in result.fetchall()]
+        return list(self.lookup_cache.ingredients())
 
 
 class Recipe:
+    __slots__ = ("name", "instruction")
 
     def __init__(self, name, instruction):
         self.name = name
@@ -128,6 +149,7 @@ class Recipe:
 
 
 class Serve:
+    __slots__ = ("meal_ids",)
 
     def __init__(self, meal_ids: List):
         self.meal_ids = meal_ids
@@ -137,18 +159,21 @@ class QuantityTableData:
 
     def __init__(self, db: DBConnection):
         self.db = db
-        self.c = db.conn.cursor()
+        self.lookup_cache = LookupCache.for_connection(self.db)
 
+    @instrumented("QuantityTableData.gather_measure_id")
     def gather_measure_id(self, measure):
-        measure_result = self.c.execute(f"SELECT measure_id FROM measures WHERE measure_name IN (?)", [measure])
-        measure_id = measure_result.fetchone()[0]
-        return measure_id
+        try:
+            return self.lookup_cache.measures()[measure]
+        except KeyError:
+            raise MeasureError
 
+    @instrumented("QuantityTableData.gather_ingredient_id")
     def gather_ingredient_id(self, ingredient):
-        ingredient_result = self.c.execute(
-            f"SELECT ingredient_id FROM ingredients WHERE ingredient_name = (?)", [ingredient])
-        ingredient_id = ingredient_result.fetchone()[0]
-        return ingredient_id
+        try:
+            return self.lookup_cache.ingredients()[ingredient]
+        except KeyError:
+            raise IngredientError
 
 
 class RecipesDBStore:
@@ -156,36 +181,137 @@ class RecipesDBStore:
     def __init__(self, db: DBConnection):
         self.db = db
         self.c = db.conn.cursor()
+        # Serve and quantity writes also update recipe_signature, in the same transaction.
+        self.signatures = RecipeSignatures.for_connection(db)
 
+    @instrumented("RecipesDBStore.create_recipe", rows="rowcount")
     def create_recipe(self, recipe_object: Recipe):
         result = self.c.execute(
             f"INSERT INTO recipes(recipe_name, recipe_description) VALUES (?,?)",
             [recipe_object.name, recipe_object.instruction])
         self.db.conn.commit()
+        bump_generation(self.db)
         return result.lastrowid
 
+    @instrumented("RecipesDBStore.create_serve", rows="rowcount")
     def create_serve(self, meal_numbers: List, recipe_id):
-        for number in meal_numbers:
-            self.c.execute(
-                f"INSERT INTO serve(meal_id, recipe_id) VALUES (?,?)",
-                [number, recipe_id])
+        self.c.executemany(
+            f"INSERT INTO serve(meal_id, recipe_id) VALUES (?,?)",
+            [[number, recipe_id] for number in meal_numbers])
+        self.signatures.add_meals([(recipe_id, number) for number in meal_numbers])
         self.db.conn.commit()
+        bump_generation(self.db)
 
+    @instrumented("RecipesDBStore.create_quantity", rows="rowcount")
     def create_quantity(self, measure_id, ingredient_id, quantity, recipe_id):
-        c = self.db.conn.cursor()
-        c.execute(
+        self.c.execute(
             f"INSERT INTO quantity(measure_id, ingredient_id, quantity, recipe_id) "
             f"VALUES (?,?,?,?)", [measure_id, ingredient_id, quantity, recipe_id])
+        self.signatures.add_ingredients([(recipe_id, ingredient_id)])
         self.db.conn.commit()
+        bump_generation(self.db)
+
+    @instrumented("RecipesDBStore.next_recipe_id")
+    def next_recipe_id(self):
+        result = self.c.execute("SELECT COALESCE(MAX(recipe_id), 0) + 1 FROM recipes")
+        return result.fetchone()[0]
+
+    # The batch variants below use executemany and leave committing to the caller,
+    # so many rows can share a single transaction. Rows must be sequences, not iterators,
+    # as the serve and quantity rows are read a second time for the signatures.
+    @instrumented("RecipesDBStore.create_recipes", rows="rowcount")
+    def create_recipes(self, recipe_rows):
+        self.c.executemany(
+            "INSERT INTO recipes(recipe_id, recipe_name, recipe_description) VALUES (?,?,?)", recipe_rows)
+        bump_generation(self.db)
+
+    @instrumented("RecipesDBStore.create_serves", rows="rowcount")
+    def create_serves(self, serve_rows):
+        self.c.executemany("INSERT INTO serve(meal_id, recipe_id) VALUES (?,?)", serve_rows)
+        self.signatures.add_meals((recipe_id, meal_id) for meal_id, recipe_id in serve_rows)
+        bump_generation(self.db)
+
+    @instrumented("RecipesDBStore.create_quantities", rows="rowcount")
+    def create_quantities(self, quantity_rows):
+        self.c.executemany(
+            "INSERT INTO quantity(measure_id, ingredient_id, quantity, recipe_id) VALUES (?,?,?,?)", quantity_rows)
+        self.signatures.add_ingredients((x[3], x[1]) for x in quantity_rows)
+        bump_generation(self.db)
+
+
+class RecipeUnitOfWork:
+    """Buffers one recipe with its serve and quantity rows and writes them in a single transaction.
+
+    Used as a context manager it flushes when the block ends normally and discards
+    everything on an exception (including SystemExit), so an aborted entry leaves no rows.
+    """
+
+    def __init__(self, db: DBConnection):
+        self.db = db
+        self.recipes_db_store = RecipesDBStore(db)
+        self.recipe = None
+        self.meal_ids = []
+        self.quantities = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+        return False
+
+    def add_recipe(self, recipe_object: Recipe):
+        self.recipe = recipe_object
+
+    def add_serve(self, meal_numbers: List):
+        self.meal_ids.extend(meal_numbers)
+
+    def add_quantity(self, measure_id, ingredient_id, quantity):
+        self.quantities.append((measure_id, ingredient_id, quantity))
+
+    def flush(self):
+        """Writes the buffered rows and commits; returns the new recipe_id, or None if nothing was added."""
+        if self.recipe is None:
+            return None
+        try:
+            # The write lock is taken before reading MAX(recipe_id), so the id can't be handed out twice.
+            if not self.db.conn.in_transaction:
+                self.db.conn.execute("BEGIN IMMEDIATE")
+            recipe_id = self.recipes_db_store.next_recipe_id()
+            self.recipes_db_store.create_recipes([(recipe_id, self.recipe.name, self.recipe.instruction)])
+            self.recipes_db_store.create_serves([(meal_id, recipe_id) for meal_id in self.meal_ids])
+            self.recipes_db_store.create_quantities([(measure_id, ingredient_id, quantity, recipe_id)
+                                                     for measure_id, ingredient_id, quantity in self.quantities])
+            self.db.conn.commit()
+        except BaseException:
+            self.discard()
+            raise
+        self._clear()
+        return recipe_id
+
+    def discard(self):
+        if self.db.conn.in_transaction:
+            self.db.conn.rollback()
+        self._clear()
+
+    def _clear(self):
+        self.recipe = None
+        self.meal_ids = []
+        self.quantities = []
 
 
 class OptionalArguments:
 
-    def __init__(self, db, args):
+    def __init__(self, db, args, cache: ProposalCache = None):
         self.db = db
         self.c = db.conn.cursor()
         self.args = args
+        self.cache = cache
         self.final_output = []
+        self.last_recipe_id = None
 
     @staticmethod
     def is_input_comma_separated(input_string):
@@ -201,8 +327,14 @@ class OptionalArguments:
             raise NoMealsError
 
     def check_user_ingredients(self):
-        if self.is_input_comma_separated(self.args.ingredients) is False:
-            raise UserIngredientError
+        if self.is_input_comma_separated(self.args.ingredients):
+            return True
+        # Other items pass if they name an ingredient or alias: "whole milk", " milk", "Strawberries".
+        lookup_cache = LookupCache.for_connection(self.db)
+        lookup_cache.refresh()
+        for item in self.args.ingredients.split(','):
+            if not self.is_input_comma_separated(item.strip()) and lookup_cache.resolve_ingredient(item) is None:
+                raise UserIngredientError
         return True
 
     def check_user_meals(self):
@@ -210,35 +342,118 @@ class OptionalArguments:
             raise UserMealError
         return True
 
-    def propose_recipes(self):
-        ing_bindings = ["?" for _ in self.args.ingredients.split(',')]
-        meal_bindings = ["?" for _ in self.args.meals.split(',')]
-        meals_ing = self.args.ingredients.split(',') + self.args.meals.split(',')
-
-        proposed_recipes = self.c.execute(f"""SELECT DISTINCT r.recipe_id, recipe_name,
-                                          COUNT(ingredient_name) AS number_of_ingredients
-                                          FROM recipes r
-                                          JOIN quantity q
-                                          ON r.recipe_id = q.recipe_id
-                                          JOIN ingredients i
-                                          ON i.ingredient_id = q.ingredient_id
-                                          JOIN serve s
-                                          ON s.recipe_id = r.recipe_id
-                                          JOIN meals m
-                                          ON m.meal_id = s.meal_id
-                                          WHERE ingredient_name IN ({', '.join(ing_bindings)})
-                                          AND meal_name IN ({', '.join(meal_bindings)})
-                                          GROUP BY r.recipe_id, recipe_name
-                                          HAVING number_of_ingredients = {len(ing_bindings)}""",
-                                          meals_ing)
+    def resolved_ingredients(self):
+        """The --ingredients names as stored ("Milk", " milks" -> "milk"); names that resolve to nothing are kept."""
+        lookup_cache = LookupCache.for_connection(self.db)
+        lookup_cache.refresh()
+        return [lookup_cache.resolve_ingredient(x) or x for x in self.args.ingredients.split(',')]
 
-        fetched = proposed_recipes.fetchall()
-        output_recipes = [x[1] for x in fetched]
+    @instrumented("OptionalArguments.propose_recipes", rows="result")
+    def propose_recipes(self):
+        ingredients = self.resolved_ingredients()
+        meals = self.args.meals.split(',')
+        if self.cache is not None:
+            output_recipes = self.cache.get_or_compute(
+                self.db, ingredients, meals, lambda: self._query_recipes(ingredients, meals))
+        else:
+            output_recipes = self._query_recipes(ingredients, meals)
         self.final_output.extend(output_recipes)
         return output_recipes
 
-    def inform_user(self):
-        if len(self.final_output) > 0:
-            print(f"Recipes selected for you: {', '.join(self.final_output)}")
+    def rank_recipes(self, index, k):
+        ranked = index.rank_recipes(self.resolved_ingredients(), self.args.meals.split(','), k)
+        self.final_output.extend(f"{name} ({matched}/{required})" for name, matched, required in ranked)
+        return ranked
+
+    def propose_cookable(self, signatures: RecipeSignatures):
+        """Proposes recipes that need nothing beyond the --pantry ingredients, served at one of the --meals if given."""
+        lookup_cache = LookupCache.for_connection(self.db)
+        lookup_cache.refresh()
+        ingredient_ids = lookup_cache.ingredients()
+        pantry_names = [lookup_cache.resolve_ingredient(x) for x in self.args.pantry.split(',')]
+        # Unknown pantry names can't be required by any recipe, so they are simply left out.
+        pantry_ids = [ingredient_ids[x] for x in pantry_names if x is not None]
+        meal_ids = None
+        if self.args.meals is not None:
+            known_meals = dict(self.c.execute("SELECT meal_name, meal_id FROM meals"))
+            try:
+                meal_ids = [known_meals[x] for x in self.args.meals.split(',')]
+            except KeyError:
+                raise UnknownMealError
+        cookable = signatures.cookable_recipes(pantry_ids, meal_ids)
+        self.final_output.extend(name for _, name in cookable)
+        return cookable
+
+    @instrumented("OptionalArguments.proposal_query", rows="result")
+    def _query_recipes(self, ingredients, meals):
+        proposed_recipes = self.c.execute(self.proposal_query(ingredients, meals), ingredients + meals)
+        fetched = proposed_recipes.fetchall()
+        return [x[1] for x in fetched]
+
+    @instrumented_stream("OptionalArguments.stream_recipes")
+    def stream_recipes(self, limit=None, offset=0, after_id=None, batch_size=100):
+        """Yields (recipe_id, recipe_name) of proposed recipes in recipe_id order, fetching batch_size rows at a time.
+
+        after_id continues after the last recipe_id of a previous page (keyset pagination);
+        offset skips that many further matches and limit caps the page size.
+        last_recipe_id is kept up to date so the caller can ask for the next page.
+        """
+        if (limit is not None and limit < 0) or offset < 0 or (after_id is not None and after_id < 0):
+            raise PaginationError
+        ingredients = self.resolved_ingredients()
+        meals = self.args.meals.split(',')
+        params = ingredients + meals + ([after_id] if after_id is not None else [])
+        c = self.db.conn.cursor()
+        c.execute(self.proposal_query(ingredients, meals, after_id, limit, offset), params)
+        while True:
+            rows = c.fetchmany(batch_size)
+            if not rows:
+                return
+            for recipe_id, recipe_name, _ in rows:
+                self.last_recipe_id = recipe_id
+                yield recipe_id, recipe_name
+
+    @staticmethod
+    def proposal_query(ingredients: List, meals: List, after_id=None, limit=None, offset=0):
+        ing_bindings = ["?" for _ in ingredients]
+        meal_bindings = ["?" for _ in meals]
+        keyset = "AND r.recipe_id > ?" if after_id is not None else ""
+        page = ""
+        if limit is not None or offset:
+            # LIMIT -1 means no limit; SQLite needs a LIMIT clause to accept an OFFSET.
+            page = f"LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset)}"
+
+        # DISTINCT keeps the count independent of how many serve rows and duplicate quantity rows join in.
+        return f"""SELECT r.recipe_id, recipe_name,
+                   COUNT(DISTINCT q.ingredient_id) AS number_of_ingredients
+                   FROM recipes r
+                   JOIN quantity q
+                   ON r.recipe_id = q.recipe_id
+                   JOIN ingredients i
+                   ON i.ingredient_id = q.ingredient_id
+                   JOIN serve s
+                   ON s.recipe_id = r.recipe_id
+                   JOIN meals m
+                   ON m.meal_id = s.meal_id
+                   WHERE ingredient_name IN ({', '.join(ing_bindings)})
+                   AND meal_name IN ({', '.join(meal_bindings)})
+                   {keyset}
+                   GROUP BY r.recipe_id, recipe_name
+                   HAVING number_of_ingredients = {len(set(ingredients))}
+                   ORDER BY r.recipe_id
+                   {page}"""
+
+    def inform_user(self, recipe_names=None):
+        """Prints final_output, or prints names from recipe_names as they arrive. Returns how many were printed."""
+        if recipe_names is None:
+            recipe_names = self.final_output
+        printed = 0
+        for name in recipe_names:
+            print("Recipes selected for you: " if printed == 0 else ", ", end="")
+            print(name, end="", flush=True)
+            printed += 1
+        if printed > 0:
+            print()
         else:
-            print("There are no such recipes in the database.")
\ No newline at end of file
+            print("There are no such recipes in the database.")
+        return printed
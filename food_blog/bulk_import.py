@@ -0,0 +1,293 @@
+import collections
+import csv
+import gzip
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from typing import List
+from blog import UserInputCollector, UserInputChecker, RecipesDBStore
+from lookup_cache import LookupCache
+from db_handler import DBConnection
+from custom_errors import ImportFormatError, UnknownMealError, MeasureError, QuantityError, BatchSizeError
+
+
+def file_format(path):
+    """Returns "jsonl" or "csv" for a recipe file path (a trailing .gz is ignored), or None."""
+    stripped = path[:-3] if path.endswith(".gz") else path
+    if stripped.endswith(".jsonl"):
+        return "jsonl"
+    if stripped.endswith(".csv"):
+        return "csv"
+    return None
+
+
+class ImportRecord:
+    __slots__ = ("name", "description", "meals", "ingredient_lines")
+
+    def __init__(self, name, description, meals: List, ingredient_lines: List):
+        self.name = name
+        self.description = description
+        self.meals = meals
+        self.ingredient_lines = ingredient_lines
+
+
+class RecipeFileReader:
+    """Streams ImportRecords from a .jsonl or .csv file without loading it whole.
+
+    Both formats carry the same fields: name, description, meals (names) and
+    ingredients written like the interactive prompt, e.g. "500 ml milk".
+    In CSV files meals are separated by spaces and ingredient lines by semicolons.
+    Files ending in .gz are decompressed on the fly.
+    """
+
+    @staticmethod
+    def read(path):
+        fmt = RecipeFileReader.format_of(path)
+        return (RecipeFileReader.parse_raw(fmt, item) for item in RecipeFileReader.read_raw(path))
+
+    @staticmethod
+    def format_of(path):
+        fmt = file_format(path)
+        if fmt is None:
+            raise ImportFormatError
+        return fmt
+
+    @staticmethod
+    def read_raw(path):
+        """Yields unparsed items: JSONL lines or CSV row dicts, ready to hand to parse_raw()."""
+        fmt = RecipeFileReader.format_of(path)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                yield from csv.DictReader(f)
+                return
+            for line in f:
+                if line.strip() != "":
+                    yield line
+
+    @staticmethod
+    def parse_raw(fmt, item):
+        if fmt == "csv":
+            return RecipeFileReader.parse_csv_row(item)
+        return RecipeFileReader.parse_jsonl_line(item)
+
+    @staticmethod
+    def parse_jsonl_line(line):
+        try:
+            item = json.loads(line)
+            return ImportRecord(item["name"], item.get("description", ""), list(item["meals"]),
+                                list(item["ingredients"]))
+        except (ValueError, KeyError, TypeError):
+            raise ImportFormatError
+
+    @staticmethod
+    def parse_csv_row(row):
+        try:
+            meals = row["meals"].split()
+            ingredient_lines = [x.strip() for x in row["ingredients"].split(";") if x.strip() != ""]
+            return ImportRecord(row["name"], row.get("description") or "", meals, ingredient_lines)
+        except (KeyError, AttributeError):
+            raise ImportFormatError
+
+
+class ImportStats:
+
+    def __init__(self, recipes, rows, seconds, stages=None):
+        self.recipes = recipes
+        self.rows = rows
+        self.seconds = seconds
+        # Seconds spent per pipeline stage; parse time is summed over all worker processes.
+        self.stages = stages or {}
+
+    @property
+    def rows_per_second(self):
+        if self.seconds == 0:
+            return float(self.rows)
+        return self.rows / self.seconds
+
+    def __str__(self):
+        summary = f"Imported {self.recipes} recipes ({self.rows} rows) in {self.seconds:.2f}s, " \
+                  f"{self.rows_per_second:.0f} rows/s."
+        if self.stages:
+            summary += " Stages: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items()) + "."
+        return summary
+
+
+class RecipeImporter:
+    """Bulk loads recipes in batched transactions instead of committing every row.
+
+    Each record is first validated into a plain tuple (name, description, meal names,
+    [(quantity, measure name, ingredient name), ...]); write_validated() then resolves
+    names against in-memory name->id maps and inserts a whole batch at once.
+    Ingredients missing from the database are created on the fly.
+    """
+
+    def __init__(self, db: DBConnection, batch_size=1000):
+        if batch_size < 1:
+            raise BatchSizeError
+        self.db = db
+        self.batch_size = batch_size
+        self.recipes_db_store = RecipesDBStore(self.db)
+        self.lookup_cache = LookupCache.for_connection(self.db)
+        self.lookup_cache.refresh()
+        result = self.db.conn.execute("SELECT meal_name, meal_id FROM meals")
+        self.meal_ids = dict(result.fetchall())
+
+    @staticmethod
+    def validate(record: ImportRecord, measure_names, meal_names):
+        for meal in record.meals:
+            if meal not in meal_names:
+                raise UnknownMealError
+        lines = []
+        for line in record.ingredient_lines:
+            quantity, measure, ingredient = UserInputCollector.parse_recipe_info(line)
+            if measure not in measure_names:
+                raise MeasureError
+            lines.append((UserInputChecker.check_quantity(quantity), measure, ingredient))
+        return record.name, record.description, list(record.meals), lines
+
+    def import_file(self, path):
+        return self.import_records(RecipeFileReader.read(path))
+
+    def import_records(self, records):
+        start = time.perf_counter()
+        recipes = 0
+        rows = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                rows += self._write_batch(batch)
+                recipes += len(batch)
+                batch = []
+        if batch:
+            rows += self._write_batch(batch)
+            recipes += len(batch)
+        return ImportStats(recipes, rows, time.perf_counter() - start)
+
+    def _write_batch(self, batch):
+        measure_names = self.lookup_cache.measures()
+        return self.write_validated([self.validate(x, measure_names, self.meal_ids) for x in batch])
+
+    def write_validated(self, batch):
+        recipe_rows = []
+        serve_rows = []
+        quantity_rows = []
+        new_ingredients = 0
+        measure_ids = self.lookup_cache.measures()
+        try:
+            recipe_id = self._next_recipe_id()
+            for name, description, meals, lines in batch:
+                recipe_rows.append((recipe_id, name, description))
+                serve_rows.extend((self.meal_ids[meal], recipe_id) for meal in meals)
+                for quantity, measure, ingredient in lines:
+                    # "Milk" or "strawberries" must not become new ingredients next to milk and strawberry.
+                    ingredient = self.lookup_cache.resolve_ingredient(ingredient) or ingredient
+                    if ingredient not in self.lookup_cache.ingredients():
+                        new_ingredients += 1
+                    quantity_rows.append((measure_ids[measure], self._ingredient_id(ingredient), quantity, recipe_id))
+                recipe_id += 1
+            self._write_rows(recipe_rows, serve_rows, quantity_rows)
+        except Exception:
+            self._rollback()
+            # Ingredients created in the rolled back transaction no longer exist.
+            self.lookup_cache.invalidate()
+            raise
+        return len(recipe_rows) + len(serve_rows) + len(quantity_rows) + new_ingredients
+
+    # Where the rows of a batch go; ShardedRecipeImporter routes them to shard files instead.
+    def _next_recipe_id(self):
+        return self.recipes_db_store.next_recipe_id()
+
+    def _write_rows(self, recipe_rows, serve_rows, quantity_rows):
+        self.recipes_db_store.create_recipes(recipe_rows)
+        self.recipes_db_store.create_serves(serve_rows)
+        self.recipes_db_store.create_quantities(quantity_rows)
+        self.db.conn.commit()
+
+    def _rollback(self):
+        self.db.conn.rollback()
+
+    def _ingredient_id(self, ingredient):
+        ingredient_ids = self.lookup_cache.ingredients()
+        if ingredient not in ingredient_ids:
+            result = self.db.conn.execute("INSERT INTO ingredients(ingredient_name) VALUES (?)", [ingredient])
+            self.lookup_cache.add_ingredient(ingredient, result.lastrowid)
+        return ingredient_ids[ingredient]
+
+
+_worker_measure_names = None
+_worker_meal_names = None
+
+
+def _init_worker(measure_names, meal_names):
+    global _worker_measure_names, _worker_meal_names
+    _worker_measure_names = measure_names
+    _worker_meal_names = meal_names
+
+
+def _validate_chunk(chunk):
+    fmt, items = chunk
+    start = time.process_time()
+    try:
+        validated = [RecipeImporter.validate(RecipeFileReader.parse_raw(fmt, item), _worker_measure_names,
+                                             _worker_meal_names) for item in items]
+    except (ImportFormatError, UnknownMealError, MeasureError, QuantityError) as e:
+        # The custom errors take no arguments and cannot be unpickled, so the writer re-raises the class.
+        return type(e), time.process_time() - start
+    return validated, time.process_time() - start
+
+
+class ParallelRecipeImporter(RecipeImporter):
+    """Parses and validates records in a process pool while this process alone writes.
+
+    Chunks of batch_size raw items go to the workers; validated batches come back in
+    file order and are committed one transaction each, so the SQLite connection never
+    leaves the writer. The writer is the slow stage, so at most max_in_flight chunks are
+    read ahead of it; memory stays bounded however large the feed is.
+    """
+
+    def __init__(self, db: DBConnection, batch_size=1000, workers=None):
+        super().__init__(db, batch_size)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = 2 * self.workers
+
+    def import_file(self, path):
+        start = time.perf_counter()
+        stages = {"read": 0.0, "parse": 0.0, "write": 0.0}
+        recipes = 0
+        rows = 0
+        initargs = (set(self.lookup_cache.measures()), set(self.meal_ids))
+        in_flight = collections.deque()
+        with multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=initargs) as pool:
+            # Unlike imap(), which reads its whole input ahead, a chunk is only submitted once there is room.
+            for chunk in self._chunks(path, stages):
+                in_flight.append(pool.apply_async(_validate_chunk, (chunk,)))
+                if len(in_flight) >= self.max_in_flight:
+                    recipes, rows = self._write_result(in_flight.popleft().get(), stages, recipes, rows)
+            while in_flight:
+                recipes, rows = self._write_result(in_flight.popleft().get(), stages, recipes, rows)
+        return ImportStats(recipes, rows, time.perf_counter() - start, stages)
+
+    def _write_result(self, result, stages, recipes, rows):
+        validated, parse_seconds = result
+        stages["parse"] += parse_seconds
+        if isinstance(validated, type):
+            raise validated()
+        write_start = time.perf_counter()
+        rows += self.write_validated(validated)
+        stages["write"] += time.perf_counter() - write_start
+        return recipes + len(validated), rows
+
+    def _chunks(self, path, stages):
+        fmt = RecipeFileReader.format_of(path)
+        items = RecipeFileReader.read_raw(path)
+        while True:
+            read_start = time.perf_counter()
+            chunk = list(itertools.islice(items, self.batch_size))
+            stages["read"] += time.perf_counter() - read_start
+            if not chunk:
+                return
+            yield fmt, chunk
@@ -0,0 +1,128 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+from db_handler import DBConnection
+
+
+# Tuple-backed rows: no per-instance __dict__, and the field order matches
+# RecipesDBStore's batch methods, so records can be passed to them as they are.
+class RecipeRecord(NamedTuple):
+    recipe_id: int
+    name: str
+    description: str
+
+
+class ServeRecord(NamedTuple):
+    meal_id: int
+    recipe_id: int
+
+
+class QuantityRecord(NamedTuple):
+    measure_id: int
+    ingredient_id: int
+    quantity: int
+    recipe_id: int
+
+
+class ColumnarCatalogue:
+    """The whole catalogue held column by column in typed arrays.
+
+    Each id or quantity costs one machine word instead of a Python object per row.
+    Serve and quantity columns are kept in recipe_id order, so the rows of one recipe
+    are found by bisecting the recipe_id column. Records are only created on access.
+    """
+
+    def __init__(self):
+        self.recipe_ids = array('l')
+        self.recipe_names = []
+        self.recipe_descriptions = []
+        self.serve_meal_ids = array('l')
+        self.serve_recipe_ids = array('l')
+        self.quantity_measure_ids = array('l')
+        self.quantity_ingredient_ids = array('l')
+        self.quantity_amounts = array('l')
+        self.quantity_recipe_ids = array('l')
+
+    @staticmethod
+    def load(db: DBConnection, batch_size=10000):
+        catalogue = ColumnarCatalogue()
+        catalogue.extend(
+            ColumnarCatalogue._rows(db, """SELECT recipe_id, recipe_name, COALESCE(recipe_description, '')
+                                    FROM recipes ORDER BY recipe_id""", batch_size),
+            ColumnarCatalogue._rows(db, "SELECT meal_id, recipe_id FROM serve ORDER BY recipe_id, serve_id",
+                                    batch_size),
+            ColumnarCatalogue._rows(db, """SELECT measure_id, ingredient_id, quantity, recipe_id FROM quantity
+                                    ORDER BY recipe_id, quantity_id""", batch_size))
+        return catalogue
+
+    @staticmethod
+    def from_records(recipes, serves, quantities):
+        catalogue = ColumnarCatalogue()
+        catalogue.extend(recipes, sorted(serves, key=lambda x: x[1]), sorted(quantities, key=lambda x: x[3]))
+        return catalogue
+
+    def extend(self, recipes, serves, quantities):
+        """Appends rows shaped like the records; each kind must continue in recipe_id order."""
+        for recipe_id, name, description in recipes:
+            self.recipe_ids.append(recipe_id)
+            self.recipe_names.append(name)
+            self.recipe_descriptions.append(description)
+        for meal_id, recipe_id in serves:
+            self.serve_meal_ids.append(meal_id)
+            self.serve_recipe_ids.append(recipe_id)
+        for measure_id, ingredient_id, quantity, recipe_id in quantities:
+            self.quantity_measure_ids.append(measure_id)
+            self.quantity_ingredient_ids.append(ingredient_id)
+            self.quantity_amounts.append(quantity)
+            self.quantity_recipe_ids.append(recipe_id)
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def recipes(self):
+        for recipe_id, name, description in zip(self.recipe_ids, self.recipe_names, self.recipe_descriptions):
+            yield RecipeRecord(recipe_id, name, description)
+
+    def serves(self):
+        for meal_id, recipe_id in zip(self.serve_meal_ids, self.serve_recipe_ids):
+            yield ServeRecord(meal_id, recipe_id)
+
+    def quantities(self):
+        for row in zip(self.quantity_measure_ids, self.quantity_ingredient_ids, self.quantity_amounts,
+                       self.quantity_recipe_ids):
+            yield QuantityRecord(*row)
+
+    def recipe(self, recipe_id):
+        position = bisect_left(self.recipe_ids, recipe_id)
+        if position == len(self.recipe_ids) or self.recipe_ids[position] != recipe_id:
+            raise KeyError(recipe_id)
+        return RecipeRecord(recipe_id, self.recipe_names[position], self.recipe_descriptions[position])
+
+    def meal_ids_of(self, recipe_id):
+        start, end = self._span(self.serve_recipe_ids, recipe_id)
+        return self.serve_meal_ids[start:end].tolist()
+
+    def quantities_of(self, recipe_id):
+        start, end = self._span(self.quantity_recipe_ids, recipe_id)
+        return [QuantityRecord(self.quantity_measure_ids[n], self.quantity_ingredient_ids[n],
+                               self.quantity_amounts[n], recipe_id) for n in range(start, end)]
+
+    def nbytes(self):
+        """Size of the numeric columns; the name and description strings come on top."""
+        columns = (self.recipe_ids, self.serve_meal_ids, self.serve_recipe_ids, self.quantity_measure_ids,
+                   self.quantity_ingredient_ids, self.quantity_amounts, self.quantity_recipe_ids)
+        return sum(len(x) * x.itemsize for x in columns)
+
+    @staticmethod
+    def _span(column, recipe_id):
+        return bisect_left(column, recipe_id), bisect_right(column, recipe_id)
+
+    @staticmethod
+    def _rows(db, query, batch_size):
+        c = db.conn.cursor()
+        c.execute(query)
+        while True:
+            rows = c.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
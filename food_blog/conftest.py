@@ -0,0 +1,44 @@
+import pytest
+from blog import RecipesDBStore
+from db_handler import DBConnection, Data
+
+# pancakes need blueberry and strawberry, for breakfast; risotto needs milk, for supper;
+# milkshake needs milk and strawberry, for breakfast and lunch.
+RECIPES = [(1, "pancakes", "Fry."), (2, "risotto", "Cook."), (3, "milkshake", "Blend.")]
+SERVES = [(1, 1), (4, 2), (1, 3), (3, 3)]
+QUANTITIES = [(4, 4, 1, 1), (4, 3, 1, 1), (1, 1, 100, 2), (1, 1, 300, 3), (4, 3, 1, 3)]
+
+
+@pytest.fixture
+def make_catalogue():
+    """Returns a function that builds a seeded catalogue from rows shaped like RecipesDBStore's batch
+    methods take them. Every database it opens is closed after the test."""
+    opened = []
+
+    def make(recipes=RECIPES, serves=SERVES, quantities=QUANTITIES, db_name=":memory:", migrate=False,
+             foreign_keys=False):
+        db = DBConnection(db_name)
+        opened.append(db)
+        if foreign_keys:
+            db.turn_on_foreign_keys()
+        data = Data(db)
+        if migrate:
+            data.migrate()
+        else:
+            data.create_tables()
+            data.seed_tables()
+        recipes_db_store = RecipesDBStore(db)
+        recipes_db_store.create_recipes(recipes)
+        recipes_db_store.create_serves(serves)
+        recipes_db_store.create_quantities(quantities)
+        db.conn.commit()
+        return db
+
+    yield make
+    for db in opened:
+        db.close()
+
+
+@pytest.fixture
+def catalogue_db(make_catalogue):
+    return make_catalogue()
@@ -44,3 +44,81 @@ class NoMealsError(Exception):
     def __init__(self):
         self.message = "Provide meals."
         super().__init__(self.message)
+
+
+class ImportFormatError(Exception):
+    def __init__(self):
+        self.message = "Import file must be a .jsonl or .csv file with name, description, meals and ingredients."
+        super().__init__(self.message)
+
+
+class UnknownMealError(Exception):
+    def __init__(self):
+        self.message = "The meal is not in the database."
+        super().__init__(self.message)
+
+
+class ServerRequestError(Exception):
+    def __init__(self):
+        self.message = 'Send one JSON object per line: {"ingredients": "milk,sugar", "meals": "breakfast,brunch"}.'
+        super().__init__(self.message)
+
+
+class ProfileError(Exception):
+    def __init__(self):
+        self.message = "Unknown connection profile. Choose default or performance."
+        super().__init__(self.message)
+
+
+class PoolError(Exception):
+    def __init__(self):
+        self.message = "A connection pool needs a database file, not an in-memory database."
+        super().__init__(self.message)
+
+
+class PaginationError(Exception):
+    def __init__(self):
+        self.message = "Limit, offset and the recipe id to continue after must not be negative."
+        super().__init__(self.message)
+
+
+class SearchError(Exception):
+    def __init__(self):
+        self.message = 'Provide search keywords, e.g. --search "chocolate cake".'
+        super().__init__(self.message)
+
+
+class SearchUnavailableError(Exception):
+    def __init__(self):
+        self.message = "Full-text search needs an SQLite build with FTS5."
+        super().__init__(self.message)
+
+
+class SnapshotError(Exception):
+    def __init__(self):
+        self.message = "A snapshot needs a database file, not an in-memory database."
+        super().__init__(self.message)
+
+
+class ShardError(Exception):
+    def __init__(self):
+        self.message = "A sharded catalogue needs a manifest listing at least one shard file."
+        super().__init__(self.message)
+
+
+class AliasError(Exception):
+    def __init__(self):
+        self.message = "An alias needs a name that is not an ingredient yet and an existing ingredient to stand for."
+        super().__init__(self.message)
+
+
+class ExportFormatError(Exception):
+    def __init__(self):
+        self.message = "Export file must be a .jsonl or .csv file, optionally ending in .gz."
+        super().__init__(self.message)
+
+
+class BatchSizeError(Exception):
+    def __init__(self):
+        self.message = "The batch size must be at least one recipe."
+        super().__init__(self.message)
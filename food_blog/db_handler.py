@@ -1,11 +1,68 @@
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+from custom_errors import ProfileError, PoolError
+
+
+class ConnectionProfile:
+    """PRAGMA settings applied to every new connection. None leaves SQLite's default in place."""
+
+    def __init__(self, journal_mode=None, synchronous=None, mmap_size=None, cache_size=None, temp_store=None,
+                 busy_timeout=None):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.busy_timeout = busy_timeout
+
+    def pragmas(self):
+        settings = [("journal_mode", self.journal_mode), ("synchronous", self.synchronous),
+                    ("mmap_size", self.mmap_size), ("cache_size", self.cache_size),
+                    ("temp_store", self.temp_store), ("busy_timeout", self.busy_timeout)]
+        return [(name, value) for name, value in settings if value is not None]
+
+
+PROFILES = {
+    "default": ConnectionProfile(),
+    # WAL lets readers run alongside the writer and NORMAL syncs only at checkpoints,
+    # trading durability of the last commits on power loss for far fewer fsyncs.
+    "performance": ConnectionProfile(journal_mode="WAL", synchronous="NORMAL", mmap_size=256 * 1024 * 1024,
+                                     cache_size=-64 * 1024, temp_store="MEMORY", busy_timeout=5000),
+}
 
 
 class DBConnection:
 
-    def __init__(self, db_name):
+    def __init__(self, db_name, profile="default", read_only=False, check_same_thread=True):
         self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name)
+        if read_only:
+            uri = f"file:{pathname2url(os.path.abspath(db_name))}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+        else:
+            self.conn = sqlite3.connect(self.db_name, check_same_thread=check_same_thread)
+        self.read_only = read_only
+        self.profile = self._resolve_profile(profile)
+        self.apply_profile(self.profile)
+
+    @staticmethod
+    def _resolve_profile(profile):
+        if isinstance(profile, ConnectionProfile):
+            return profile
+        if profile not in PROFILES:
+            raise ProfileError
+        return PROFILES[profile]
+
+    def apply_profile(self, profile: ConnectionProfile):
+        for name, value in profile.pragmas():
+            if isinstance(value, str) and not value.isalpha():
+                raise ProfileError
+            if name == "journal_mode" and self.read_only:
+                # The journal mode is stored in the file; the writer sets it.
+                continue
+            self.conn.execute(f"PRAGMA {name} = {value if isinstance(value, str) else int(value)}")
 
     def turn_on_foreign_keys(self):
         self.conn.execute('''PRAGMA foreign_keys = ON''')
@@ -17,12 +74,160 @@ class DBConnection:
         self.conn.close()
 
 
+class ConnectionPool:
+    """Hands out one read-only connection per thread and a single serialized writer.
+
+    Readers run concurrently; every write goes through writer(), which holds a lock
+    for the whole transaction and commits (or rolls back) when the block ends.
+    """
+
+    def __init__(self, db_name, profile="default"):
+        if db_name == ":memory:" or db_name == "":
+            raise PoolError
+        self.db_name = db_name
+        self.profile = profile
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._writer_lock = threading.RLock()
+        # Opening the writer first creates the file and applies the journal mode before any reader opens it.
+        self._writer = DBConnection(db_name, profile, check_same_thread=False)
+        self._writer.turn_on_foreign_keys()
+
+    def reader(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = DBConnection(self.db_name, self.profile, read_only=True, check_same_thread=False)
+            db.turn_on_foreign_keys()
+            self._local.db = db
+            with self._readers_lock:
+                self._readers.append(db)
+        return db
+
+    @contextmanager
+    def writer(self):
+        with self._writer_lock:
+            try:
+                yield self._writer
+                self._writer.conn.commit()
+            except BaseException:
+                self._writer.conn.rollback()
+                raise
+
+    def close(self):
+        with self._readers_lock:
+            for db in self._readers:
+                db.close()
+            self._readers = []
+        with self._writer_lock:
+            self._writer.close()
+        self._local = threading.local()
+
+
 class Data:
 
     def __init__(self, db: DBConnection):
         self.db = db
+        # Migration n brings a database from user_version n - 1 to n. Only ever append to this list.
+        self.migrations = [self._create_initial_schema, self._create_indexes, self._create_recipe_search,
+                           self._create_recipe_signatures, self._create_ingredient_aliases]
+
+    @property
+    def latest_version(self):
+        return len(self.migrations)
+
+    def schema_version(self):
+        return self.db.conn.execute('''PRAGMA user_version''').fetchone()[0]
+
+    def migrate(self):
+        # An up-to-date database is only read, never written.
+        if self.schema_version() >= self.latest_version:
+            return False
+        for number, migration in enumerate(self.migrations, start=1):
+            # Each step runs in its own write transaction and re-checks the version,
+            # so concurrent processes starting on the same file apply it only once.
+            if self.db.conn.in_transaction:
+                self.db.conn.commit()
+            self.db.conn.execute('''BEGIN IMMEDIATE''')
+            try:
+                if self.schema_version() < number:
+                    migration()
+                    self.db.conn.execute(f'''PRAGMA user_version = {number}''')
+                self.db.conn.commit()
+            except Exception:
+                self.db.conn.rollback()
+                raise
+        return True
+
+    def _create_initial_schema(self):
+        # Databases created before versioning already have these tables; both steps are idempotent.
+        # The non-committing halves keep them inside migrate()'s transaction.
+        self._create_tables()
+        self._seed_tables()
+
+    def _create_indexes(self):
+        # SQLite indexes neither side of a foreign key by itself, so joins and FK checks on serve and
+        # quantity would scan them. The second column makes the proposal query's lookups covering.
+        c = self.db.conn.cursor()
+        c.execute('''CREATE INDEX IF NOT EXISTS serve_recipe_id_idx ON serve(recipe_id, meal_id)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS serve_meal_id_idx ON serve(meal_id, recipe_id)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS quantity_recipe_id_idx ON quantity(recipe_id)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS quantity_ingredient_id_idx ON quantity(ingredient_id, recipe_id)''')
+
+    def _create_recipe_search(self):
+        # External-content FTS5 index over recipes: it stores only the index, and the triggers keep it in step
+        # with every insert, update and delete. SQLite builds without FTS5 skip it and search is unavailable.
+        c = self.db.conn.cursor()
+        try:
+            c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search
+                USING fts5(recipe_name, recipe_description, content='recipes', content_rowid='recipe_id')''')
+        except sqlite3.OperationalError:
+            return
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recipes_search_insert AFTER INSERT ON recipes BEGIN
+            INSERT INTO recipe_search(rowid, recipe_name, recipe_description)
+            VALUES (new.recipe_id, new.recipe_name, new.recipe_description);
+            END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recipes_search_delete AFTER DELETE ON recipes BEGIN
+            INSERT INTO recipe_search(recipe_search, rowid, recipe_name, recipe_description)
+            VALUES ('delete', old.recipe_id, old.recipe_name, old.recipe_description);
+            END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recipes_search_update AFTER UPDATE ON recipes BEGIN
+            INSERT INTO recipe_search(recipe_search, rowid, recipe_name, recipe_description)
+            VALUES ('delete', old.recipe_id, old.recipe_name, old.recipe_description);
+            INSERT INTO recipe_search(rowid, recipe_name, recipe_description)
+            VALUES (new.recipe_id, new.recipe_name, new.recipe_description);
+            END''')
+        # Index the recipes that existed before this migration.
+        c.execute('''INSERT INTO recipe_search(recipe_search) VALUES ('rebuild')''')
+
+    def _create_recipe_signatures(self):
+        # Imported here: recipe_signatures builds on this module.
+        from recipe_signatures import RecipeSignatures
+        self.db.conn.execute('''CREATE TABLE IF NOT EXISTS recipe_signature (
+            recipe_id INTEGER PRIMARY KEY REFERENCES recipes(recipe_id) ON DELETE CASCADE,
+            ingredient_ids BLOB NOT NULL,
+            meal_mask INTEGER NOT NULL)
+            ''')
+        RecipeSignatures(self.db).rebuild()
+
+    def _create_ingredient_aliases(self):
+        # User-defined synonyms, stored normalized (name_index.normalize_ingredient); LookupCache folds
+        # them into its in-memory canonical name map.
+        self.db.conn.execute('''CREATE TABLE IF NOT EXISTS ingredient_alias (
+            alias TEXT PRIMARY KEY,
+            ingredient_id INTEGER NOT NULL REFERENCES ingredients(ingredient_id) ON DELETE CASCADE)
+            WITHOUT ROWID
+            ''')
 
     def create_tables(self):
+        self._create_tables()
+        self.db.conn.commit()
+
+    def seed_tables(self):
+        self._seed_tables()
+        self.db.conn.commit()
+
+    def _create_tables(self):
         c = self.db.conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS meals(
             meal_id INTEGER PRIMARY KEY,
@@ -63,22 +268,18 @@ class Data:
             FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id),
             FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id))         
             ''')
-        self.db.conn.commit()
 
-    def seed_tables(self):
+    def _seed_tables(self):
         c = self.db.conn.cursor()
         c.execute('''INSERT OR IGNORE INTO meals(meal_name) 
             VALUES ("breakfast"), ("brunch"), ("lunch"), ("supper")
             ''')
-        self.db.conn.commit()
 
         c.execute('''INSERT OR IGNORE INTO ingredients(ingredient_name)
                     VALUES ("milk"), ("cacao"), ("strawberry"), ("blueberry"), ("blackberry"), ("sugar")
                     ''')
-        self.db.conn.commit()
 
         c.execute('''INSERT OR IGNORE INTO measures(measure_name)
                     VALUES ("ml"), ("g"), ("l"), ("cup"), ("tbsp"), ("tsp"), ("dsp"), ("")
                     ''')
-        self.db.conn.commit()
 
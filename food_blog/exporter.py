@@ -0,0 +1,91 @@
+import csv
+import gzip
+import json
+import os
+from db_handler import DBConnection
+from bulk_import import file_format
+from custom_errors import ExportFormatError
+
+
+class RecipeExporter:
+    """Streams the catalogue as import-compatible records, one recipe at a time.
+
+    Recipes, serve rows and quantity rows are read by three cursors ordered by recipe_id
+    and merged as they go, fetchmany() batch by batch, so memory use does not grow
+    with the catalogue.
+    """
+
+    def __init__(self, db: DBConnection, batch_size=1000):
+        self.db = db
+        self.batch_size = batch_size
+
+    def iter_recipes(self, after_id=0):
+        recipes = self._rows("""SELECT recipe_id, recipe_name, recipe_description FROM recipes
+                             WHERE recipe_id > ? ORDER BY recipe_id""", after_id)
+        serves = self._rows("""SELECT s.recipe_id, meal_name FROM serve s
+                            JOIN meals m ON m.meal_id = s.meal_id
+                            WHERE s.recipe_id > ? ORDER BY s.recipe_id, s.serve_id""", after_id)
+        quantities = self._rows("""SELECT q.recipe_id, quantity, measure_name, ingredient_name FROM quantity q
+                                JOIN measures m ON m.measure_id = q.measure_id
+                                JOIN ingredients i ON i.ingredient_id = q.ingredient_id
+                                WHERE q.recipe_id > ? ORDER BY q.recipe_id, q.quantity_id""", after_id)
+        serve = next(serves, None)
+        quantity = next(quantities, None)
+        for recipe_id, name, description in recipes:
+            meals = []
+            # Rows of recipes that no longer exist would never be consumed, so skip anything below recipe_id.
+            while serve is not None and serve[0] <= recipe_id:
+                if serve[0] == recipe_id:
+                    meals.append(serve[1])
+                serve = next(serves, None)
+            ingredient_lines = []
+            while quantity is not None and quantity[0] <= recipe_id:
+                if quantity[0] == recipe_id:
+                    ingredient_lines.append(self.ingredient_line(*quantity[1:]))
+                quantity = next(quantities, None)
+            yield {"recipe_id": recipe_id, "name": name, "description": description or "", "meals": meals,
+                   "ingredients": ingredient_lines}
+
+    @staticmethod
+    def ingredient_line(quantity, measure, ingredient):
+        """Writes a quantity row the way UserInputCollector.parse_recipe_info() reads it back."""
+        if measure in ("", None) and " " in ingredient:
+            # "2 brown sugar" would read "brown" as the measure; an empty field between two spaces is no measure.
+            return f"{quantity}  {ingredient}"
+        return " ".join(str(x) for x in (quantity, measure, ingredient) if x not in ("", None))
+
+    def export(self, path, fmt=None, compress=False, after_id=0):
+        """Writes recipes after after_id to path. With after_id, an existing file is appended to,
+        so an interrupted export resumes after the last recipe_id it holds."""
+        fmt = fmt or file_format(path)
+        if fmt is None:
+            raise ExportFormatError
+        if compress and not path.endswith(".gz"):
+            path += ".gz"
+        opener = gzip.open if path.endswith(".gz") else open
+        resuming = after_id > 0 and os.path.exists(path) and os.path.getsize(path) > 0
+        count = 0
+        # Appending to a .gz file adds a gzip member; readers decompress the members as one stream.
+        with opener(path, "at" if resuming else "wt", encoding="utf-8", newline="") as f:
+            if fmt == "jsonl":
+                for recipe in self.iter_recipes(after_id):
+                    f.write(json.dumps(recipe) + "\n")
+                    count += 1
+            else:
+                writer = csv.writer(f)
+                if not resuming:
+                    writer.writerow(["recipe_id", "name", "description", "meals", "ingredients"])
+                for recipe in self.iter_recipes(after_id):
+                    writer.writerow([recipe["recipe_id"], recipe["name"], recipe["description"],
+                                     " ".join(recipe["meals"]), "; ".join(recipe["ingredients"])])
+                    count += 1
+        return path, count
+
+    def _rows(self, query, after_id):
+        c = self.db.conn.cursor()
+        c.execute(query, [after_id])
+        while True:
+            rows = c.fetchmany(self.batch_size)
+            if not rows:
+                return
+            yield from rows
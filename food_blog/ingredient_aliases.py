@@ -0,0 +1,41 @@
+from db_handler import DBConnection
+from lookup_cache import LookupCache
+from name_index import normalize_ingredient
+from custom_errors import AliasError
+
+
+class IngredientAliases:
+    """User-defined ingredient synonyms ("whole milk" -> milk) in the ingredient_alias table.
+
+    Aliases are stored normalized and take effect through LookupCache.resolve_ingredient(),
+    which the proposal queries and the ingredient checks go through.
+    """
+
+    def __init__(self, db: DBConnection):
+        self.db = db
+        self.lookup_cache = LookupCache.for_connection(db)
+
+    def add(self, alias, ingredient):
+        """Makes alias stand for ingredient (itself resolved, so it may be an alias too) and returns its id."""
+        self.lookup_cache.refresh()
+        key = normalize_ingredient(alias)
+        ingredient_name = self.lookup_cache.resolve_ingredient(ingredient)
+        if key == "" or ingredient_name is None:
+            raise AliasError
+        # Aliases win over normalized names, so one spelled like an ingredient ("Sugar") would hijack it.
+        if any(normalize_ingredient(x) == key for x in self.lookup_cache.ingredients()):
+            raise AliasError
+        ingredient_id = self.lookup_cache.ingredients()[ingredient_name]
+        self.db.conn.execute("""INSERT INTO ingredient_alias(alias, ingredient_id) VALUES (?,?)
+                             ON CONFLICT(alias) DO UPDATE SET ingredient_id = excluded.ingredient_id""",
+                             [key, ingredient_id])
+        self.db.conn.commit()
+        self.lookup_cache.add_alias(key, ingredient_id)
+        return ingredient_id
+
+    def aliases(self):
+        """Returns (alias, ingredient_name) pairs in alias order."""
+        result = self.db.conn.execute("""SELECT alias, ingredient_name FROM ingredient_alias a
+                                      JOIN ingredients i ON i.ingredient_id = a.ingredient_id
+                                      ORDER BY alias""")
+        return result.fetchall()
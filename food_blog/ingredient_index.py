@@ -0,0 +1,133 @@
+import heapq
+from typing import List
+from db_handler import DBConnection
+from lookup_cache import LookupCache
+
+
+class IngredientIndex:
+    """In-memory inverted index answering recipe proposals with set intersections.
+
+    Posting sets map ingredient_id -> recipe_ids and meal_id -> recipe_ids.
+    refresh() pulls only rows added since the last load (ids only grow in this schema)
+    and is skipped when neither this connection nor another one has written.
+    ingredient_counts holds the number of distinct ingredients each recipe needs,
+    which rank_recipes() uses to score partial matches.
+    """
+
+    def __init__(self, db: DBConnection):
+        self.db = db
+        self.ingredient_ids = {}
+        self.meal_ids = {}
+        self.recipe_names = {}
+        self.recipes_by_ingredient = {}
+        self.recipes_by_meal = {}
+        self.ingredient_counts = {}
+        self._last_ids = {'ingredients': 0, 'meals': 0, 'recipes': 0, 'quantity': 0, 'serve': 0}
+        self._seen_version = None
+        self.refresh()
+
+    def refresh(self):
+        version = (self.db.conn.execute("PRAGMA data_version").fetchone()[0], self.db.conn.total_changes)
+        if version == self._seen_version:
+            return
+        for name, ingredient_id in self._new_rows('ingredients', 'ingredient_id', 'ingredient_name, ingredient_id'):
+            self.ingredient_ids[name] = ingredient_id
+        for name, meal_id in self._new_rows('meals', 'meal_id', 'meal_name, meal_id'):
+            self.meal_ids[name] = meal_id
+        for recipe_id, name in self._new_rows('recipes', 'recipe_id', 'recipe_id, recipe_name'):
+            self.recipe_names[recipe_id] = name
+        for ingredient_id, recipe_id in self._new_rows('quantity', 'quantity_id', 'ingredient_id, recipe_id'):
+            posting = self.recipes_by_ingredient.setdefault(ingredient_id, set())
+            if recipe_id not in posting:
+                posting.add(recipe_id)
+                self.ingredient_counts[recipe_id] = self.ingredient_counts.get(recipe_id, 0) + 1
+        for meal_id, recipe_id in self._new_rows('serve', 'serve_id', 'meal_id, recipe_id'):
+            self.recipes_by_meal.setdefault(meal_id, set()).add(recipe_id)
+        self._seen_version = version
+
+    def propose_recipes(self, ingredients: List, meals: List):
+        self.refresh()
+        return [self.recipe_names[x] for x in self.matching_recipe_ids(ingredients, meals)]
+
+    def matching_recipe_ids(self, ingredients: List, meals: List):
+        ingredient_sets = [self.recipes_by_ingredient.get(self.ingredient_ids.get(x), set()) for x in set(ingredients)]
+        if not ingredient_sets:
+            return []
+        ingredient_sets.sort(key=len)
+        candidates = ingredient_sets[0].intersection(*ingredient_sets[1:])
+        # Meal postings are large, so probe them per candidate instead of building their union.
+        meal_sets = [self.recipes_by_meal.get(self.meal_ids.get(x), set()) for x in set(meals)]
+        return sorted(x for x in candidates if any(x in meal_set for meal_set in meal_sets))
+
+    def rank_recipes(self, ingredients: List, meals: List, k=10):
+        """Best k recipes by share of their ingredients on hand, then fewest missing.
+
+        Returns (recipe_name, matched, required) tuples. Only the posting lists of the
+        given ingredients are scanned, and a heap keeps the top k.
+        """
+        self.refresh()
+        matched = {}
+        for ingredient in set(ingredients):
+            for recipe_id in self.recipes_by_ingredient.get(self.ingredient_ids.get(ingredient), ()):
+                matched[recipe_id] = matched.get(recipe_id, 0) + 1
+        meal_sets = [self.recipes_by_meal.get(self.meal_ids.get(x), set()) for x in set(meals)]
+        candidates = (x for x in matched if any(x in meal_set for meal_set in meal_sets))
+
+        def score(recipe_id):
+            required = self.ingredient_counts[recipe_id]
+            return matched[recipe_id] / required, matched[recipe_id] - required, -recipe_id
+
+        best = heapq.nlargest(k, candidates, key=score)
+        return [(self.recipe_names[x], matched[x], self.ingredient_counts[x]) for x in best]
+
+    def _new_rows(self, table, id_column, columns):
+        c = self.db.conn.cursor()
+        result = c.execute(f"SELECT {columns}, {id_column} FROM {table} WHERE {id_column} > ? ORDER BY {id_column}",
+                           [self._last_ids[table]])
+        for row in result:
+            self._last_ids[table] = row[-1]
+            yield row[:-1]
+
+
+class QuantityScanRanker:
+    """rank_recipes() of IngredientIndex answered by SQL, for one-off queries that don't justify loading the index.
+
+    Matched counts come from an index seek on quantity(ingredient_id, recipe_id) per query
+    ingredient, the required count from a seek on quantity(recipe_id) per candidate, and a
+    heap keeps the top k as rows stream in. Only recipes sharing an ingredient with the query are read.
+    """
+
+    def __init__(self, db: DBConnection):
+        self.db = db
+
+    def rank_recipes(self, ingredients: List, meals: List, k=10):
+        """Same scoring and result as IngredientIndex.rank_recipes()."""
+        lookup_cache = LookupCache.for_connection(self.db)
+        lookup_cache.refresh()
+        ingredient_ids = lookup_cache.ingredients()
+        query_ids = sorted({ingredient_ids[x] for x in ingredients if x in ingredient_ids})
+        known_meals = dict(self.db.conn.execute("SELECT meal_name, meal_id FROM meals"))
+        meal_ids = sorted({known_meals[x] for x in meals if x in known_meals})
+        if not query_ids or not meal_ids or k <= 0:
+            return []
+        rows = self.db.conn.execute(self.ranking_query(len(query_ids), len(meal_ids)), query_ids + meal_ids)
+
+        def score(row):
+            recipe_id, matched, required = row
+            return matched / required, matched - required, -recipe_id
+
+        best = heapq.nlargest(k, rows, key=score)
+        names = dict(self.db.conn.execute(
+            f"SELECT recipe_id, recipe_name FROM recipes WHERE recipe_id IN ({', '.join('?' for _ in best)})",
+            [x[0] for x in best]))
+        return [(names[recipe_id], matched, required) for recipe_id, matched, required in best]
+
+    @staticmethod
+    def ranking_query(ingredient_count, meal_count):
+        return f"""SELECT m.recipe_id, m.matched,
+                   (SELECT COUNT(DISTINCT q.ingredient_id) FROM quantity q WHERE q.recipe_id = m.recipe_id) AS required
+                   FROM (SELECT recipe_id, COUNT(DISTINCT ingredient_id) AS matched FROM quantity
+                         WHERE ingredient_id IN ({', '.join('?' for _ in range(ingredient_count))})
+                         GROUP BY recipe_id) m
+                   WHERE EXISTS (SELECT 1 FROM serve s WHERE s.recipe_id = m.recipe_id
+                                 AND s.meal_id IN ({', '.join('?' for _ in range(meal_count))}))"""
@@ -0,0 +1,172 @@
+import atexit
+import functools
+import json
+import random
+import signal
+import sys
+import threading
+import time
+
+# Kept per metric; beyond this many calls percentiles come from a uniform reservoir sample.
+SAMPLE_SIZE = 10000
+
+_enabled = False
+_metrics = {}
+# Reentrant: the report signal handler runs on the main thread, possibly while _record() holds it.
+_lock = threading.RLock()
+
+
+class Metric:
+    """Call count, rows touched and latencies of one instrumented call site."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.samples = []
+        self._rng = random.Random(0)
+
+    def record(self, seconds, rows):
+        self.calls += 1
+        self.rows += rows
+        self.seconds += seconds
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            slot = self._rng.randrange(self.calls)
+            if slot < SAMPLE_SIZE:
+                self.samples[slot] = seconds
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        return {"name": self.name, "calls": self.calls, "rows": self.rows, "total_ms": self.seconds * 1000,
+                "mean_ms": self.seconds / self.calls * 1000 if self.calls else 0.0,
+                "p50_ms": self.percentile(0.50) * 1000, "p90_ms": self.percentile(0.90) * 1000,
+                "p99_ms": self.percentile(0.99) * 1000}
+
+
+def instrumented(name, rows=None):
+    """Records every call of a method of an object with a .db connection.
+
+    rows says how rows touched are counted: "rowcount" uses the rowcount of the object's
+    cursor self.c (INSERT/UPDATE/DELETE, not counting rows written by triggers), "result"
+    the length of the returned collection (SELECT).
+    While instrumentation is disabled the wrapper costs one global lookup per call.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not _enabled:
+                return func(self, *args, **kwargs)
+            start = time.perf_counter()
+            result = None
+            try:
+                result = func(self, *args, **kwargs)
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                if rows == "rowcount":
+                    touched = max(self.c.rowcount, 0)
+                elif rows == "result" and result is not None:
+                    touched = len(result)
+                else:
+                    touched = 0
+                _record(name, seconds, touched)
+        return wrapper
+    return decorate
+
+
+def instrumented_stream(name):
+    """instrumented() for generator methods: records the time from the first item until the
+    stream is exhausted or closed (including the caller's work between items) and the
+    number of items yielded."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not _enabled:
+                return func(self, *args, **kwargs)
+            return _timed_stream(name, func(self, *args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def _timed_stream(name, stream):
+    start = time.perf_counter()
+    yielded = 0
+    try:
+        for item in stream:
+            yielded += 1
+            yield item
+    finally:
+        _record(name, time.perf_counter() - start, yielded)
+
+
+def _record(name, seconds, rows):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Metric(name)
+        metric.record(seconds, rows)
+
+
+def enable(json_path=None, report_signal=None, stream=None):
+    """Starts recording. At exit (and on report_signal, e.g. signal.SIGUSR1) the text
+    report goes to stream (stderr by default) and the JSON report to json_path, if given."""
+    global _enabled
+    _enabled = True
+
+    def dump(*_):
+        write_reports(json_path, stream)
+
+    atexit.register(dump)
+    if report_signal is not None:
+        signal.signal(report_signal, dump)
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def snapshot():
+    with _lock:
+        return [_metrics[name].summary() for name in sorted(_metrics)]
+
+
+def report_json():
+    return json.dumps({"metrics": snapshot()}, indent=2)
+
+
+def report_text():
+    metrics = snapshot()
+    if not metrics:
+        return "No instrumented calls recorded."
+    width = max(len(x["name"]) for x in metrics)
+    lines = [f"{'call':<{width}} {'calls':>8} {'rows':>9} {'total ms':>10} {'p50 ms':>9} {'p90 ms':>9} "
+             f"{'p99 ms':>9}"]
+    for x in metrics:
+        lines.append(f"{x['name']:<{width}} {x['calls']:>8} {x['rows']:>9} {x['total_ms']:>10.3f} "
+                     f"{x['p50_ms']:>9.3f} {x['p90_ms']:>9.3f} {x['p99_ms']:>9.3f}")
+    return "\n".join(lines)
+
+
+def write_reports(json_path=None, stream=None):
+    print(report_text(), file=stream or sys.stderr)
+    if json_path is not None:
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(report_json() + "\n")
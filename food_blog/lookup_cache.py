@@ -0,0 +1,132 @@
+import weakref
+from db_handler import DBConnection
+from name_index import PrefixTrie, SubstringIndex, normalize_ingredient
+from instrumentation import instrumented
+
+_caches = weakref.WeakKeyDictionary()
+
+
+class LookupCache:
+    """name -> id maps for measures and ingredients, loaded once per connection.
+
+    Code that inserts measures, ingredients or aliases through the same connection must
+    call add_ingredient()/add_alias()/invalidate() so the next lookup sees the change.
+    Commits from other connections or processes are picked up by refresh(), which callers
+    run once per request (proposal, recipe entry, import), not per lookup.
+    """
+
+    def __init__(self, db: DBConnection):
+        # Weak, so the per-connection registry entry doesn't keep its own connection alive.
+        self._db = weakref.ref(db)
+        self._measure_ids = None
+        self._ingredient_ids = None
+        self._measure_trie = None
+        self._ingredient_substrings = None
+        self._canonical_ids = None
+        self._ingredient_names = None
+        self._seen_version = self._data_version()
+
+    @property
+    def db(self) -> DBConnection:
+        return self._db()
+
+    @staticmethod
+    def for_connection(db: DBConnection):
+        cache = _caches.get(db)
+        if cache is None:
+            cache = LookupCache(db)
+            _caches[db] = cache
+        return cache
+
+    def refresh(self):
+        """Drops the maps if another connection committed since the last check, as IngredientIndex does."""
+        version = self._data_version()
+        if version != self._seen_version:
+            self.invalidate()
+            self._seen_version = version
+
+    def measures(self):
+        if self._measure_ids is None:
+            self._measure_ids = self._load('measures', 'measure_name', 'measure_id')
+        return self._measure_ids
+
+    def ingredients(self):
+        if self._ingredient_ids is None:
+            self._ingredient_ids = self._load('ingredients', 'ingredient_name', 'ingredient_id')
+        return self._ingredient_ids
+
+    def measure_trie(self):
+        if self._measure_trie is None:
+            self._measure_trie = PrefixTrie(self.measures())
+        return self._measure_trie
+
+    def ingredient_substrings(self):
+        if self._ingredient_substrings is None:
+            self._ingredient_substrings = SubstringIndex(self.ingredients())
+        return self._ingredient_substrings
+
+    def canonical_ingredients(self):
+        """Normalized ingredient names and aliases -> ingredient_id. Aliases win over names that normalize alike."""
+        if self._canonical_ids is None:
+            canonical = {}
+            for name, ingredient_id in self.ingredients().items():
+                # Of two names that normalize alike ("egg", "eggs") the older one is kept.
+                canonical.setdefault(normalize_ingredient(name), ingredient_id)
+            canonical.update(self._load_aliases())
+            self._canonical_ids = canonical
+        return self._canonical_ids
+
+    def ingredient_names(self):
+        if self._ingredient_names is None:
+            self._ingredient_names = {ingredient_id: name for name, ingredient_id in self.ingredients().items()}
+        return self._ingredient_names
+
+    def resolve_ingredient(self, name):
+        """Returns the ingredient name that name stands for, or None. An exact name wins, then an alias,
+        then the normalized form ("Strawberries" -> "strawberry")."""
+        canonical = self.canonical_ingredients()
+        if name in self.ingredients():
+            return name
+        ingredient_id = canonical.get(normalize_ingredient(name))
+        if ingredient_id is None:
+            return None
+        return self.ingredient_names()[ingredient_id]
+
+    def add_ingredient(self, name, ingredient_id):
+        if self._ingredient_ids is not None:
+            self._ingredient_ids[name] = ingredient_id
+        if self._canonical_ids is not None:
+            self._canonical_ids.setdefault(normalize_ingredient(name), ingredient_id)
+        if self._ingredient_names is not None:
+            self._ingredient_names[ingredient_id] = name
+        if self._ingredient_substrings is not None:
+            self._ingredient_substrings.insert(name)
+
+    def add_alias(self, alias, ingredient_id):
+        if self._canonical_ids is not None:
+            self._canonical_ids[normalize_ingredient(alias)] = ingredient_id
+
+    def invalidate(self):
+        self._measure_ids = None
+        self._ingredient_ids = None
+        self._measure_trie = None
+        self._ingredient_substrings = None
+        self._canonical_ids = None
+        self._ingredient_names = None
+
+    def _data_version(self):
+        # Changes on commits by any other connection, never on this connection's own.
+        return self.db.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    @instrumented("LookupCache.load", rows="result")
+    def _load(self, table, name_column, id_column):
+        result = self.db.conn.execute(f"SELECT {name_column}, {id_column} FROM {table} ORDER BY {id_column}")
+        return dict(result.fetchall())
+
+    @instrumented("LookupCache.load_aliases", rows="result")
+    def _load_aliases(self):
+        # Databases that were never migrated have no alias table.
+        result = self.db.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ingredient_alias'")
+        if result.fetchone() is None:
+            return {}
+        return dict(self.db.conn.execute("SELECT alias, ingredient_id FROM ingredient_alias").fetchall())
@@ -0,0 +1,104 @@
+from array import array
+
+
+def normalize_ingredient(name):
+    """Case-folds, collapses whitespace and strips a plural ending from the last word: " Blue  Berries" -> "blue berry".
+
+    The result is only a lookup key: stored names and user input both go through this
+    function, so a singular and its plural meet wherever the rules cover both
+    ("molasses" -> "molass" on either side). Irregular plurals (leaf/leaves) need an alias.
+    """
+    words = name.casefold().split()
+    if not words:
+        return ""
+    words[-1] = _singular(words[-1])
+    return " ".join(words)
+
+
+def _singular(word):
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    # "berries" and "cookies" are now "berrie" and "cookie"; a final "ie" becomes "y" so both meet their singular.
+    if len(word) > 2 and word.endswith("ie"):
+        word = word[:-2] + "y"
+    return word
+
+
+class PrefixTrie:
+    """Finds names starting with a prefix without scanning every name."""
+
+    _END = None
+
+    def __init__(self, names=()):
+        self._root = {}
+        for name in names:
+            self.insert(name)
+
+    def insert(self, name):
+        node = self._root
+        for char in name:
+            node = node.setdefault(char, {})
+        node[self._END] = name
+
+    def starting_with(self, prefix, limit=None):
+        node = self._root
+        for char in prefix:
+            if char not in node:
+                return []
+            node = node[char]
+        found = []
+        stack = [node]
+        while stack and (limit is None or len(found) < limit):
+            node = stack.pop()
+            for key, child in node.items():
+                if key is self._END:
+                    found.append(child)
+                else:
+                    stack.append(child)
+        return found if limit is None else found[:limit]
+
+
+class SubstringIndex:
+    """Postings of every 1-, 2- and 3-character substring (n-gram) of the names.
+
+    A fragment of up to three characters is answered straight from its posting; a longer
+    one is checked against the names in the shortest posting among its trigrams. Memory
+    grows with the total length of the names, and insert() adds a name in place.
+    """
+
+    GRAM = 3
+
+    def __init__(self, names=()):
+        self._names = []
+        self._postings = {}
+        for name in names:
+            self.insert(name)
+
+    def insert(self, name):
+        owner = len(self._names)
+        self._names.append(name)
+        grams = {name[i:i + n] for n in range(1, self.GRAM + 1) for i in range(len(name) - n + 1)}
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('l')
+            posting.append(owner)
+
+    def containing(self, fragment, limit=None):
+        if fragment == "":
+            return self._names if limit is None else self._names[:limit]
+        if len(fragment) <= self.GRAM:
+            candidates = self._postings.get(fragment, ())
+        else:
+            candidates = min((self._postings.get(fragment[i:i + self.GRAM], ())
+                              for i in range(len(fragment) - self.GRAM + 1)), key=len)
+        found = []
+        for owner in candidates:
+            name = self._names[owner]
+            if len(fragment) <= self.GRAM or fragment in name:
+                found.append(name)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
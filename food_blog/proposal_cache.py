@@ -0,0 +1,70 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List
+from db_handler import DBConnection
+
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def _database_key(db: DBConnection):
+    if db.db_name == ":memory:":
+        return ":memory:"
+    return os.path.abspath(db.db_name)
+
+
+def bump_generation(db: DBConnection):
+    with _generations_lock:
+        key = _database_key(db)
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+def current_generation(db: DBConnection):
+    return _generations.get(_database_key(db), 0)
+
+
+class ProposalCache:
+    """Size-bounded LRU cache of proposal results keyed on the normalized ingredient and meal sets.
+
+    An entry is valid while both the database's write generation (bumped by RecipesDBStore)
+    and the reading connection's PRAGMA data_version (bumped by commits from any other
+    connection or process) are unchanged.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(ingredients: List, meals: List):
+        return tuple(sorted(set(ingredients))), tuple(sorted(set(meals)))
+
+    def get_or_compute(self, db: DBConnection, ingredients: List, meals: List, compute):
+        key = self.key(ingredients, meals)
+        version = (current_generation(db), db.conn.execute("PRAGMA data_version").fetchone()[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._entries[key] = (version, list(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
@@ -0,0 +1,125 @@
+import json
+import os
+import socketserver
+from argparse import Namespace
+from blog import OptionalArguments
+from db_handler import DBConnection
+from ingredient_index import IngredientIndex
+from proposal_cache import ProposalCache
+from snapshot import SnapshotReader
+from custom_errors import ServerRequestError, UserIngredientError, UserMealError, NoIngredientsError, NoMealsError
+
+
+class ProposalServer:
+    """Answers recipe proposal requests from one warm connection.
+
+    The line protocol is one JSON object per line in each direction:
+    {"ingredients": "milk,sugar", "meals": "breakfast"} -> {"recipes": ["Milkshake"]} or {"error": "..."}.
+    Adding "top": k ranks partial matches instead: {"ranked": [{"name": ..., "matched": 2, "required": 3}, ...]}.
+    {"stats": true} returns the result cache counters.
+    With a SnapshotReader, every request is answered from its current in-memory snapshot.
+    """
+
+    def __init__(self, db: DBConnection, index: IngredientIndex = None, cache: ProposalCache = None,
+                 snapshot: SnapshotReader = None):
+        self.db = db
+        self.index = index
+        self.cache = cache
+        self.snapshot = snapshot
+        self._ranking_index = index
+
+    def answer(self, line):
+        try:
+            args = self._parse(line)
+            if args is None:
+                return json.dumps({"stats": self.cache.stats() if self.cache is not None else None})
+            if args.top is not None:
+                return json.dumps({"ranked": self.rank(args)})
+            return json.dumps({"recipes": self.propose(args)})
+        except (ServerRequestError, UserIngredientError, UserMealError, NoIngredientsError, NoMealsError) as e:
+            return json.dumps({"error": str(e)})
+
+    def propose(self, args):
+        self._use_current_snapshot()
+        optional_args = self._checked(args)
+        if self.index is not None:
+            return self.index.propose_recipes(optional_args.resolved_ingredients(), args.meals.split(','))
+        return optional_args.propose_recipes()
+
+    def rank(self, args):
+        self._use_current_snapshot()
+        optional_args = self._checked(args)
+        # Ranking always needs posting lists; build them on first use when the server runs without --index.
+        if self._ranking_index is None:
+            self._ranking_index = IngredientIndex(self.db)
+        ranked = optional_args.rank_recipes(self._ranking_index, args.top)
+        return [{"name": name, "matched": matched, "required": required} for name, matched, required in ranked]
+
+    def serve_stream(self, infile, outfile):
+        for line in infile:
+            if line.strip() == "":
+                continue
+            outfile.write(self.answer(line) + "\n")
+            outfile.flush()
+
+    def serve_socket(self, path):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw_line in self.rfile:
+                    line = raw_line.decode("utf-8")
+                    if line.strip() == "":
+                        continue
+                    self.wfile.write((server.answer(line) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        # Requests are handled one connection at a time because they share a single sqlite3 connection.
+        with socketserver.UnixStreamServer(path, Handler) as unix_server:
+            try:
+                unix_server.serve_forever()
+            finally:
+                os.unlink(path)
+
+    def _use_current_snapshot(self):
+        if self.snapshot is None:
+            return
+        db, index = self.snapshot.view()
+        if db is self.db:
+            return
+        self.db = db
+        # Indexes belong to the connection they were loaded from. The reloader builds one with each
+        # snapshot when given IngredientIndex as derive; otherwise it is rebuilt here.
+        if self.index is not None:
+            self.index = index if index is not None else IngredientIndex(self.db)
+        self._ranking_index = self.index if self.index is not None else index
+
+    def _checked(self, args):
+        optional_args = OptionalArguments(self.db, args, self.cache)
+        optional_args.check_if_both_args_provided()
+        optional_args.check_user_ingredients()
+        optional_args.check_user_meals()
+        return optional_args
+
+    @staticmethod
+    def _parse(line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            raise ServerRequestError
+        if not isinstance(request, dict):
+            raise ServerRequestError
+        if request.get("stats") is True:
+            return None
+        ingredients = request.get("ingredients")
+        meals = request.get("meals")
+        if ingredients is None and meals is None:
+            raise ServerRequestError
+        top = request.get("top")
+        if not isinstance(ingredients, (str, type(None))) or not isinstance(meals, (str, type(None))):
+            raise ServerRequestError
+        if top is not None and (not isinstance(top, int) or isinstance(top, bool) or top < 1):
+            raise ServerRequestError
+        return Namespace(ingredients=ingredients, meals=meals, top=top)
@@ -0,0 +1,53 @@
+import re
+from typing import List
+from db_handler import DBConnection
+from custom_errors import SearchError, SearchUnavailableError, PaginationError
+
+
+class RecipeSearch:
+    """Keyword search over recipe names and descriptions through the recipe_search FTS5 index.
+
+    Every keyword must match (as a word prefix, so "pancake" also finds "pancakes").
+    Results are ranked by BM25 with name matches weighted above description matches.
+    """
+
+    NAME_WEIGHT = 10.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    def __init__(self, db: DBConnection):
+        self.db = db
+
+    def available(self):
+        result = self.db.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_search'")
+        return result.fetchone() is not None
+
+    @staticmethod
+    def match_expression(text):
+        """Turns free text into an FTS5 query; quoting each word keeps FTS5 operators in the text inert."""
+        words = re.findall(r"\w+", text)
+        if not words:
+            raise SearchError
+        return " ".join(f'"{word}"*' for word in words)
+
+    def search(self, text, meals: List = None, limit=20):
+        """Returns (recipe_id, recipe_name, score) tuples, best match first; lower BM25 scores are better."""
+        if not self.available():
+            raise SearchUnavailableError
+        if limit is not None and limit < 0:
+            raise PaginationError
+        params = [self.NAME_WEIGHT, self.DESCRIPTION_WEIGHT, self.match_expression(text)]
+        meal_filter = ""
+        if meals:
+            meal_filter = f"""AND r.recipe_id IN (SELECT s.recipe_id FROM serve s
+                              JOIN meals m ON m.meal_id = s.meal_id
+                              WHERE meal_name IN ({', '.join("?" for _ in meals)}))"""
+            params.extend(meals)
+        params.append(-1 if limit is None else limit)
+        result = self.db.conn.execute(f"""SELECT r.recipe_id, r.recipe_name, bm25(recipe_search, ?, ?) AS score
+                                      FROM recipe_search
+                                      JOIN recipes r ON r.recipe_id = recipe_search.rowid
+                                      WHERE recipe_search MATCH ?
+                                      {meal_filter}
+                                      ORDER BY score, r.recipe_id
+                                      LIMIT ?""", params)
+        return result.fetchall()
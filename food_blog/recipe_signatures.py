@@ -0,0 +1,143 @@
+import sys
+import weakref
+from array import array
+from typing import List
+from db_handler import DBConnection
+
+_signatures = weakref.WeakKeyDictionary()
+
+
+def encode_ingredient_ids(ingredient_ids):
+    ids = array('q', sorted(set(ingredient_ids)))
+    # Stored little-endian so database files stay portable.
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def decode_ingredient_ids(blob):
+    ids = array('q')
+    ids.frombytes(blob)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+def meal_mask(meal_ids):
+    mask = 0
+    for meal_id in meal_ids:
+        mask |= 1 << (meal_id - 1)
+    return mask
+
+
+class RecipeSignatures:
+    """One recipe_signature row per recipe: its sorted ingredient ids as a blob and its meals as a bitmask.
+
+    "Can I cook it" then reads a single row instead of joining quantity, ingredients and
+    serve. RecipesDBStore keeps the rows current through add_ingredients()/add_meals(),
+    inside the caller's transaction. Signatures only ever grow; after deleting serve or
+    quantity rows, or on databases written by other tools, rebuild() recomputes them.
+    Meal ids must be between 1 and 63 to fit the mask.
+    """
+
+    def __init__(self, db: DBConnection):
+        # Weak, so the per-connection registry entry doesn't keep its own connection alive.
+        self._db = weakref.ref(db)
+        self._available = False
+
+    @property
+    def db(self) -> DBConnection:
+        return self._db()
+
+    @staticmethod
+    def for_connection(db: DBConnection):
+        signatures = _signatures.get(db)
+        if signatures is None:
+            signatures = RecipeSignatures(db)
+            _signatures[db] = signatures
+        return signatures
+
+    def available(self):
+        # Only a positive answer is kept: the table can appear when the database is migrated.
+        if not self._available:
+            result = self.db.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_signature'")
+            self._available = result.fetchone() is not None
+        return self._available
+
+    def add_ingredients(self, pairs):
+        """Merges (recipe_id, ingredient_id) pairs into the signatures."""
+        if not self.available():
+            return
+        added = {}
+        for recipe_id, ingredient_id in pairs:
+            added.setdefault(recipe_id, set()).add(ingredient_id)
+        current = self._current_ingredient_ids(list(added))
+        rows = [(recipe_id, encode_ingredient_ids(ingredient_ids.union(current.get(recipe_id, ()))))
+                for recipe_id, ingredient_ids in added.items()]
+        self.db.conn.executemany("""INSERT INTO recipe_signature(recipe_id, ingredient_ids, meal_mask) VALUES (?,?,0)
+                                 ON CONFLICT(recipe_id) DO UPDATE SET ingredient_ids = excluded.ingredient_ids""",
+                                 rows)
+
+    def add_meals(self, pairs):
+        """Merges (recipe_id, meal_id) pairs into the signatures."""
+        if not self.available():
+            return
+        added = {}
+        for recipe_id, meal_id in pairs:
+            added[recipe_id] = added.get(recipe_id, 0) | meal_mask([meal_id])
+        # The mask merges in SQL, so no read is needed.
+        self.db.conn.executemany("""INSERT INTO recipe_signature(recipe_id, ingredient_ids, meal_mask) VALUES (?,x'',?)
+                                 ON CONFLICT(recipe_id) DO UPDATE SET meal_mask = meal_mask | excluded.meal_mask""",
+                                 added.items())
+
+    def rebuild(self):
+        """Recomputes every signature from quantity and serve; the caller commits. Returns the row count."""
+        c = self.db.conn.cursor()
+        c.execute("DELETE FROM recipe_signature")
+        ingredient_ids = {}
+        for recipe_id, ingredient_id in c.execute("SELECT recipe_id, ingredient_id FROM quantity"):
+            ingredient_ids.setdefault(recipe_id, set()).add(ingredient_id)
+        masks = {}
+        for recipe_id, meal_id in c.execute("SELECT recipe_id, meal_id FROM serve"):
+            masks[recipe_id] = masks.get(recipe_id, 0) | meal_mask([meal_id])
+        recipe_ids = sorted(set(ingredient_ids).union(masks))
+        c.executemany("INSERT INTO recipe_signature(recipe_id, ingredient_ids, meal_mask) VALUES (?,?,?)",
+                      ((x, encode_ingredient_ids(ingredient_ids.get(x, ())), masks.get(x, 0)) for x in recipe_ids))
+        return len(recipe_ids)
+
+    def can_cook(self, recipe_id, pantry_ids, meal_ids: List = None):
+        """True if every ingredient of the recipe is in pantry_ids and, if meal_ids are given,
+        the recipe is served at one of them."""
+        row = self.db.conn.execute("SELECT ingredient_ids, meal_mask FROM recipe_signature WHERE recipe_id = ?",
+                                   [recipe_id]).fetchone()
+        if row is None:
+            return False
+        if meal_ids is not None and row[1] & meal_mask(meal_ids) == 0:
+            return False
+        pantry = set(pantry_ids)
+        return all(x in pantry for x in decode_ingredient_ids(row[0]))
+
+    def cookable_recipes(self, pantry_ids, meal_ids: List = None):
+        """Returns (recipe_id, recipe_name) of every recipe that needs only pantry ingredients, in recipe_id order."""
+        pantry = set(pantry_ids)
+        # Without meals every recipe counts, including those served at none (imports allow "meals": []).
+        meal_filter = "WHERE meal_mask & ? != 0" if meal_ids is not None else ""
+        params = [meal_mask(meal_ids)] if meal_ids is not None else []
+        result = self.db.conn.execute(f"""SELECT s.recipe_id, recipe_name, ingredient_ids FROM recipe_signature s
+                                      JOIN recipes r ON r.recipe_id = s.recipe_id
+                                      {meal_filter}
+                                      ORDER BY s.recipe_id""", params)
+        return [(recipe_id, name) for recipe_id, name, blob in result
+                if all(x in pantry for x in decode_ingredient_ids(blob))]
+
+    def _current_ingredient_ids(self, recipe_ids):
+        current = {}
+        # Chunked to stay under SQLite's limit on bound parameters.
+        for start in range(0, len(recipe_ids), 500):
+            chunk = recipe_ids[start:start + 500]
+            result = self.db.conn.execute(f"""SELECT recipe_id, ingredient_ids FROM recipe_signature
+                                          WHERE recipe_id IN ({', '.join("?" for _ in chunk)})""", chunk)
+            for recipe_id, blob in result:
+                current[recipe_id] = decode_ingredient_ids(blob)
+        return current
@@ -0,0 +1,273 @@
+import heapq
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from db_handler import DBConnection, Data
+from blog import RecipesDBStore, OptionalArguments
+from bulk_import import RecipeImporter
+from lookup_cache import LookupCache
+from instrumentation import instrumented
+from custom_errors import ShardError, PaginationError
+
+# Replicated to every shard with the same ids, so each shard resolves names on its own.
+DICTIONARY_TABLES = [("meals", "meal_id", "meal_name"), ("ingredients", "ingredient_id", "ingredient_name"),
+                     ("measures", "measure_id", "measure_name")]
+
+
+class ShardedCatalogue:
+    """Recipes hash-partitioned over several SQLite files listed in a JSON manifest.
+
+    A recipe and its serve and quantity rows live in shard recipe_id % N. Every shard
+    holds the full meals, ingredients and measures dictionaries, so each one answers the
+    proposal query by itself: propose_recipes() runs it on all shards in a thread pool
+    (sqlite3 releases the GIL while a query runs) and merges the results by recipe_id.
+    Writes commit shard by shard, so a failure can leave a batch half written;
+    recipe ids are allocated in this process, so only one process may write at a time.
+    """
+
+    def __init__(self, manifest_path, profile="default"):
+        self.manifest_path = manifest_path
+        self.profile = profile
+        self.generation, self.paths = self.read_manifest(manifest_path)
+        self.shards = [self._open(path, profile) for path in self.paths]
+        self.stores = [RecipesDBStore(db) for db in self.shards]
+        self._executor = None
+
+    @classmethod
+    def create(cls, manifest_path, shard_count, profile="default"):
+        if shard_count < 1:
+            raise ShardError
+        paths = cls.shard_paths(manifest_path, shard_count, 0)
+        for path in paths:
+            cls._open(path, profile).close()
+        cls.write_manifest(manifest_path, 0, paths)
+        return cls(manifest_path, profile)
+
+    @staticmethod
+    def shard_paths(manifest_path, shard_count, generation):
+        stem = os.path.splitext(manifest_path)[0]
+        return [f"{stem}-g{generation}-shard{number}.db" for number in range(shard_count)]
+
+    @staticmethod
+    def read_manifest(manifest_path):
+        """Returns (generation, shard paths); relative paths are taken from the manifest's directory."""
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            generation = int(manifest["generation"])
+            paths = [os.path.join(os.path.dirname(manifest_path), x) for x in manifest["shards"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            raise ShardError
+        if not paths:
+            raise ShardError
+        return generation, paths
+
+    @staticmethod
+    def write_manifest(manifest_path, generation, paths):
+        directory = os.path.dirname(manifest_path)
+        manifest = {"generation": generation, "shards": [os.path.relpath(x, directory or ".") for x in paths]}
+        # Written aside and renamed, so readers see either the old or the new manifest.
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    @property
+    def shard_count(self):
+        return len(self.shards)
+
+    def shard_of(self, recipe_id) -> DBConnection:
+        return self.shards[recipe_id % len(self.shards)]
+
+    def next_recipe_id(self):
+        return max(store.next_recipe_id() for store in self.stores)
+
+    def add_ingredient(self, name):
+        """Adds an ingredient to every shard under the same id and returns the id."""
+        try:
+            ingredient_id = self.shards[0].conn.execute(
+                "INSERT INTO ingredients(ingredient_name) VALUES (?)", [name]).lastrowid
+            for db in self.shards[1:]:
+                db.conn.execute("INSERT INTO ingredients(ingredient_id, ingredient_name) VALUES (?,?)",
+                                [ingredient_id, name])
+            for db in self.shards:
+                db.conn.commit()
+        except Exception:
+            self.rollback()
+            raise
+        for db in self.shards:
+            LookupCache.for_connection(db).add_ingredient(name, ingredient_id)
+        return ingredient_id
+
+    def write_recipes(self, recipe_rows, serve_rows, quantity_rows):
+        """Writes rows shaped like RecipesDBStore's batch methods take them to their shards and commits."""
+        _write_routed(self.shards, self.stores, recipe_rows, serve_rows, quantity_rows)
+
+    def rollback(self):
+        for db in self.shards:
+            if db.conn.in_transaction:
+                db.conn.rollback()
+
+    @instrumented("ShardedCatalogue.propose_recipes", rows="result")
+    def propose_recipes(self, ingredients: List, meals: List, limit=None, offset=0, after_id=None):
+        """Returns (recipe_id, recipe_name) of the recipes every shard proposes, in recipe_id order."""
+        if (limit is not None and limit < 0) or offset < 0 or (after_id is not None and after_id < 0):
+            raise PaginationError
+        # A page of the merged result comes from the first limit + offset rows of each shard.
+        query = OptionalArguments.proposal_query(ingredients, meals, after_id,
+                                                 None if limit is None else limit + offset)
+        params = ingredients + meals + ([after_id] if after_id is not None else [])
+
+        def propose(db):
+            return [(recipe_id, name) for recipe_id, name, _ in db.conn.execute(query, params)]
+
+        # Each shard's rows are already sorted by recipe_id and the ids are disjoint.
+        merged = heapq.merge(*self._pool().map(propose, self.shards))
+        return list(itertools.islice(merged, offset, None if limit is None else offset + limit))
+
+    def rebalance(self, shard_count, batch_size=1000):
+        """Moves every recipe into shard_count new shard files and switches the manifest to them.
+
+        The old files are only read until the new manifest is in place, so an interrupted
+        rebalance leaves the catalogue as it was; afterwards they are deleted.
+        Returns the number of recipes moved.
+        """
+        if shard_count < 1:
+            raise ShardError
+        generation = self.generation + 1
+        paths = self.shard_paths(self.manifest_path, shard_count, generation)
+        for path in paths:
+            # Left over from an interrupted rebalance.
+            _remove_database_file(path)
+        targets = [self._open(path, self.profile) for path in paths]
+        try:
+            for db in targets:
+                _copy_dictionaries(self.shards[0], db)
+                db.conn.commit()
+            stores = [RecipesDBStore(db) for db in targets]
+            moved = 0
+            for db in self.shards:
+                for recipe_rows, serve_rows, quantity_rows in _recipe_batches(db, batch_size):
+                    _write_routed(targets, stores, recipe_rows, serve_rows, quantity_rows)
+                    moved += len(recipe_rows)
+        finally:
+            for db in targets:
+                db.close()
+        self.write_manifest(self.manifest_path, generation, paths)
+        old_paths = self.paths
+        self.close()
+        for path in old_paths:
+            _remove_database_file(path)
+        self.generation, self.paths = generation, paths
+        self.shards = [self._open(path, self.profile) for path in paths]
+        self.stores = [RecipesDBStore(db) for db in self.shards]
+        return moved
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for db in self.shards:
+            db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard")
+        return self._executor
+
+    @staticmethod
+    def _open(path, profile):
+        # Shard queries run on the pool's threads.
+        db = DBConnection(path, profile, check_same_thread=False)
+        db.turn_on_foreign_keys()
+        Data(db).migrate()
+        return db
+
+
+class ShardedRecipeImporter(RecipeImporter):
+    """RecipeImporter that writes every batch across the shards of a ShardedCatalogue."""
+
+    def __init__(self, catalogue: ShardedCatalogue, batch_size=1000):
+        # Names are resolved on the first shard; the dictionaries are the same on all of them.
+        super().__init__(catalogue.shards[0], batch_size)
+        self.catalogue = catalogue
+
+    def _next_recipe_id(self):
+        return self.catalogue.next_recipe_id()
+
+    def _write_rows(self, recipe_rows, serve_rows, quantity_rows):
+        self.catalogue.write_recipes(recipe_rows, serve_rows, quantity_rows)
+
+    def _rollback(self):
+        self.catalogue.rollback()
+
+    def _ingredient_id(self, ingredient):
+        ingredient_ids = self.lookup_cache.ingredients()
+        if ingredient not in ingredient_ids:
+            self.catalogue.add_ingredient(ingredient)
+        return ingredient_ids[ingredient]
+
+
+def _write_routed(shards, stores, recipe_rows, serve_rows, quantity_rows):
+    routed = [([], [], []) for _ in shards]
+    for row in recipe_rows:
+        routed[row[0] % len(shards)][0].append(row)
+    for row in serve_rows:
+        routed[row[1] % len(shards)][1].append(row)
+    for row in quantity_rows:
+        routed[row[3] % len(shards)][2].append(row)
+    try:
+        for store, (recipes, serves, quantities) in zip(stores, routed):
+            if recipes or serves or quantities:
+                store.create_recipes(recipes)
+                store.create_serves(serves)
+                store.create_quantities(quantities)
+        for db in shards:
+            db.conn.commit()
+    except Exception:
+        for db in shards:
+            if db.conn.in_transaction:
+                db.conn.rollback()
+        raise
+
+
+def _copy_dictionaries(source: DBConnection, target: DBConnection):
+    # The target is a fresh shard: its seed rows are replaced so every id matches the source.
+    for table, id_column, name_column in DICTIONARY_TABLES:
+        rows = source.conn.execute(f"SELECT {id_column}, {name_column} FROM {table}").fetchall()
+        target.conn.execute(f"DELETE FROM {table}")
+        target.conn.executemany(f"INSERT INTO {table}({id_column}, {name_column}) VALUES (?,?)", rows)
+
+
+def _recipe_batches(db: DBConnection, batch_size):
+    """Yields (recipe rows, serve rows, quantity rows) of batch_size recipes at a time, in recipe_id order."""
+    after_id = -2 ** 63
+    while True:
+        recipe_rows = db.conn.execute("""SELECT recipe_id, recipe_name, recipe_description FROM recipes
+                                      WHERE recipe_id > ? ORDER BY recipe_id LIMIT ?""",
+                                      [after_id, batch_size]).fetchall()
+        if not recipe_rows:
+            return
+        bounds = [recipe_rows[0][0], recipe_rows[-1][0]]
+        serve_rows = db.conn.execute("SELECT meal_id, recipe_id FROM serve WHERE recipe_id BETWEEN ? AND ?",
+                                     bounds).fetchall()
+        quantity_rows = db.conn.execute("""SELECT measure_id, ingredient_id, quantity, recipe_id FROM quantity
+                                        WHERE recipe_id BETWEEN ? AND ? ORDER BY quantity_id""",
+                                        bounds).fetchall()
+        yield recipe_rows, serve_rows, quantity_rows
+        after_id = bounds[1]
+
+
+def _remove_database_file(path):
+    for name in (path, path + "-wal", path + "-shm", path + "-journal"):
+        if os.path.exists(name):
+            os.remove(name)
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+from db_handler import DBConnection
+from proposal_cache import bump_generation
+from custom_errors import SnapshotError
+
+
+class SnapshotReader:
+    """Serves reads from an in-memory copy of a database file.
+
+    The copy is made with the SQLite backup API, which reads the source in one transaction,
+    so a snapshot is always consistent. A background thread polls the source's PRAGMA
+    data_version and the file's mtime, size and inode (a replaced file is invisible to the
+    open handle), builds a fresh copy when any of them changes and swaps it in with a
+    single reference assignment. Readers take current() per request and never
+    wait for a reload; a replaced snapshot is closed once the last reader drops it.
+    derive, if given, builds read structures such as an IngredientIndex from every new
+    copy on the loading thread; view() returns the copy and its structure as one pair.
+    """
+
+    def __init__(self, db_name, poll_interval=1.0, derive=None):
+        if db_name == ":memory:" or db_name == "":
+            raise SnapshotError
+        self.db_name = db_name
+        self.poll_interval = poll_interval
+        self.derive = derive
+        self.reloads = 0
+        self._source = None
+        self._source_inode = None
+        self._source_state = None
+        self._view = self._load()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self) -> DBConnection:
+        return self._view[0]
+
+    def view(self):
+        """Returns (connection, derived structure or None), taken from the same load."""
+        return self._view
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="snapshot-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def changed(self):
+        try:
+            return self._state() != self._source_state
+        except FileNotFoundError:
+            # Mid-replacement; the next poll sees the new file.
+            return False
+
+    def refresh(self):
+        """Reloads if the source changed since the last load; returns whether it did."""
+        with self._reload_lock:
+            if not self.changed():
+                return False
+            view = self._load()
+            # Cached proposals carry the generation of the database they came from.
+            bump_generation(view[0])
+            self._view = view
+            self.reloads += 1
+            return True
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except (sqlite3.Error, OSError):
+                # The file may be mid-replacement; keep serving the current snapshot and retry.
+                continue
+
+    def _state(self):
+        stat = os.stat(self.db_name)
+        if self._source is None or stat.st_ino != self._source_inode:
+            return None
+        data_version = self._source.conn.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        stat = os.stat(self.db_name)
+        if self._source is None or stat.st_ino != self._source_inode:
+            # The file was replaced (or this is the first load): the old handle still sees the old file.
+            if self._source is not None:
+                self._source.close()
+            self._source = DBConnection(self.db_name, read_only=True, check_same_thread=False)
+            self._source_inode = stat.st_ino
+        # Taken before copying: a commit that lands during the backup shows up as a change on the next poll.
+        state = self._state()
+        snapshot = DBConnection(":memory:", check_same_thread=False)
+        self._source.conn.backup(snapshot.conn)
+        snapshot.turn_on_foreign_keys()
+        derived = self.derive(snapshot) if self.derive is not None else None
+        self._source_state = state
+        return snapshot, derived
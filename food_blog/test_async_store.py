@@ -0,0 +1,79 @@
+import asyncio
+import sqlite3
+from async_store import AsyncRecipeStore
+from blog import Recipe
+from db_handler import ConnectionPool, Data
+
+
+def make_pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "blog.db"), "performance")
+    with pool.writer() as db:
+        db.turn_on_foreign_keys()
+        Data(db).migrate()
+    return pool
+
+
+def test_create_recipe_and_propose(tmp_path):
+    pool = make_pool(tmp_path)
+
+    async def scenario():
+        async with AsyncRecipeStore(pool) as store:
+            ids = await asyncio.gather(
+                store.create_recipe(Recipe("milkshake", "Blend."), [1, 3], [(1, 1, 500), (4, 3, 1)]),
+                store.create_recipe(Recipe("hot cacao", "Mix."), [1], [(1, 1, 250), (5, 2, 2)]))
+            proposals = await store.propose(["milk"], ["breakfast"])
+            return ids, proposals
+
+    ids, proposals = asyncio.run(scenario())
+    assert ids == [1, 2]
+    assert proposals == ["milkshake", "hot cacao"]
+    assert pool.reader().conn.execute("SELECT COUNT(*) FROM quantity").fetchone() == (4,)
+    pool.close()
+
+
+def test_writes_are_coalesced(tmp_path):
+    pool = make_pool(tmp_path)
+    commits = []
+    pool._writer.conn.set_trace_callback(lambda statement: commits.append(statement) if statement == "COMMIT" else None)
+
+    async def scenario():
+        async with AsyncRecipeStore(pool, max_pending=100) as store:
+            return await asyncio.gather(*[store.create_recipe(Recipe(f"recipe {i}", ""), [1]) for i in range(50)])
+
+    assert asyncio.run(scenario()) == list(range(1, 51))
+    assert 0 < len(commits) < 50
+    pool.close()
+
+
+def test_failed_write_does_not_fail_neighbours(tmp_path):
+    pool = make_pool(tmp_path)
+
+    async def scenario():
+        async with AsyncRecipeStore(pool) as store:
+            good = store.create_recipe(Recipe("tea", "Brew."), [1])
+            bad = store.create_recipe(Recipe("ghost", "Nothing."), [99])
+            return await asyncio.gather(good, bad, return_exceptions=True)
+
+    good, bad = asyncio.run(scenario())
+    assert good == 1
+    assert isinstance(bad, sqlite3.IntegrityError)
+    assert pool.reader().conn.execute("SELECT recipe_name FROM recipes").fetchall() == [("tea",)]
+    pool.close()
+
+
+def test_backpressure_blocks_producers(tmp_path):
+    pool = make_pool(tmp_path)
+
+    async def scenario():
+        store = AsyncRecipeStore(pool, max_pending=2)
+        await store.start()
+        store._writer_task.cancel()
+        pending = [asyncio.ensure_future(store.create_recipe(Recipe(f"recipe {i}", ""), [1])) for i in range(3)]
+        await asyncio.sleep(0.01)
+        queued = store._queue.qsize()
+        for task in pending:
+            task.cancel()
+        return queued
+
+    assert asyncio.run(scenario()) == 2
+    pool.close()
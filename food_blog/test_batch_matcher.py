@@ -0,0 +1,57 @@
+import json
+import random
+from unittest.mock import Mock
+import pytest
+from batch_matcher import BitsetMatcher
+from blog import RecipesDBStore, OptionalArguments
+from custom_errors import ServerRequestError
+
+
+def test_bitsets(catalogue_db):
+    matcher = BitsetMatcher(catalogue_db)
+    assert matcher.ingredient_bits == {4: 0b001, 3: 0b101, 1: 0b110}
+    assert matcher.meal_bits == {1: 0b101, 4: 0b010, 3: 0b100}
+
+
+def test_match_many(catalogue_db):
+    matcher = BitsetMatcher(catalogue_db)
+    assert matcher.match_many([(["strawberry"], ["breakfast"]),
+                               (["milk", "strawberry"], ["lunch"]),
+                               (["milk"], ["supper", "breakfast"]),
+                               (["flour"], ["breakfast"]),
+                               (["strawberry"], ["breakfast"])]) == \
+        [["pancakes", "milkshake"], ["milkshake"], ["risotto", "milkshake"], [], ["pancakes", "milkshake"]]
+
+
+def test_match_agrees_with_sql(catalogue_db):
+    rng = random.Random(0)
+    rows = [(rng.randint(1, 8), rng.randint(1, 6), 1, rng.randint(1, 3)) for _ in range(200)]
+    RecipesDBStore(catalogue_db).create_quantities(rows)
+    RecipesDBStore(catalogue_db).create_serves([(rng.randint(1, 4), rng.randint(1, 3)) for _ in range(10)])
+    catalogue_db.conn.commit()
+    matcher = BitsetMatcher(catalogue_db)
+    names = ["milk", "cacao", "strawberry", "blueberry", "blackberry", "sugar"]
+    meals = ["breakfast", "brunch", "lunch", "supper"]
+    for _ in range(50):
+        query_ingredients = rng.sample(names, rng.randint(1, 3))
+        query_meals = rng.sample(meals, rng.randint(1, 2))
+        args = Mock(ingredients=",".join(query_ingredients), meals=",".join(query_meals))
+        assert matcher.match(query_ingredients, query_meals) == OptionalArguments(catalogue_db, args).propose_recipes()
+
+
+def test_match_file(tmp_path, catalogue_db):
+    in_path = tmp_path / "queries.jsonl"
+    out_path = tmp_path / "results.jsonl"
+    in_path.write_text('{"id": "a", "ingredients": "milk", "meals": "supper"}\n\n'
+                       '{"ingredients": ["strawberry"], "meals": ["breakfast"]}\n')
+    assert BitsetMatcher(catalogue_db).match_file(str(in_path), str(out_path)) == 2
+    assert [json.loads(x) for x in out_path.read_text().splitlines()] == \
+        [{"id": "a", "recipes": ["risotto"]}, {"recipes": ["pancakes", "milkshake"]}]
+
+    in_path.write_text('{"ingredients": "Milk,strawberries", "meals": "lunch"}\n')
+    BitsetMatcher(catalogue_db).match_file(str(in_path), str(out_path))
+    assert json.loads(out_path.read_text()) == {"recipes": ["milkshake"]}
+
+    in_path.write_text('{"ingredients": "milk"}\n')
+    with pytest.raises(ServerRequestError):
+        BitsetMatcher(catalogue_db).match_file(str(in_path), str(out_path))
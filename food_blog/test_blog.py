@@ -1,10 +1,12 @@
 import pytest
 from unittest.mock import Mock
 from blog import UserInputCollector, \
-    UserInputChecker, QuantityTableData, RecipesDBStore, OptionalArguments, Recipe, Serve
+    UserInputChecker, QuantityTableData, RecipesDBStore, OptionalArguments, Recipe, Serve, RecipeUnitOfWork
 from db_handler import DBConnection, Data
+from ingredient_index import IngredientIndex
 from custom_errors import MealNumberError, QuantityError, \
-    MeasureError, IngredientError, UserIngredientError, UserMealError, NoIngredientsError, NoMealsError
+    MeasureError, IngredientError, UserIngredientError, UserMealError, NoIngredientsError, NoMealsError, \
+    PaginationError
 
 
 def test_print_initial_instruction(capsys):
@@ -137,17 +139,6 @@ def test_check_ingredient():
     db.close()
 
 
-def test_column_to_list():
-    db = DBConnection(":memory:")
-    data = Data(db)
-    data.create_tables()
-    data.seed_tables()
-    checker = UserInputChecker(db, 1)
-    result = checker._column_to_list('measures', 'measure_id')
-    assert result == [1, 2, 3, 4, 5, 6, 7, 8]
-    db.close()
-
-
 def test_gather_measure_id():
     db = DBConnection(":memory:")
     data = Data(db)
@@ -252,6 +243,10 @@ def test_check_user_ingredients_valid():
 
 def test_check_user_ingredients_invalid():
     db = DBConnection(":memory:")
+    # Items with spaces are looked up as ingredient names and aliases.
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
     args = Mock(ingredients="flour sugar eggs")
     optional_args = OptionalArguments(db, args)
     with pytest.raises(UserIngredientError):
@@ -334,3 +329,166 @@ def test_inform_user(capsys):
     captured = capsys.readouterr()
     assert captured.out.strip() == "There are no such recipes in the database."
     db.close()
+
+
+def test_parse_recipe_info():
+    assert UserInputCollector.parse_recipe_info("1 ml milk") == ("1", "ml", "milk")
+    assert UserInputCollector.parse_recipe_info("10 strawberry") == ("10", "", "strawberry")
+
+
+def test_create_recipes_serves_quantities():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    recipes_db_store = RecipesDBStore(db)
+    assert recipes_db_store.next_recipe_id() == 1
+    recipes_db_store.create_recipes([(1, "pancakes", "Fry."), (2, "risotto", "Cook.")])
+    recipes_db_store.create_serves([(1, 1), (4, 2)])
+    recipes_db_store.create_quantities([(4, 4, 1, 1), (1, 1, 100, 2)])
+    db.conn.commit()
+    assert recipes_db_store.next_recipe_id() == 3
+    assert db.conn.execute("SELECT meal_id, recipe_id FROM serve").fetchall() == [(1, 1), (4, 2)]
+    assert db.conn.execute("SELECT measure_id, ingredient_id, quantity, recipe_id FROM quantity").fetchall() == \
+        [(4, 4, 1, 1), (1, 1, 100, 2)]
+    db.close()
+
+
+def test_propose_recipes_multiple_matching_meals():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "hot cacao", "Mix."), (2, "milkshake", "Blend.")])
+    recipes_db_store.create_serves([(1, 1), (2, 1), (1, 2)])
+    recipes_db_store.create_quantities([(1, 1, 250, 1), (5, 2, 2, 1), (1, 1, 500, 2), (5, 6, 1, 2)])
+    db.conn.commit()
+
+    # Hot cacao has no sugar, even though it joins two serve rows.
+    args = Mock(ingredients="sugar,milk", meals="breakfast,brunch")
+    assert OptionalArguments(db, args).propose_recipes() == ["milkshake"]
+
+    args = Mock(ingredients="milk", meals="breakfast,brunch")
+    assert OptionalArguments(db, args).propose_recipes() == ["hot cacao", "milkshake"]
+    db.close()
+
+
+def test_rank_recipes(capsys):
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "hot cacao", "Mix."), (2, "milkshake", "Blend.")])
+    recipes_db_store.create_serves([(1, 1), (1, 2)])
+    recipes_db_store.create_quantities([(1, 1, 250, 1), (5, 2, 2, 1), (1, 1, 500, 2), (5, 6, 1, 2), (4, 3, 1, 2)])
+    db.conn.commit()
+    args = Mock(ingredients="sugar,milk", meals="breakfast")
+    optional_args = OptionalArguments(db, args)
+    assert optional_args.rank_recipes(IngredientIndex(db), 5) == [("milkshake", 2, 3), ("hot cacao", 1, 2)]
+    optional_args.inform_user()
+    assert capsys.readouterr().out.strip() == "Recipes selected for you: milkshake (2/3), hot cacao (1/2)"
+    db.close()
+
+
+def test_unit_of_work_writes_recipe_in_one_transaction(monkeypatch, tmp_path):
+    db = DBConnection(str(tmp_path / "blog.db"))
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    inputs = ["500 ml milk", "1 cup strawberry", "x tbsp sugar", ""]
+    monkeypatch.setattr('builtins.input', lambda _: inputs.pop(0))
+    other = DBConnection(str(tmp_path / "blog.db"))
+    with RecipeUnitOfWork(db) as unit_of_work:
+        unit_of_work.add_recipe(Recipe("Milkshake", "Blend."))
+        unit_of_work.add_serve([1, 3])
+        UserInputChecker(db, None, unit_of_work).execute_checks()
+        # Nothing is visible, or even pending, before the block ends.
+        assert db.conn.in_transaction is False
+        assert other.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0] == 0
+    assert other.conn.execute("SELECT recipe_id, recipe_name FROM recipes").fetchall() == [(1, "Milkshake")]
+    assert other.conn.execute("SELECT meal_id, recipe_id FROM serve").fetchall() == [(1, 1), (3, 1)]
+    assert other.conn.execute("SELECT measure_id, ingredient_id, quantity, recipe_id FROM quantity").fetchall() == \
+        [(1, 1, 500, 1), (4, 3, 1, 1)]
+    other.close()
+    db.close()
+
+
+def test_unit_of_work_discards_on_exception():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    with pytest.raises(SystemExit):
+        with RecipeUnitOfWork(db) as unit_of_work:
+            unit_of_work.add_recipe(Recipe("Milkshake", "Blend."))
+            unit_of_work.add_serve([1])
+            unit_of_work.add_quantity(1, 1, 500)
+            exit()
+    assert db.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0] == 0
+    assert unit_of_work.quantities == []
+    db.close()
+
+
+def test_unit_of_work_rolls_back_failed_flush():
+    db = DBConnection(":memory:")
+    db.turn_on_foreign_keys()
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    unit_of_work = RecipeUnitOfWork(db)
+    unit_of_work.add_recipe(Recipe("Milkshake", "Blend."))
+    unit_of_work.add_serve([1])
+    unit_of_work.add_quantity(1, 99, 500)
+    with pytest.raises(Exception):
+        unit_of_work.flush()
+    assert db.conn.in_transaction is False
+    assert db.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0] == 0
+    assert db.conn.execute("SELECT COUNT(*) FROM serve").fetchone()[0] == 0
+    unit_of_work.add_recipe(Recipe("Hot cacao", "Mix."))
+    assert unit_of_work.flush() == 1
+    db.close()
+
+
+def test_stream_recipes_pages():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(n, f"shake {n}", "Blend.") for n in range(1, 11)])
+    recipes_db_store.create_serves([(1 + n % 2, n) for n in range(1, 11)])
+    recipes_db_store.create_quantities([(1, 1, 100, n) for n in range(1, 11) if n != 5])
+    db.conn.commit()
+    optional_args = OptionalArguments(db, Mock(ingredients="milk", meals="breakfast,brunch"))
+    stream = optional_args.stream_recipes(batch_size=2)
+    assert next(stream) == (1, "shake 1")
+    assert optional_args.last_recipe_id == 1
+    assert [x[0] for x in stream] == [2, 3, 4, 6, 7, 8, 9, 10]
+    assert [x[0] for x in optional_args.stream_recipes(limit=3)] == [1, 2, 3]
+    assert [x[0] for x in optional_args.stream_recipes(limit=3, after_id=3)] == [4, 6, 7]
+    assert [x[0] for x in optional_args.stream_recipes(limit=2, offset=1, after_id=3)] == [6, 7]
+    assert [x[0] for x in optional_args.stream_recipes(offset=8)] == [10]
+    optional_args = OptionalArguments(db, Mock(ingredients="milk", meals="brunch"))
+    assert [x[0] for x in optional_args.stream_recipes(after_id=4)] == [7, 9]
+    with pytest.raises(PaginationError):
+        next(optional_args.stream_recipes(limit=-1))
+    db.close()
+
+
+def test_inform_user_prints_incrementally(capsys):
+    db = DBConnection(":memory:")
+    optional_args = OptionalArguments(db, None)
+
+    def names():
+        yield "Recipe1"
+        # The first name is already out before the next one is produced.
+        assert capsys.readouterr().out == "Recipes selected for you: Recipe1"
+        yield "Recipe2"
+
+    assert optional_args.inform_user(names()) == 2
+    assert capsys.readouterr().out == ", Recipe2\n"
+    assert optional_args.inform_user(iter([])) == 0
+    assert capsys.readouterr().out.strip() == "There are no such recipes in the database."
+    db.close()
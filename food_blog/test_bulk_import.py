@@ -0,0 +1,129 @@
+import pytest
+from bulk_import import RecipeFileReader, RecipeImporter, ParallelRecipeImporter, ImportRecord
+from custom_errors import ImportFormatError, UnknownMealError, MeasureError, QuantityError, BatchSizeError
+
+
+@pytest.fixture
+def db(make_catalogue):
+    return make_catalogue([], [], [])
+
+
+def test_read_jsonl(tmp_path):
+    path = tmp_path / "recipes.jsonl"
+    path.write_text('{"name": "Milkshake", "description": "Blend.", "meals": ["breakfast"], '
+                    '"ingredients": ["500 ml milk", "1 cup strawberry"]}\n\n')
+    records = list(RecipeFileReader.read(str(path)))
+    assert len(records) == 1
+    assert records[0].name == "Milkshake"
+    assert records[0].meals == ["breakfast"]
+    assert records[0].ingredient_lines == ["500 ml milk", "1 cup strawberry"]
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "recipes.csv"
+    path.write_text('name,description,meals,ingredients\n'
+                    'Hot cacao,Mix.,breakfast brunch,250 ml milk; 2 tbsp cacao\n')
+    records = list(RecipeFileReader.read(str(path)))
+    assert records[0].name == "Hot cacao"
+    assert records[0].meals == ["breakfast", "brunch"]
+    assert records[0].ingredient_lines == ["250 ml milk", "2 tbsp cacao"]
+
+
+def test_read_invalid_format(tmp_path):
+    with pytest.raises(ImportFormatError):
+        RecipeFileReader.read(str(tmp_path / "recipes.txt"))
+    with pytest.raises(ImportFormatError):
+        RecipeFileReader.parse_jsonl_line('{"name": "Milkshake"}')
+
+
+def test_import_records(db):
+    records = [ImportRecord("Milkshake", "Blend.", ["breakfast", "supper"], ["500 ml milk", "1 honey"]),
+               ImportRecord("Hot cacao", "Mix.", ["brunch"], ["2 tbsp cacao"]),
+               ImportRecord("Honey milk", "Stir.", ["supper"], ["1 cup milk", "1 tsp honey"])]
+    stats = RecipeImporter(db, batch_size=2).import_records(records)
+    assert stats.recipes == 3
+    # 3 recipes, 4 serve rows, 5 quantity rows and 1 new ingredient.
+    assert stats.rows == 13
+    assert db.conn.execute("SELECT recipe_id, recipe_name FROM recipes").fetchall() == \
+        [(1, "Milkshake"), (2, "Hot cacao"), (3, "Honey milk")]
+    assert db.conn.execute("SELECT ingredient_id FROM ingredients WHERE ingredient_name = 'honey'").fetchone() == (7,)
+    assert db.conn.execute("SELECT measure_id, ingredient_id, quantity, recipe_id FROM quantity").fetchall() == \
+        [(1, 1, 500, 1), (8, 7, 1, 1), (5, 2, 2, 2), (4, 1, 1, 3), (6, 7, 1, 3)]
+
+
+def test_import_records_rolls_back_invalid_batch(db):
+    importer = RecipeImporter(db, batch_size=10)
+    with pytest.raises(UnknownMealError):
+        importer.import_records([ImportRecord("Milkshake", "Blend.", ["dinner"], ["500 ml milk"])])
+    with pytest.raises(MeasureError):
+        importer.import_records([ImportRecord("Milkshake", "Blend.", ["lunch"], ["500 gallon milk"])])
+    with pytest.raises(QuantityError):
+        importer.import_records([ImportRecord("Milkshake", "Blend.", ["lunch"], ["much honey"])])
+    assert db.conn.execute("SELECT COUNT(*) FROM recipes").fetchone() == (0,)
+    assert db.conn.execute("SELECT COUNT(*) FROM ingredients").fetchone() == (6,)
+
+
+def test_parallel_import_file(tmp_path, db):
+    path = tmp_path / "recipes.jsonl"
+    path.write_text("".join(
+        '{"name": "recipe %d", "meals": ["lunch"], "ingredients": ["%d g sugar", "1 spice%d"]}\n' % (i, i, i % 3)
+        for i in range(25)))
+    stats = ParallelRecipeImporter(db, batch_size=4, workers=2).import_file(str(path))
+    assert stats.recipes == 25
+    # 25 recipes, 25 serve rows, 50 quantity rows and 3 new ingredients.
+    assert stats.rows == 103
+    assert set(stats.stages) == {"read", "parse", "write"}
+    assert db.conn.execute("SELECT recipe_id, recipe_name FROM recipes ORDER BY recipe_id").fetchall() == \
+        [(i + 1, f"recipe {i}") for i in range(25)]
+    assert db.conn.execute("SELECT quantity FROM quantity WHERE ingredient_id = 6 ORDER BY recipe_id").fetchall() == \
+        [(i,) for i in range(25)]
+
+
+def test_parallel_import_invalid_record(tmp_path, db):
+    path = tmp_path / "recipes.csv"
+    path.write_text('name,description,meals,ingredients\n'
+                    'Tea,Brew.,breakfast,1 cup milk\n'
+                    'Coffee,Brew.,dinner,1 cup milk\n')
+    with pytest.raises(UnknownMealError):
+        ParallelRecipeImporter(db, batch_size=10, workers=2).import_file(str(path))
+    assert db.conn.execute("SELECT COUNT(*) FROM recipes").fetchone() == (0,)
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_parallel_import_rejects_empty_batches(tmp_path, db, batch_size):
+    path = tmp_path / "recipes.jsonl"
+    path.write_text('{"name": "Tea", "meals": ["breakfast"], "ingredients": ["1 cup milk"]}\n')
+    with pytest.raises(BatchSizeError):
+        ParallelRecipeImporter(db, batch_size=batch_size, workers=2).import_file(str(path))
+    with pytest.raises(BatchSizeError):
+        RecipeImporter(db, batch_size=batch_size)
+    assert db.conn.execute("SELECT COUNT(*) FROM recipes").fetchone() == (0,)
+
+
+class CountingImporter(ParallelRecipeImporter):
+
+    def __init__(self, db, batch_size, workers):
+        super().__init__(db, batch_size, workers)
+        self.read = 0
+        self.written = 0
+        self.most_ahead = 0
+
+    def _chunks(self, path, stages):
+        for chunk in super()._chunks(path, stages):
+            self.read += 1
+            yield chunk
+
+    def write_validated(self, batch):
+        self.most_ahead = max(self.most_ahead, self.read - self.written)
+        self.written += 1
+        return super().write_validated(batch)
+
+
+def test_parallel_import_bounds_chunks_in_flight(tmp_path, db):
+    path = tmp_path / "recipes.jsonl"
+    path.write_text("".join('{"name": "recipe %d", "meals": ["lunch"], "ingredients": ["1 g sugar"]}\n' % i
+                            for i in range(60)))
+    importer = CountingImporter(db, batch_size=2, workers=2)
+    assert importer.import_file(str(path)).recipes == 60
+    assert importer.written == 30
+    assert importer.most_ahead <= importer.max_in_flight
@@ -0,0 +1,46 @@
+import pytest
+from catalogue import ColumnarCatalogue, RecipeRecord, ServeRecord, QuantityRecord
+from batch_matcher import BitsetMatcher
+from blog import Recipe, Serve
+
+RECIPES = [RecipeRecord(1, "pancakes", "Fry."), RecipeRecord(2, "risotto", "Cook."), RecipeRecord(5, "tea", "")]
+SERVES = [ServeRecord(1, 1), ServeRecord(4, 2), ServeRecord(1, 5), ServeRecord(3, 1)]
+QUANTITIES = [QuantityRecord(4, 4, 1, 1), QuantityRecord(4, 3, 1, 1), QuantityRecord(1, 1, 100, 2),
+              QuantityRecord(1, 1, 250, 5)]
+
+
+@pytest.fixture
+def db(make_catalogue):
+    # Records go straight into the batch methods.
+    return make_catalogue(RECIPES, SERVES, QUANTITIES)
+
+
+def test_domain_objects_have_no_instance_dict():
+    for obj in (Recipe("tea", "Brew."), Serve([1]), RECIPES[0], SERVES[0], QUANTITIES[0]):
+        assert not hasattr(obj, "__dict__")
+
+
+def test_load_matches_records(db):
+    catalogue = ColumnarCatalogue.load(db, batch_size=2)
+    assert len(catalogue) == 3
+    assert list(catalogue.recipes()) == RECIPES
+    assert list(catalogue.serves()) == [ServeRecord(1, 1), ServeRecord(3, 1), ServeRecord(4, 2), ServeRecord(1, 5)]
+    assert list(catalogue.quantities()) == QUANTITIES
+    assert catalogue.nbytes() == (3 + 2 * 4 + 4 * 4) * catalogue.recipe_ids.itemsize
+
+
+def test_from_records_sorts_rows_by_recipe():
+    catalogue = ColumnarCatalogue.from_records(RECIPES, SERVES, reversed(QUANTITIES))
+    assert catalogue.meal_ids_of(1) == [1, 3]
+    assert catalogue.meal_ids_of(3) == []
+    assert catalogue.quantities_of(1) == [QuantityRecord(4, 3, 1, 1), QuantityRecord(4, 4, 1, 1)]
+    assert catalogue.recipe(5) == RecipeRecord(5, "tea", "")
+    with pytest.raises(KeyError):
+        catalogue.recipe(3)
+
+
+def test_bitset_matcher_from_catalogue(db):
+    matcher = BitsetMatcher(db, ColumnarCatalogue.from_records(RECIPES, SERVES, QUANTITIES))
+    assert matcher.match(["milk"], ["breakfast", "supper"]) == ["risotto", "tea"]
+    assert matcher.match(["strawberry", "cup"], ["breakfast"]) == []
+    assert matcher.match(["strawberry"], ["lunch"]) == ["pancakes"]
@@ -1,6 +1,8 @@
 import pytest
 import sqlite3
-from db_handler import DBConnection, Data
+import threading
+from db_handler import DBConnection, Data, ConnectionProfile, ConnectionPool
+from custom_errors import ProfileError, PoolError
 
 
 def test_turn_on_foreign_keys():
@@ -104,3 +106,115 @@ def test_seed_tables():
     assert ("",) in measures
 
     db.close()
+
+
+def test_migrate_new_database():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    assert data.schema_version() == 0
+    assert data.migrate() is True
+    assert data.schema_version() == data.latest_version
+    assert db.conn.execute("SELECT COUNT(*) FROM meals").fetchone() == (4,)
+    assert db.conn.execute("SELECT COUNT(*) FROM measures").fetchone() == (8,)
+    db.close()
+
+
+def test_migrate_up_to_date_database_does_not_write():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.migrate()
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    changes = db.conn.total_changes
+    assert data.migrate() is False
+    assert statements == ["PRAGMA user_version"]
+    assert db.conn.total_changes == changes
+    assert db.conn.in_transaction is False
+    db.close()
+
+
+
+def test_initial_schema_commits_once_with_its_version():
+    db = DBConnection(":memory:")
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    Data(db).migrate()
+    first_step = statements[statements.index("BEGIN IMMEDIATE"):statements.index("PRAGMA user_version = 1") + 2]
+    assert [x for x in first_step if x in ("BEGIN IMMEDIATE", "COMMIT")] == ["BEGIN IMMEDIATE", "COMMIT"]
+    assert first_step[-1] == "COMMIT"
+    db.close()
+
+def test_migrate_unversioned_database():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    db.conn.execute("INSERT INTO recipes(recipe_name, recipe_description) VALUES ('tea', 'Brew.')")
+    db.conn.commit()
+    assert data.migrate() is True
+    assert data.schema_version() == data.latest_version
+    assert db.conn.execute("SELECT recipe_name FROM recipes").fetchall() == [("tea",)]
+    assert db.conn.execute("SELECT COUNT(*) FROM ingredients").fetchone() == (6,)
+    db.close()
+
+
+def test_performance_profile(tmp_path):
+    db = DBConnection(str(tmp_path / "blog.db"), "performance")
+    assert db.conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert db.conn.execute("PRAGMA synchronous").fetchone() == (1,)
+    assert db.conn.execute("PRAGMA mmap_size").fetchone() == (256 * 1024 * 1024,)
+    assert db.conn.execute("PRAGMA cache_size").fetchone() == (-64 * 1024,)
+    assert db.conn.execute("PRAGMA temp_store").fetchone() == (2,)
+    assert db.conn.execute("PRAGMA busy_timeout").fetchone() == (5000,)
+    db.close()
+
+
+def test_custom_profile(tmp_path):
+    db = DBConnection(str(tmp_path / "blog.db"), ConnectionProfile(synchronous="OFF", cache_size=500))
+    assert db.conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+    assert db.conn.execute("PRAGMA synchronous").fetchone() == (0,)
+    assert db.conn.execute("PRAGMA cache_size").fetchone() == (500,)
+    db.close()
+
+
+def test_invalid_profile():
+    with pytest.raises(ProfileError):
+        DBConnection(":memory:", "turbo")
+    with pytest.raises(ProfileError):
+        DBConnection(":memory:", ConnectionProfile(journal_mode="WAL; DROP TABLE meals"))
+
+
+def test_connection_pool_readers_per_thread(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "blog.db"), "performance")
+    with pool.writer() as db:
+        Data(db).migrate()
+    main_reader = pool.reader()
+    assert pool.reader() is main_reader
+    assert main_reader.conn.execute("SELECT COUNT(*) FROM meals").fetchone() == (4,)
+    with pytest.raises(sqlite3.OperationalError):
+        main_reader.conn.execute("DELETE FROM meals")
+
+    other_readers = []
+    thread = threading.Thread(target=lambda: other_readers.append(pool.reader()))
+    thread.start()
+    thread.join()
+    assert other_readers[0] is not main_reader
+    pool.close()
+
+
+def test_connection_pool_writer_commits_and_rolls_back(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "blog.db"))
+    with pool.writer() as db:
+        Data(db).migrate()
+        db.conn.execute("INSERT INTO recipes(recipe_name) VALUES ('tea')")
+    with pytest.raises(RuntimeError):
+        with pool.writer() as db:
+            db.conn.execute("INSERT INTO recipes(recipe_name) VALUES ('coffee')")
+            raise RuntimeError
+    assert pool.reader().conn.execute("SELECT recipe_name FROM recipes").fetchall() == [("tea",)]
+    pool.close()
+
+
+def test_connection_pool_needs_file():
+    with pytest.raises(PoolError):
+        ConnectionPool(":memory:")
@@ -0,0 +1,79 @@
+import gzip
+import json
+import pytest
+from exporter import RecipeExporter
+from bulk_import import RecipeImporter, RecipeFileReader
+from blog import RecipesDBStore, UserInputCollector
+from db_handler import DBConnection, Data
+from custom_errors import ExportFormatError
+
+
+@pytest.fixture
+def db(make_catalogue):
+    return make_catalogue([(1, "pancakes", "Fry."), (2, "risotto", None), (3, "milkshake", "Blend.")],
+                          [(1, 1), (4, 2), (3, 1)], [(4, 4, 1, 1), (8, 3, 10, 1), (1, 1, 100, 2)])
+
+
+def test_iter_recipes(db):
+    recipes = list(RecipeExporter(db, batch_size=1).iter_recipes())
+    assert recipes == [
+        {"recipe_id": 1, "name": "pancakes", "description": "Fry.", "meals": ["breakfast", "lunch"],
+         "ingredients": ["1 cup blueberry", "10 strawberry"]},
+        {"recipe_id": 2, "name": "risotto", "description": "", "meals": ["supper"], "ingredients": ["100 ml milk"]},
+        {"recipe_id": 3, "name": "milkshake", "description": "Blend.", "meals": [], "ingredients": []}]
+    assert [x["recipe_id"] for x in RecipeExporter(db).iter_recipes(after_id=1)] == [2, 3]
+
+
+def test_export_compressed_jsonl_round_trip(tmp_path, db):
+    path, count = RecipeExporter(db).export(str(tmp_path / "recipes.jsonl"), compress=True)
+    assert path.endswith("recipes.jsonl.gz")
+    assert count == 3
+    with gzip.open(path, "rt") as f:
+        assert json.loads(f.readline())["name"] == "pancakes"
+
+    copy = DBConnection(":memory:")
+    Data(copy).migrate()
+    RecipeImporter(copy).import_file(path)
+    assert list(RecipeExporter(copy).iter_recipes()) == list(RecipeExporter(db).iter_recipes())
+    copy.close()
+
+
+def test_export_csv(tmp_path, db):
+    path, count = RecipeExporter(db).export(str(tmp_path / "recipes.csv"), after_id=1)
+    assert count == 2
+    records = list(RecipeFileReader.read(path))
+    assert [x.name for x in records] == ["risotto", "milkshake"]
+    assert records[0].ingredient_lines == ["100 ml milk"]
+    with pytest.raises(ExportFormatError):
+        RecipeExporter(db).export(str(tmp_path / "recipes.txt"))
+
+
+@pytest.mark.parametrize("name", ["recipes.csv", "recipes.jsonl", "recipes.jsonl.gz"])
+def test_resume_appends(tmp_path, name, db):
+    path = str(tmp_path / name)
+    exporter = RecipeExporter(db)
+    # An export interrupted after recipe 1, then resumed.
+    exporter.export(path, after_id=0)
+    with (gzip.open if name.endswith(".gz") else open)(path, "rt") as f:
+        first_lines = f.read().splitlines()
+    kept = first_lines[:2] if name.endswith(".csv") else first_lines[:1]
+    with (gzip.open if name.endswith(".gz") else open)(path, "wt") as f:
+        f.write("\n".join(kept) + "\n")
+    assert exporter.export(path, after_id=1)[1] == 2
+    assert [x.name for x in RecipeFileReader.read(path)] == ["pancakes", "risotto", "milkshake"]
+
+
+def test_multi_word_ingredient_without_measure_round_trips(tmp_path, db):
+    brown_sugar = db.conn.execute("INSERT INTO ingredients(ingredient_name) VALUES ('brown sugar')").lastrowid
+    RecipesDBStore(db).create_quantities([(8, brown_sugar, 2, 3), (4, brown_sugar, 1, 3)])
+    db.conn.commit()
+    lines = list(RecipeExporter(db).iter_recipes(after_id=2))[0]["ingredients"]
+    assert [UserInputCollector.parse_recipe_info(x) for x in lines] == \
+        [("2", "", "brown sugar"), ("1", "cup", "brown sugar")]
+    for name in ("recipes.jsonl", "recipes.csv"):
+        path, _ = RecipeExporter(db).export(str(tmp_path / name))
+        copy = DBConnection(":memory:")
+        Data(copy).migrate()
+        RecipeImporter(copy).import_file(path)
+        assert list(RecipeExporter(copy).iter_recipes()) == list(RecipeExporter(db).iter_recipes())
+        copy.close()
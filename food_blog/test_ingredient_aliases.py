@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import Mock
+from ingredient_aliases import IngredientAliases
+from lookup_cache import LookupCache
+from blog import UserInputChecker, OptionalArguments, RecipesDBStore
+from bulk_import import RecipeImporter, ImportRecord
+from db_handler import DBConnection, Data
+from custom_errors import AliasError, IngredientError, UserIngredientError
+
+
+@pytest.fixture
+def db():
+    db = DBConnection(":memory:")
+    Data(db).migrate()
+    yield db
+    db.close()
+
+
+def test_resolve_normalized_names(db):
+    cache = LookupCache.for_connection(db)
+    assert cache.resolve_ingredient("milk") == "milk"
+    assert cache.resolve_ingredient(" Milk") == "milk"
+    assert cache.resolve_ingredient("MILKS") == "milk"
+    assert cache.resolve_ingredient("Blueberries") == "blueberry"
+    assert cache.resolve_ingredient("flour") is None
+
+
+def test_add_alias(db):
+    aliases = IngredientAliases(db)
+    assert aliases.add("Whole Milk", "milk") == 1
+    assert aliases.add("cocoa", "Cacao") == 2
+    assert aliases.aliases() == [("cocoa", "cacao"), ("whole milk", "milk")]
+    cache = LookupCache.for_connection(db)
+    assert cache.resolve_ingredient("whole  milk") == "milk"
+    # Aliases are stored normalized, so their plurals resolve as well.
+    assert cache.resolve_ingredient("cocoas") == "cacao"
+    # A fresh cache loads them from the table.
+    assert LookupCache(db).resolve_ingredient("Whole milk") == "milk"
+    aliases.add("cocoa", "sugar")
+    assert cache.resolve_ingredient("cocoa") == "sugar"
+
+
+def test_invalid_alias(db):
+    aliases = IngredientAliases(db)
+    with pytest.raises(AliasError):
+        aliases.add("flour", "wheat")
+    with pytest.raises(AliasError):
+        aliases.add("milk", "sugar")
+    with pytest.raises(AliasError):
+        aliases.add(" ", "sugar")
+    # Spellings of an existing ingredient can't be taken over.
+    for alias in ("Sugar", "sugars", " sugar "):
+        with pytest.raises(AliasError):
+            aliases.add(alias, "cacao")
+    assert LookupCache.for_connection(db).resolve_ingredient("Sugar") == "sugar"
+
+
+def test_check_ingredient_resolves_before_substrings(db):
+    IngredientAliases(db).add("cocoa", "cacao")
+    checker = UserInputChecker(db, 1)
+    assert checker.check_ingredient("Strawberries") == "strawberry"
+    assert checker.check_ingredient("cocoa") == "cacao"
+    assert checker.check_ingredient("straw") == "strawberry"
+    with pytest.raises(IngredientError):
+        checker.check_ingredient("berry")
+
+
+def test_proposals_resolve_ingredients(db):
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "Milkshake", "Blend.")])
+    recipes_db_store.create_serves([(1, 1)])
+    recipes_db_store.create_quantities([(1, 1, 500, 1), (4, 3, 1, 1)])
+    db.conn.commit()
+    IngredientAliases(db).add("whole milk", "milk")
+    args = Mock(ingredients="Milk, strawberries", meals="breakfast")
+    optional_args = OptionalArguments(db, args)
+    assert optional_args.resolved_ingredients() == ["milk", "strawberry"]
+    assert optional_args.propose_recipes() == ["Milkshake"]
+    assert list(OptionalArguments(db, Mock(ingredients="MILKS", meals="breakfast")).stream_recipes()) == \
+        [(1, "Milkshake")]
+    # Unknown names are kept and simply match nothing.
+    assert OptionalArguments(db, Mock(ingredients="milk,flour", meals="breakfast")).propose_recipes() == []
+    args = Mock(pantry="Whole Milk,Strawberries", meals=None)
+    assert OptionalArguments(db, args).propose_cookable(RecipesDBStore(db).signatures) == [(1, "Milkshake")]
+
+
+def test_ingredient_check_accepts_names_with_spaces(db):
+    IngredientAliases(db).add("whole milk", "milk")
+    for ingredients in ("whole milk", " milk", "Whole Milk, strawberries", "milk,sugar"):
+        assert OptionalArguments(db, Mock(ingredients=ingredients)).check_user_ingredients() is True
+    for ingredients in ("milk sugar", "whole milk,", "skimmed milk"):
+        with pytest.raises(UserIngredientError):
+            OptionalArguments(db, Mock(ingredients=ingredients)).check_user_ingredients()
+
+
+def test_import_reuses_known_ingredients(db):
+    records = [ImportRecord("Milkshake", "Blend.", ["breakfast"], ["500 ml Milk", "1 cup strawberries"]),
+               ImportRecord("Porridge", "Cook.", ["breakfast"], ["100 g Oats", "50 g oats"])]
+    RecipeImporter(db).import_records(records)
+    names = [x[0] for x in db.conn.execute("SELECT ingredient_name FROM ingredients ORDER BY ingredient_id")]
+    assert names == ["milk", "cacao", "strawberry", "blueberry", "blackberry", "sugar", "Oats"]
@@ -0,0 +1,60 @@
+import random
+from ingredient_index import IngredientIndex, QuantityScanRanker
+from blog import RecipesDBStore, Recipe
+
+
+def test_index_postings(catalogue_db):
+    index = IngredientIndex(catalogue_db)
+    assert index.recipes_by_ingredient == {4: {1}, 3: {1, 3}, 1: {2, 3}}
+    assert index.recipes_by_meal == {1: {1, 3}, 4: {2}, 3: {3}}
+    assert index.recipe_names == {1: "pancakes", 2: "risotto", 3: "milkshake"}
+
+
+def test_propose_recipes(catalogue_db):
+    index = IngredientIndex(catalogue_db)
+    assert index.propose_recipes(["strawberry"], ["breakfast", "brunch"]) == ["pancakes", "milkshake"]
+    assert index.propose_recipes(["milk", "strawberry"], ["lunch"]) == ["milkshake"]
+    assert index.propose_recipes(["milk"], ["breakfast", "supper"]) == ["risotto", "milkshake"]
+    assert index.propose_recipes(["sugar"], ["breakfast"]) == []
+    assert index.propose_recipes(["flour"], ["breakfast"]) == []
+    assert index.propose_recipes(["milk"], ["dinner"]) == []
+
+
+def test_refresh_picks_up_new_rows(catalogue_db):
+    index = IngredientIndex(catalogue_db)
+    assert index.propose_recipes(["sugar"], ["supper"]) == []
+    recipes_db_store = RecipesDBStore(catalogue_db)
+    recipe_id = recipes_db_store.create_recipe(Recipe("sweet tea", "Stir."))
+    recipes_db_store.create_serve([4], recipe_id)
+    recipes_db_store.create_quantity(6, 6, 1, recipe_id)
+    assert index.propose_recipes(["sugar"], ["supper"]) == ["sweet tea"]
+
+
+def test_rank_recipes(catalogue_db):
+    index = IngredientIndex(catalogue_db)
+    # pancakes need blueberry and strawberry, milkshake milk and strawberry, risotto only milk.
+    assert index.ingredient_counts == {1: 2, 2: 1, 3: 2}
+    assert index.rank_recipes(["milk"], ["breakfast", "supper"]) == [("risotto", 1, 1), ("milkshake", 1, 2)]
+    assert index.rank_recipes(["strawberry", "milk"], ["breakfast"]) == [("milkshake", 2, 2), ("pancakes", 1, 2)]
+    assert index.rank_recipes(["strawberry", "milk"], ["breakfast"], k=1) == [("milkshake", 2, 2)]
+    assert index.rank_recipes(["strawberry"], ["supper"]) == []
+    assert index.rank_recipes(["flour"], ["breakfast"]) == []
+
+
+def test_quantity_scan_ranker_agrees_with_index(catalogue_db):
+    rng = random.Random(0)
+    RecipesDBStore(catalogue_db).create_recipes([(x, f"recipe {x}", "") for x in range(4, 40)])
+    RecipesDBStore(catalogue_db).create_quantities([(1, rng.randint(1, 6), 1, rng.randint(1, 39)) for _ in range(150)])
+    RecipesDBStore(catalogue_db).create_serves([(rng.randint(1, 4), rng.randint(1, 39)) for _ in range(40)])
+    catalogue_db.conn.commit()
+    index = IngredientIndex(catalogue_db)
+    ranker = QuantityScanRanker(catalogue_db)
+    names = ["milk", "cacao", "strawberry", "blueberry", "blackberry", "sugar", "flour"]
+    meals = ["breakfast", "brunch", "lunch", "supper"]
+    for _ in range(30):
+        query_ingredients = rng.sample(names, rng.randint(1, 4))
+        query_meals = rng.sample(meals, rng.randint(1, 2))
+        k = rng.randint(1, 8)
+        assert ranker.rank_recipes(query_ingredients, query_meals, k) == \
+            index.rank_recipes(query_ingredients, query_meals, k)
+    assert ranker.rank_recipes(["flour"], ["breakfast"]) == []
@@ -0,0 +1,113 @@
+import io
+import json
+import pytest
+from unittest.mock import Mock
+import instrumentation
+from blog import RecipesDBStore, OptionalArguments, QuantityTableData, Recipe
+from db_handler import DBConnection, Data
+
+
+@pytest.fixture
+def db():
+    db = DBConnection(":memory:")
+    Data(db).migrate()
+    instrumentation.reset()
+    instrumentation._enabled = True
+    yield db
+    instrumentation.disable()
+    instrumentation.reset()
+    db.close()
+
+
+def metrics():
+    return {x["name"]: x for x in instrumentation.snapshot()}
+
+
+def test_disabled_records_nothing():
+    db = DBConnection(":memory:")
+    Data(db).migrate()
+    instrumentation.reset()
+    RecipesDBStore(db).create_recipe(Recipe("pancakes", "Fry."))
+    assert instrumentation.snapshot() == []
+    db.close()
+
+
+def test_writes_count_rows_touched(db):
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "pancakes", "Fry."), (2, "smoothie", "Blend.")])
+    recipes_db_store.create_serves([(1, 1), (2, 1), (3, 2)])
+    recipes_db_store.create_serve([1, 2], 2)
+    recorded = metrics()
+    assert recorded["RecipesDBStore.create_recipes"]["calls"] == 1
+    assert recorded["RecipesDBStore.create_recipes"]["rows"] == 2
+    assert recorded["RecipesDBStore.create_serves"]["rows"] == 3
+    assert recorded["RecipesDBStore.create_serve"]["rows"] == 2
+
+
+def test_reads_count_result_rows(db):
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "pancakes", "Fry.")])
+    recipes_db_store.create_serves([(1, 1)])
+    recipes_db_store.create_quantities([(4, 3, 1, 1)])
+    db.conn.commit()
+    args = Mock(ingredients="strawberry", meals="breakfast")
+    for _ in range(3):
+        OptionalArguments(db, args).propose_recipes()
+    QuantityTableData(db).gather_measure_id("tbsp")
+    recorded = metrics()
+    assert recorded["OptionalArguments.propose_recipes"]["calls"] == 3
+    assert recorded["OptionalArguments.propose_recipes"]["rows"] == 3
+    assert recorded["QuantityTableData.gather_measure_id"]["calls"] == 1
+    # 6 ingredients, loaded once to resolve the proposal's names, and 8 measures.
+    assert recorded["LookupCache.load"]["rows"] == 14
+
+
+def test_streams_record_rows_yielded(db):
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "pancakes", "Fry."), (2, "milkshake", "Blend.")])
+    recipes_db_store.create_serves([(1, 1), (1, 2)])
+    recipes_db_store.create_quantities([(4, 3, 1, 1), (4, 3, 1, 2)])
+    db.conn.commit()
+    stream = OptionalArguments(db, Mock(ingredients="strawberry", meals="breakfast")).stream_recipes(batch_size=1)
+    assert next(stream) == (1, "pancakes")
+    assert "OptionalArguments.stream_recipes" not in metrics()
+    assert list(stream) == [(2, "milkshake")]
+    assert metrics()["OptionalArguments.stream_recipes"]["calls"] == 1
+    assert metrics()["OptionalArguments.stream_recipes"]["rows"] == 2
+
+
+def test_failed_calls_are_recorded(db):
+    with pytest.raises(Exception):
+        QuantityTableData(db).gather_ingredient_id("flour")
+    assert metrics()["QuantityTableData.gather_ingredient_id"]["calls"] == 1
+
+
+def test_percentiles_and_reservoir():
+    metric = instrumentation.Metric("call")
+    for n in range(1, instrumentation.SAMPLE_SIZE * 2 + 1):
+        metric.record(n / 1000, 0)
+    assert metric.calls == instrumentation.SAMPLE_SIZE * 2
+    assert len(metric.samples) == instrumentation.SAMPLE_SIZE
+    summary = metric.summary()
+    assert summary["p50_ms"] <= summary["p90_ms"] <= summary["p99_ms"]
+    assert 0.5 * summary["total_ms"] / metric.calls < summary["p50_ms"] < 1.5 * summary["total_ms"] / metric.calls
+
+
+def test_reports(db, tmp_path):
+    RecipesDBStore(db).next_recipe_id()
+    stream = io.StringIO()
+    instrumentation.write_reports(str(tmp_path / "report.json"), stream)
+    assert "RecipesDBStore.next_recipe_id" in stream.getvalue()
+    with open(tmp_path / "report.json") as f:
+        report = json.load(f)
+    assert [x["name"] for x in report["metrics"]] == ["RecipesDBStore.next_recipe_id"]
+    assert report["metrics"][0]["calls"] == 1
+
+
+def test_report_while_recording(db):
+    # What the SIGUSR1 handler does when the signal arrives inside _record() on the main thread.
+    RecipesDBStore(db).next_recipe_id()
+    stream = io.StringIO()
+    with instrumentation._lock:
+        instrumentation.write_reports(stream=stream)
+    assert "RecipesDBStore.next_recipe_id" in stream.getvalue()
@@ -0,0 +1,86 @@
+import pytest
+from lookup_cache import LookupCache
+from blog import UserInputChecker, QuantityTableData
+from db_handler import DBConnection, Data
+from custom_errors import MeasureError, IngredientError
+
+
+@pytest.fixture
+def db(make_catalogue):
+    return make_catalogue([], [], [])
+
+
+def test_cache_is_shared_per_connection(db, make_catalogue):
+    other_db = make_catalogue([], [], [])
+    assert LookupCache.for_connection(db) is LookupCache.for_connection(db)
+    assert LookupCache.for_connection(db) is not LookupCache.for_connection(other_db)
+
+
+def test_maps(db):
+    cache = LookupCache.for_connection(db)
+    assert cache.measures() == {"ml": 1, "g": 2, "l": 3, "cup": 4, "tbsp": 5, "tsp": 6, "dsp": 7, "": 8}
+    assert cache.ingredients() == {"milk": 1, "cacao": 2, "strawberry": 3, "blueberry": 4, "blackberry": 5,
+                                   "sugar": 6}
+
+
+def test_ingredient_line_needs_no_sql(db):
+    checker = UserInputChecker(db, 1)
+    quantity_data = QuantityTableData(db)
+    # The first line loads both maps.
+    checker.check_measure("c")
+    checker.check_ingredient("milk")
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    measure_name = checker.check_measure("tb")
+    ingredient_name = checker.check_ingredient("straw")
+    assert quantity_data.gather_measure_id(measure_name) == 5
+    assert quantity_data.gather_ingredient_id(ingredient_name) == 3
+    assert statements == []
+
+
+def test_invalidate_and_add_ingredient(db):
+    cache = LookupCache.for_connection(db)
+    cache.ingredients()
+    db.conn.execute("INSERT INTO ingredients(ingredient_name) VALUES ('flour')")
+    db.conn.execute("INSERT INTO measures(measure_name) VALUES ('pinch')")
+    assert "flour" not in cache.ingredients()
+    substrings = cache.ingredient_substrings()
+    cache.add_ingredient("flour", 7)
+    assert cache.ingredients()["flour"] == 7
+    # The n-gram index takes the new name in place instead of being rebuilt.
+    assert cache.ingredient_substrings() is substrings
+    assert substrings.containing("flo") == ["flour"]
+    cache.invalidate()
+    assert cache.measures()["pinch"] == 9
+
+
+def test_unknown_names(db):
+    quantity_data = QuantityTableData(db)
+    with pytest.raises(MeasureError):
+        quantity_data.gather_measure_id("gallon")
+    with pytest.raises(IngredientError):
+        quantity_data.gather_ingredient_id("flour")
+
+
+def test_refresh_sees_other_connections(tmp_path):
+    db = DBConnection(str(tmp_path / "blog.db"))
+    Data(db).migrate()
+    other = DBConnection(str(tmp_path / "blog.db"))
+    cache = LookupCache.for_connection(db)
+    cache.refresh()
+    assert cache.resolve_ingredient("flour") is None
+    other.conn.execute("INSERT INTO ingredients(ingredient_name) VALUES ('flour')")
+    other.conn.execute("INSERT INTO ingredient_alias(alias, ingredient_id) VALUES ('cocoa', 2)")
+    other.conn.commit()
+    assert cache.resolve_ingredient("flour") is None
+    cache.refresh()
+    assert cache.resolve_ingredient("flour") == "flour"
+    assert cache.resolve_ingredient("cocoa") == "cacao"
+    # Nothing changed since: the maps stay loaded.
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    cache.refresh()
+    cache.resolve_ingredient("milk")
+    assert statements == ["PRAGMA data_version"]
+    other.close()
+    db.close()
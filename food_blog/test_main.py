@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def run_main(*args):
+    result = subprocess.run([sys.executable, MAIN, *args], capture_output=True, text=True, timeout=60)
+    return result.stdout
+
+
+def test_query_multi_word_alias(tmp_path):
+    db_name = str(tmp_path / "blog.db")
+    recipes = tmp_path / "recipes.jsonl"
+    recipes.write_text('{"name": "Milkshake", "meals": ["breakfast"], "ingredients": ["500 ml milk"]}\n')
+    run_main(db_name, "--import", str(recipes))
+    run_main(db_name, "--alias", "whole milk", "milk")
+    assert "Milkshake" in run_main(db_name, "--ingredients", "whole milk", "--meals", "breakfast")
+    assert "Milkshake" in run_main(db_name, "--ingredients", " milk", "--meals", "breakfast")
+    assert "Provide ingredients separated by a comma." in \
+        run_main(db_name, "--ingredients", "milk sugar", "--meals", "breakfast")
+
+
+def test_import_missing_file(tmp_path):
+    output = run_main(str(tmp_path / "blog.db"), "--import", str(tmp_path / "nope.jsonl"))
+    assert output == f"Cannot read {tmp_path / 'nope.jsonl'}: No such file or directory.\n"
+
+
+def test_batch_in_missing_file(tmp_path):
+    output = run_main(str(tmp_path / "blog.db"), "--batch-in", str(tmp_path / "nope.jsonl"),
+                      "--batch-out", str(tmp_path / "out.jsonl"))
+    assert output == f"Cannot open {tmp_path / 'nope.jsonl'}: No such file or directory.\n"
+
+
+def test_limit_zero_is_rejected(tmp_path):
+    db_name = str(tmp_path / "blog.db")
+    recipes = tmp_path / "recipes.jsonl"
+    recipes.write_text('{"name": "Milkshake", "meals": ["breakfast"], "ingredients": ["500 ml milk"]}\n')
+    run_main(db_name, "--import", str(recipes))
+    assert run_main(db_name, "--ingredients", "milk", "--meals", "breakfast", "--limit", "0") == \
+        "Provide a --limit of at least 1.\n"
+    assert run_main(db_name, "--ingredients", "milk", "--meals", "breakfast", "--limit", "1").startswith(
+        "Recipes selected for you: Milkshake\n")
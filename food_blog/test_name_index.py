@@ -0,0 +1,56 @@
+import random
+from name_index import PrefixTrie, SubstringIndex, normalize_ingredient
+
+MEASURES = ["ml", "g", "l", "cup", "tbsp", "tsp", "dsp", ""]
+INGREDIENTS = ["milk", "cacao", "strawberry", "blueberry", "blackberry", "sugar"]
+
+
+def test_prefix_trie():
+    trie = PrefixTrie(MEASURES)
+    assert trie.starting_with("m") == ["ml"]
+    assert trie.starting_with("cup") == ["cup"]
+    assert sorted(trie.starting_with("t")) == ["tbsp", "tsp"]
+    assert len(trie.starting_with("t", limit=1)) == 1
+    assert trie.starting_with("gallon") == []
+    assert sorted(trie.starting_with("")) == sorted(MEASURES)
+
+
+def test_substring_index():
+    index = SubstringIndex(INGREDIENTS)
+    assert index.containing("blue") == ["blueberry"]
+    assert index.containing("milk") == ["milk"]
+    assert sorted(index.containing("berry")) == ["blackberry", "blueberry", "strawberry"]
+    assert len(index.containing("berry", limit=2)) == 2
+    assert index.containing("flour") == []
+    assert index.containing("", limit=2) == ["milk", "cacao"]
+    assert index.containing("rr") == ["strawberry", "blueberry", "blackberry"]
+    assert index.containing("berrys") == []
+    index.insert("elderberry")
+    assert index.containing("derb") == ["elderberry"]
+    assert len(index.containing("berry")) == 4
+
+
+def test_indexes_match_linear_scan():
+    rng = random.Random(0)
+    names = list({"".join(rng.choice("abcde") for _ in range(rng.randint(1, 6))) for _ in range(300)})
+    trie = PrefixTrie(names)
+    index = SubstringIndex(names)
+    for _ in range(200):
+        fragment = "".join(rng.choice("abcde") for _ in range(rng.randint(1, 3)))
+        assert sorted(trie.starting_with(fragment)) == sorted(x for x in names if x.startswith(fragment))
+        assert sorted(index.containing(fragment)) == sorted(x for x in names if fragment in x)
+
+
+def test_normalize_ingredient():
+    assert normalize_ingredient(" Milk ") == "milk"
+    assert normalize_ingredient("Blue  Berries") == "blue berry"
+    assert normalize_ingredient("strawberries") == normalize_ingredient("strawberry")
+    assert normalize_ingredient("tomatoes") == "tomato"
+    assert normalize_ingredient("peaches") == "peach"
+    assert normalize_ingredient("eggs") == "egg"
+    assert normalize_ingredient("glass") == "glass"
+    assert normalize_ingredient("hummus") == "hummus"
+    assert normalize_ingredient("   ") == ""
+    assert normalize_ingredient("cookies") == normalize_ingredient("cookie")
+    assert normalize_ingredient("pies") == normalize_ingredient("pie")
+    assert normalize_ingredient("cherries") == normalize_ingredient("cherry")
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import Mock
+from proposal_cache import ProposalCache, bump_generation, current_generation
+from blog import RecipesDBStore, OptionalArguments
+from db_handler import DBConnection
+
+
+@pytest.fixture
+def make_db(make_catalogue):
+    # Pancakes with strawberry, for breakfast.
+    return lambda db_name=":memory:": make_catalogue([(1, "pancakes", "Fry.")], [(1, 1)], [(4, 3, 1, 1)], db_name)
+
+
+def test_key_is_normalized():
+    assert ProposalCache.key(["milk", "sugar", "milk"], ["lunch", "breakfast"]) == \
+        ProposalCache.key(["sugar", "milk"], ["breakfast", "lunch", "lunch"])
+
+
+def test_hits_and_misses(make_db):
+    db = make_db()
+    cache = ProposalCache()
+    args = Mock(ingredients="strawberry", meals="breakfast,brunch")
+    assert OptionalArguments(db, args, cache).propose_recipes() == ["pancakes"]
+    args = Mock(ingredients="strawberry", meals="brunch,breakfast")
+    assert OptionalArguments(db, args, cache).propose_recipes() == ["pancakes"]
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 1024}
+
+
+def test_writes_invalidate_entries(make_db):
+    db = make_db()
+    cache = ProposalCache()
+    args = Mock(ingredients="strawberry", meals="breakfast")
+    OptionalArguments(db, args, cache).propose_recipes()
+    generation = current_generation(db)
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(2, "smoothie", "Blend.")])
+    recipes_db_store.create_serves([(1, 2)])
+    recipes_db_store.create_quantities([(4, 3, 1, 2)])
+    db.conn.commit()
+    assert current_generation(db) > generation
+    assert OptionalArguments(db, args, cache).propose_recipes() == ["pancakes", "smoothie"]
+    assert cache.misses == 2
+
+
+def test_writes_from_other_connections_invalidate_entries(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    writer = DBConnection(str(tmp_path / "blog.db"))
+    cache = ProposalCache()
+    args = Mock(ingredients="strawberry", meals="breakfast")
+    OptionalArguments(db, args, cache).propose_recipes()
+    writer.conn.execute("INSERT INTO serve(meal_id, recipe_id) VALUES (2, 1)")
+    writer.conn.execute("INSERT INTO quantity(measure_id, ingredient_id, quantity, recipe_id) VALUES (1, 1, 1, 1)")
+    writer.conn.commit()
+    args = Mock(ingredients="strawberry,milk", meals="breakfast")
+    OptionalArguments(db, args, cache).propose_recipes()
+    args = Mock(ingredients="strawberry", meals="breakfast")
+    OptionalArguments(db, args, cache).propose_recipes()
+    assert cache.hits == 0
+    writer.close()
+
+
+def test_lru_eviction(make_db):
+    db = make_db()
+    cache = ProposalCache(maxsize=2)
+    calls = []
+    for ingredients in (["milk"], ["sugar"], ["milk"], ["cacao"], ["sugar"]):
+        cache.get_or_compute(db, ingredients, ["lunch"], lambda: calls.append(ingredients) or [])
+    assert calls == [["milk"], ["sugar"], ["cacao"], ["sugar"]]
+    assert cache.stats()["size"] == 2
+    bump_generation(db)
+    cache.get_or_compute(db, ["sugar"], ["lunch"], lambda: calls.append("after bump") or [])
+    assert calls[-1] == "after bump"
@@ -0,0 +1,80 @@
+import pytest
+from db_handler import DBConnection, Data
+from blog import OptionalArguments
+from ingredient_index import QuantityScanRanker
+
+
+@pytest.fixture
+def db():
+    db = DBConnection(":memory:")
+    db.turn_on_foreign_keys()
+    Data(db).migrate()
+    yield db
+    db.close()
+
+
+def query_plan(db, query, params):
+    return [x[3] for x in db.conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+
+def scanned_tables(plan):
+    # Plan lines look like "SCAN q" or "SEARCH q USING INDEX ..."; only the former reads a whole table.
+    return [x.split()[1] for x in plan if x.startswith("SCAN")]
+
+
+def assert_indexed(plan):
+    assert scanned_tables(plan) == []
+    assert not any("AUTOMATIC" in x for x in plan)
+    assert any("serve_meal_id_idx" in x or "serve_recipe_id_idx" in x for x in plan)
+    assert any("quantity_ingredient_id_idx" in x or "quantity_recipe_id_idx" in x for x in plan)
+
+
+@pytest.mark.parametrize("ingredients, meals", [
+    (["milk"], ["breakfast"]),
+    (["milk", "sugar"], ["breakfast"]),
+    (["milk", "sugar", "strawberry"], ["breakfast", "lunch", "supper"]),
+])
+def test_proposal_query_uses_indexes(db, ingredients, meals):
+    plan = query_plan(db, OptionalArguments.proposal_query(ingredients, meals), ingredients + meals)
+    assert_indexed(plan)
+
+
+def test_paged_proposal_query_uses_indexes(db):
+    query = OptionalArguments.proposal_query(["milk", "sugar"], ["breakfast"], after_id=100, limit=10, offset=5)
+    assert_indexed(query_plan(db, query, ["milk", "sugar", "breakfast", 100]))
+
+
+def test_ranking_query_uses_indexes(db):
+    plan = query_plan(db, QuantityScanRanker.ranking_query(2, 2), [1, 6, 1, 3])
+    # "SCAN m" walks the grouped matches, not a table.
+    assert scanned_tables(plan) == ["m"]
+    assert any("quantity_ingredient_id_idx" in x for x in plan)
+    assert any("quantity_recipe_id_idx" in x for x in plan)
+    assert any("serve_meal_id_idx" in x or "serve_recipe_id_idx" in x for x in plan)
+
+
+@pytest.mark.parametrize("table, column, index", [
+    ("serve", "recipe_id", "serve_recipe_id_idx"),
+    ("serve", "meal_id", "serve_meal_id_idx"),
+    ("quantity", "recipe_id", "quantity_recipe_id_idx"),
+    ("quantity", "ingredient_id", "quantity_ingredient_id_idx"),
+])
+def test_foreign_key_lookups_use_indexes(db, table, column, index):
+    # Deleting or re-keying a parent row makes SQLite run this lookup on the child table.
+    plan = query_plan(db, f"SELECT 1 FROM {table} WHERE {column} = ?", [1])
+    assert scanned_tables(plan) == []
+    assert any(index in x for x in plan)
+
+
+def test_migrate_adds_indexes_to_existing_database():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    db.conn.execute("PRAGMA user_version = 1")
+    assert data.migrate() is True
+    indexes = {x[0] for x in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"serve_recipe_id_idx", "serve_meal_id_idx", "quantity_recipe_id_idx",
+            "quantity_ingredient_id_idx"} <= indexes
+    assert data.schema_version() == data.latest_version
+    db.close()
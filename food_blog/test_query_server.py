@@ -0,0 +1,53 @@
+import pytest
+import io
+import json
+from query_server import ProposalServer
+from ingredient_index import IngredientIndex
+from proposal_cache import ProposalCache
+
+
+@pytest.fixture
+def db(make_catalogue):
+    return make_catalogue([(1, "pancakes", "Fry."), (2, "risotto", "Cook.")], [(1, 1), (4, 2)],
+                          [(4, 4, 1, 1), (4, 3, 1, 1), (1, 1, 100, 2)])
+
+
+def test_answer(db):
+    server = ProposalServer(db)
+    assert json.loads(server.answer('{"ingredients": "strawberry", "meals": "breakfast,brunch"}')) == \
+        {"recipes": ["pancakes"]}
+    assert json.loads(server.answer('{"ingredients": "sugar", "meals": "breakfast"}')) == {"recipes": []}
+
+
+def test_answer_errors(db):
+    server = ProposalServer(db)
+    assert json.loads(server.answer('{"ingredients": "milk"}')) == {"error": "Provide meals."}
+    assert json.loads(server.answer('{"ingredients": "milk sugar", "meals": "lunch"}')) == \
+        {"error": "Provide ingredients separated by a comma."}
+    assert "error" in json.loads(server.answer('not json'))
+    assert "error" in json.loads(server.answer('{}'))
+    assert "error" in json.loads(server.answer('{"ingredients": 1, "meals": "lunch"}'))
+
+
+def test_serve_stream_with_index(db):
+    server = ProposalServer(db, IngredientIndex(db))
+    infile = io.StringIO('{"ingredients": "milk", "meals": "supper"}\n\n'
+                         '{"ingredients": "strawberry,blueberry", "meals": "breakfast"}\n')
+    outfile = io.StringIO()
+    server.serve_stream(infile, outfile)
+    assert outfile.getvalue() == '{"recipes": ["risotto"]}\n{"recipes": ["pancakes"]}\n'
+
+
+def test_stats_request(db):
+    server = ProposalServer(db, cache=ProposalCache(maxsize=10))
+    server.answer('{"ingredients": "milk", "meals": "supper"}')
+    server.answer('{"ingredients": "milk", "meals": "supper"}')
+    assert json.loads(server.answer('{"stats": true}')) == {"stats": {"hits": 1, "misses": 1, "size": 1, "maxsize": 10}}
+
+
+def test_ranked_request(db):
+    server = ProposalServer(db)
+    assert json.loads(server.answer('{"ingredients": "strawberry", "meals": "breakfast", "top": 3}')) == \
+        {"ranked": [{"name": "pancakes", "matched": 1, "required": 2}]}
+    assert "error" in json.loads(server.answer('{"ingredients": "milk", "meals": "lunch", "top": 0}'))
+    assert server.index is None
@@ -0,0 +1,78 @@
+import pytest
+from recipe_search import RecipeSearch
+from blog import RecipesDBStore, Recipe
+from db_handler import DBConnection, Data
+from custom_errors import SearchError, SearchUnavailableError
+
+
+def make_db():
+    db = DBConnection(":memory:")
+    Data(db).migrate()
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipe(Recipe("Chocolate cake", "Bake the sponge, then pour over melted chocolate."))
+    recipes_db_store.create_recipe(Recipe("Pancakes", "Fry the batter and top with chocolate chips."))
+    recipes_db_store.create_recipe(Recipe("Berry smoothie", "Blend strawberry and blueberry with milk."))
+    recipes_db_store.create_serve([1, 2], 1)
+    recipes_db_store.create_serve([3], 2)
+    recipes_db_store.create_serve([1], 3)
+    return db
+
+
+def names(results):
+    return [x[1] for x in results]
+
+
+def test_search_ranks_name_matches_first():
+    db = make_db()
+    search = RecipeSearch(db)
+    assert names(search.search("chocolate")) == ["Chocolate cake", "Pancakes"]
+    assert names(search.search("chocolate chips")) == ["Pancakes"]
+    # Words match as prefixes.
+    assert names(search.search("pancake")) == ["Pancakes"]
+    assert names(search.search("BLUE")) == ["Berry smoothie"]
+    assert search.search("pie") == []
+    db.close()
+
+
+def test_search_filters_by_meal_and_limits():
+    db = make_db()
+    search = RecipeSearch(db)
+    assert names(search.search("chocolate", ["lunch"])) == ["Pancakes"]
+    assert names(search.search("chocolate", ["brunch", "lunch"])) == ["Chocolate cake", "Pancakes"]
+    assert names(search.search("chocolate", ["supper"])) == []
+    assert names(search.search("chocolate", limit=1)) == ["Chocolate cake"]
+    db.close()
+
+
+def test_index_follows_recipe_changes():
+    db = make_db()
+    search = RecipeSearch(db)
+    RecipesDBStore(db).create_recipes([(4, "Hot cacao", "Warm milk with cacao.")])
+    assert names(search.search("cacao")) == ["Hot cacao"]
+    db.conn.execute("UPDATE recipes SET recipe_name = 'Cold cacao' WHERE recipe_id = 4")
+    assert names(search.search("cold")) == ["Cold cacao"]
+    assert search.search("hot") == []
+    db.conn.execute("DELETE FROM recipes WHERE recipe_id = 4")
+    assert search.search("cacao") == []
+    db.close()
+
+
+def test_migration_indexes_existing_recipes():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    RecipesDBStore(db).create_recipe(Recipe("Chocolate cake", "Bake."))
+    search = RecipeSearch(db)
+    with pytest.raises(SearchUnavailableError):
+        search.search("chocolate")
+    data.migrate()
+    assert names(search.search("chocolate")) == ["Chocolate cake"]
+    db.close()
+
+
+def test_match_expression_quotes_words():
+    assert RecipeSearch.match_expression('milk AND "sugar" OR NEAR(x') == \
+        '"milk"* "AND"* "sugar"* "OR"* "NEAR"* "x"*'
+    with pytest.raises(SearchError):
+        RecipeSearch.match_expression(" -- ")
@@ -0,0 +1,117 @@
+from recipe_signatures import RecipeSignatures, encode_ingredient_ids, decode_ingredient_ids, meal_mask
+import pytest
+from unittest.mock import Mock
+from blog import RecipesDBStore, RecipeUnitOfWork, Recipe, OptionalArguments
+from custom_errors import UnknownMealError
+from db_handler import DBConnection, Data
+
+
+@pytest.fixture
+def db(make_catalogue):
+    # The shared catalogue, with pancakes also for brunch and sugar in the milkshake.
+    db = make_catalogue(migrate=True, foreign_keys=True)
+    RecipesDBStore(db).create_serves([(2, 1)])
+    RecipesDBStore(db).create_quantities([(4, 6, 1, 3)])
+    db.conn.commit()
+    return db
+
+
+def signature_rows(db):
+    return [(recipe_id, list(decode_ingredient_ids(blob)), mask) for recipe_id, blob, mask in
+            db.conn.execute("SELECT recipe_id, ingredient_ids, meal_mask FROM recipe_signature ORDER BY recipe_id")]
+
+
+def test_encoding():
+    assert list(decode_ingredient_ids(encode_ingredient_ids([5, 1, 3, 1]))) == [1, 3, 5]
+    assert encode_ingredient_ids([1]) == (1).to_bytes(8, "little")
+    assert meal_mask([1, 3]) == 0b101
+
+
+def test_batch_writes_maintain_signatures(db):
+    assert signature_rows(db) == [(1, [3, 4], 0b11), (2, [1], 0b1000), (3, [1, 3, 6], 0b101)]
+
+
+def test_single_writes_maintain_signatures(db):
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_serve([4], 1)
+    recipes_db_store.create_quantity(1, 1, 200, 1)
+    recipe_id = recipes_db_store.create_recipe(Recipe("tea", "Brew."))
+    assert signature_rows(db)[0] == (1, [1, 3, 4], 0b1011)
+    assert RecipeSignatures(db).can_cook(recipe_id, [1]) is False
+    with RecipeUnitOfWork(db) as unit_of_work:
+        unit_of_work.add_recipe(Recipe("cacao", "Mix."))
+        unit_of_work.add_serve([2])
+        unit_of_work.add_quantity(1, 2, 200)
+        unit_of_work.add_quantity(1, 1, 200)
+    assert signature_rows(db)[-1] == (5, [1, 2], 0b10)
+
+
+def test_rebuild_matches_incremental(db):
+    incremental = signature_rows(db)
+    db.conn.execute("DELETE FROM recipe_signature")
+    assert RecipeSignatures(db).rebuild() == 3
+    assert signature_rows(db) == incremental
+
+
+def test_migration_backfills_existing_database():
+    db = DBConnection(":memory:")
+    data = Data(db)
+    data.create_tables()
+    data.seed_tables()
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(1, "pancakes", "Fry.")])
+    recipes_db_store.create_serves([(1, 1)])
+    recipes_db_store.create_quantities([(4, 3, 1, 1)])
+    db.conn.commit()
+    assert RecipeSignatures.for_connection(db).available() is False
+    data.migrate()
+    assert signature_rows(db) == [(1, [3], 0b1)]
+    recipes_db_store.create_quantities([(4, 4, 1, 1)])
+    assert signature_rows(db) == [(1, [3, 4], 0b1)]
+    db.close()
+
+
+def test_can_cook(db):
+    signatures = RecipeSignatures(db)
+    assert signatures.can_cook(1, [3, 4]) is True
+    assert signatures.can_cook(1, [3, 4, 5], [2]) is True
+    assert signatures.can_cook(1, [3, 4], [3, 4]) is False
+    assert signatures.can_cook(1, [3]) is False
+    assert signatures.can_cook(99, [1, 2, 3]) is False
+
+
+def test_cookable_recipes(db):
+    signatures = RecipeSignatures(db)
+    assert signatures.cookable_recipes([1, 3, 4, 6]) == [(1, "pancakes"), (2, "risotto"), (3, "milkshake")]
+    assert signatures.cookable_recipes([1, 3, 4, 6], [3]) == [(3, "milkshake")]
+    assert signatures.cookable_recipes([1]) == [(2, "risotto")]
+    assert signatures.cookable_recipes([]) == []
+
+
+def test_recipes_without_meals_are_cookable(db):
+    # An import record with "meals": [] writes quantity rows but no serve rows.
+    RecipesDBStore(db).create_recipes([(4, "lemonade", "Stir.")])
+    RecipesDBStore(db).create_quantities([(1, 6, 50, 4)])
+    db.conn.commit()
+    signatures = RecipeSignatures(db)
+    assert signatures.cookable_recipes([1, 6]) == [(2, "risotto"), (4, "lemonade")]
+    assert signatures.cookable_recipes([1, 6], [1, 2, 3, 4]) == [(2, "risotto")]
+
+
+def test_deleting_a_recipe_removes_its_signature(db):
+    db.conn.execute("DELETE FROM serve WHERE recipe_id = 2")
+    db.conn.execute("DELETE FROM quantity WHERE recipe_id = 2")
+    db.conn.execute("DELETE FROM recipes WHERE recipe_id = 2")
+    assert [x[0] for x in signature_rows(db)] == [1, 3]
+
+
+def test_propose_cookable(db):
+    signatures = RecipeSignatures.for_connection(db)
+    optional_args = OptionalArguments(db, Mock(pantry="milk,strawberry,sugar,flour", meals=None))
+    assert optional_args.propose_cookable(signatures) == [(2, "risotto"), (3, "milkshake")]
+    assert optional_args.final_output == ["risotto", "milkshake"]
+    optional_args = OptionalArguments(db, Mock(pantry="milk,strawberry,sugar", meals="supper"))
+    assert optional_args.propose_cookable(signatures) == [(2, "risotto")]
+    optional_args = OptionalArguments(db, Mock(pantry="milk", meals="elevenses"))
+    with pytest.raises(UnknownMealError):
+        optional_args.propose_cookable(signatures)
@@ -0,0 +1,111 @@
+import json
+import os
+import pytest
+from sharding import ShardedCatalogue, ShardedRecipeImporter
+from bulk_import import ImportRecord
+from recipe_signatures import RecipeSignatures
+from custom_errors import ShardError, PaginationError
+
+
+def make_catalogue(tmp_path, shard_count=3):
+    return ShardedCatalogue.create(str(tmp_path / "catalogue.json"), shard_count)
+
+
+def fill(catalogue, recipes=10):
+    # Every recipe uses milk; even ids also use sugar and odd ids are also served at lunch.
+    recipe_rows = [(x, f"recipe {x}", "Mix.") for x in range(1, recipes + 1)]
+    serve_rows = [(1, x) for x in range(1, recipes + 1)] + [(3, x) for x in range(1, recipes + 1, 2)]
+    quantity_rows = [(1, 1, 100, x) for x in range(1, recipes + 1)] + \
+                    [(2, 6, 5, x) for x in range(2, recipes + 1, 2)]
+    catalogue.write_recipes(recipe_rows, serve_rows, quantity_rows)
+
+
+def recipe_ids(db):
+    return [x[0] for x in db.conn.execute("SELECT recipe_id FROM recipes ORDER BY recipe_id")]
+
+
+def test_create_writes_manifest(tmp_path):
+    with make_catalogue(tmp_path) as catalogue:
+        with open(tmp_path / "catalogue.json") as f:
+            manifest = json.load(f)
+        assert manifest == {"generation": 0, "shards": ["catalogue-g0-shard0.db", "catalogue-g0-shard1.db",
+                                                        "catalogue-g0-shard2.db"]}
+        assert catalogue.shard_count == 3
+    with ShardedCatalogue(str(tmp_path / "catalogue.json")) as catalogue:
+        assert catalogue.paths == [str(tmp_path / x) for x in manifest["shards"]]
+
+
+def test_invalid_manifest(tmp_path):
+    with pytest.raises(ShardError):
+        ShardedCatalogue(str(tmp_path / "missing.json"))
+    (tmp_path / "empty.json").write_text('{"generation": 0, "shards": []}')
+    with pytest.raises(ShardError):
+        ShardedCatalogue(str(tmp_path / "empty.json"))
+    with pytest.raises(ShardError):
+        ShardedCatalogue.create(str(tmp_path / "none.json"), 0)
+
+
+def test_writes_route_by_recipe_id(tmp_path):
+    with make_catalogue(tmp_path) as catalogue:
+        fill(catalogue)
+        for number, db in enumerate(catalogue.shards):
+            assert recipe_ids(db) == [x for x in range(1, 11) if x % 3 == number]
+            serves = db.conn.execute("SELECT recipe_id FROM serve").fetchall()
+            assert all(x[0] % 3 == number for x in serves)
+        assert catalogue.shard_of(4) is catalogue.shards[1]
+        assert catalogue.next_recipe_id() == 11
+        # Signatures are kept in each shard, as in a single file.
+        assert RecipeSignatures(catalogue.shard_of(2)).can_cook(2, [1, 6])
+
+
+def test_propose_merges_shards(tmp_path):
+    with make_catalogue(tmp_path) as catalogue:
+        fill(catalogue)
+        assert [x[0] for x in catalogue.propose_recipes(["milk"], ["breakfast"])] == list(range(1, 11))
+        assert catalogue.propose_recipes(["milk", "sugar"], ["lunch"]) == []
+        assert [x[0] for x in catalogue.propose_recipes(["milk", "sugar"], ["breakfast"])] == [2, 4, 6, 8, 10]
+        assert catalogue.propose_recipes(["milk"], ["lunch"], limit=2) == [(1, "recipe 1"), (3, "recipe 3")]
+        assert [x[0] for x in catalogue.propose_recipes(["milk"], ["breakfast"], limit=3, offset=2)] == [3, 4, 5]
+        assert [x[0] for x in catalogue.propose_recipes(["milk"], ["breakfast"], limit=3, after_id=8)] == [9, 10]
+        with pytest.raises(PaginationError):
+            catalogue.propose_recipes(["milk"], ["breakfast"], limit=-1)
+
+
+def test_add_ingredient_replicates(tmp_path):
+    with make_catalogue(tmp_path) as catalogue:
+        ingredient_id = catalogue.add_ingredient("oats")
+        for db in catalogue.shards:
+            assert db.conn.execute("SELECT ingredient_id FROM ingredients WHERE ingredient_name = 'oats'"
+                                   ).fetchone()[0] == ingredient_id
+
+
+def test_import_into_shards(tmp_path):
+    with make_catalogue(tmp_path, 2) as catalogue:
+        records = [ImportRecord("Milkshake", "Blend.", ["breakfast"], ["500 ml milk", "1 cup strawberry"]),
+                   ImportRecord("Porridge", "Cook.", ["breakfast"], ["250 ml milk", "100 g oats"]),
+                   ImportRecord("Oat milk", "Soak.", ["lunch"], ["1 l milk", "50 g oats"])]
+        stats = ShardedRecipeImporter(catalogue, batch_size=2).import_records(records)
+        assert stats.recipes == 3
+        assert recipe_ids(catalogue.shards[0]) == [2]
+        assert recipe_ids(catalogue.shards[1]) == [1, 3]
+        assert [x[1] for x in catalogue.propose_recipes(["milk", "oats"], ["breakfast", "lunch"])] == \
+               ["Porridge", "Oat milk"]
+
+
+def test_rebalance(tmp_path):
+    catalogue = make_catalogue(tmp_path)
+    fill(catalogue)
+    catalogue.add_ingredient("oats")
+    old_paths = catalogue.paths
+    assert catalogue.rebalance(2, batch_size=3) == 10
+    assert catalogue.shard_count == 2
+    assert not any(os.path.exists(x) for x in old_paths)
+    assert recipe_ids(catalogue.shards[0]) == [2, 4, 6, 8, 10]
+    assert recipe_ids(catalogue.shards[1]) == [1, 3, 5, 7, 9]
+    assert [x[0] for x in catalogue.propose_recipes(["milk", "sugar"], ["breakfast"])] == [2, 4, 6, 8, 10]
+    assert catalogue.shards[1].conn.execute("SELECT COUNT(*) FROM ingredients WHERE ingredient_name = 'oats'"
+                                            ).fetchone()[0] == 1
+    catalogue.close()
+    with ShardedCatalogue(str(tmp_path / "catalogue.json")) as reopened:
+        assert reopened.generation == 1
+        assert reopened.shard_count == 2
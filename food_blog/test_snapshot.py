@@ -0,0 +1,147 @@
+import gc
+import json
+import os
+import time
+import weakref
+import pytest
+from snapshot import SnapshotReader
+import lookup_cache
+import recipe_signatures
+from recipe_signatures import RecipeSignatures
+from query_server import ProposalServer
+from ingredient_index import IngredientIndex
+from proposal_cache import ProposalCache
+from blog import RecipesDBStore
+from custom_errors import SnapshotError
+
+
+@pytest.fixture
+def make_db(make_catalogue):
+    # Pancakes with strawberry, for breakfast.
+    return lambda db_name: make_catalogue([(1, "pancakes", "Fry.")], [(1, 1)], [(4, 3, 1, 1)], db_name, migrate=True)
+
+
+def add_recipe(db, recipe_id, name):
+    recipes_db_store = RecipesDBStore(db)
+    recipes_db_store.create_recipes([(recipe_id, name, "Blend.")])
+    recipes_db_store.create_serves([(1, recipe_id)])
+    recipes_db_store.create_quantities([(4, 3, 1, recipe_id)])
+    db.conn.commit()
+
+
+def recipe_names(db):
+    return [x[0] for x in db.conn.execute("SELECT recipe_name FROM recipes ORDER BY recipe_id")]
+
+
+def test_snapshot_is_an_in_memory_copy(tmp_path, make_db):
+    make_db(str(tmp_path / "blog.db"))
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"))
+    assert snapshot.current().db_name == ":memory:"
+    assert recipe_names(snapshot.current()) == ["pancakes"]
+    assert snapshot.refresh() is False
+    snapshot.close()
+
+
+def test_refresh_swaps_in_new_snapshot(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"))
+    before = snapshot.current()
+    add_recipe(db, 2, "smoothie")
+    assert snapshot.refresh() is True
+    assert snapshot.reloads == 1
+    assert recipe_names(snapshot.current()) == ["pancakes", "smoothie"]
+    # A reader still holding the old snapshot keeps a consistent view.
+    assert recipe_names(before) == ["pancakes"]
+    assert snapshot.refresh() is False
+    snapshot.close()
+
+
+def test_replaced_file_is_reloaded(tmp_path, make_db):
+    make_db(str(tmp_path / "blog.db")).close()
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"))
+    other = make_db(str(tmp_path / "other.db"))
+    add_recipe(other, 2, "smoothie")
+    other.close()
+    os.replace(tmp_path / "other.db", tmp_path / "blog.db")
+    assert snapshot.refresh() is True
+    assert recipe_names(snapshot.current()) == ["pancakes", "smoothie"]
+    snapshot.close()
+
+
+def test_background_reload(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    with SnapshotReader(str(tmp_path / "blog.db"), poll_interval=0.01) as snapshot:
+        add_recipe(db, 2, "smoothie")
+        deadline = time.monotonic() + 5
+        while snapshot.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert recipe_names(snapshot.current()) == ["pancakes", "smoothie"]
+
+
+def test_snapshot_needs_file():
+    with pytest.raises(SnapshotError):
+        SnapshotReader(":memory:")
+
+
+def test_server_answers_from_current_snapshot(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"))
+    server = ProposalServer(snapshot.current(), IngredientIndex(snapshot.current()), ProposalCache(), snapshot)
+    request = '{"ingredients": "strawberry", "meals": "breakfast"}'
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes"]}
+    add_recipe(db, 2, "smoothie")
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes"]}
+    snapshot.refresh()
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes", "smoothie"]}
+    assert json.loads(server.answer('{"ingredients": "strawberry", "meals": "breakfast", "top": 5}')) == \
+        {"ranked": [{"name": "pancakes", "matched": 1, "required": 1},
+                    {"name": "smoothie", "matched": 1, "required": 1}]}
+    snapshot.close()
+
+
+def test_reloader_builds_index_with_snapshot(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"), derive=IngredientIndex)
+    server = ProposalServer(*snapshot.view(), ProposalCache(), snapshot)
+    request = '{"ingredients": "strawberry", "meals": "breakfast"}'
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes"]}
+    add_recipe(db, 2, "smoothie")
+    snapshot.refresh()
+    connection, index = snapshot.view()
+    assert index.db is connection
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes", "smoothie"]}
+    # The request thread took the index built on reload instead of scanning the tables again.
+    assert server.index is index
+    assert server.db is connection
+    snapshot.close()
+
+
+def test_cached_answers_follow_snapshot(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"))
+    server = ProposalServer(snapshot.current(), None, ProposalCache(), snapshot)
+    request = '{"ingredients": "strawberry", "meals": "breakfast"}'
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes"]}
+    add_recipe(db, 2, "smoothie")
+    snapshot.refresh()
+    assert json.loads(server.answer(request)) == {"recipes": ["pancakes", "smoothie"]}
+    assert server.cache.misses == 2
+    snapshot.close()
+
+
+def test_replaced_snapshots_are_freed(tmp_path, make_db):
+    db = make_db(str(tmp_path / "blog.db"))
+    snapshot = SnapshotReader(str(tmp_path / "blog.db"))
+    server = ProposalServer(snapshot.current(), None, ProposalCache(), snapshot)
+    first = weakref.ref(snapshot.current())
+    for recipe_id in range(2, 22):
+        add_recipe(db, recipe_id, f"smoothie {recipe_id}")
+        snapshot.refresh()
+        server.answer('{"ingredients": "strawberry", "meals": "breakfast"}')
+        RecipeSignatures.for_connection(snapshot.current())
+    gc.collect()
+    assert first() is None
+    # Only the connections still open hold per-connection caches.
+    assert len(lookup_cache._caches) <= 3
+    assert len(recipe_signatures._signatures) <= 3
+    snapshot.close()
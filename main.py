@@ -1,22 +1,232 @@
 import argparse
-from food_blog.db_handler import Data
-from food_blog.blog import DBConnection, UserInputCollector, \
-    UserInputChecker, QuantityTableData, RecipesDBStore, OptionalArguments
-from food_blog.custom_errors import MealNumberError, QuantityError, UserIngredientError, UserMealError, NoIngredientsError, \
-    NoMealsError
+import os
+import signal
+import sys
+import time
+
+# The food_blog modules import each other by module name, the same way the tests do.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "food_blog"))
+
+from db_handler import Data, PROFILES
+from blog import DBConnection, UserInputCollector, \
+    UserInputChecker, OptionalArguments, RecipeUnitOfWork
+from bulk_import import RecipeImporter, ParallelRecipeImporter
+from batch_matcher import BitsetMatcher
+from exporter import RecipeExporter
+from ingredient_index import IngredientIndex, QuantityScanRanker
+from query_server import ProposalServer
+from proposal_cache import ProposalCache
+from recipe_search import RecipeSearch
+from lookup_cache import LookupCache
+from recipe_signatures import RecipeSignatures
+from snapshot import SnapshotReader
+from sharding import ShardedCatalogue, ShardedRecipeImporter
+from ingredient_aliases import IngredientAliases
+import instrumentation
+from custom_errors import MealNumberError, QuantityError, UserIngredientError, UserMealError, NoIngredientsError, \
+    NoMealsError, ImportFormatError, UnknownMealError, MeasureError, ServerRequestError, PaginationError, \
+    SearchError, SearchUnavailableError, SnapshotError, ShardError, AliasError, BatchSizeError, \
+    ExportFormatError
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("db")
     parser.add_argument("-i1", "--ingredients", help="Provide ingredients separated by a comma.")
     parser.add_argument("-m1", "--meals", help="Provide meals separated by a comma.")
+    parser.add_argument("--top", type=int,
+                        help="With --ingredients/--meals, rank partial matches and show the best TOP recipes.")
+    parser.add_argument("--limit", type=int, help="With --ingredients/--meals, show at most this many recipes.")
+    parser.add_argument("--offset", type=int, default=0, help="With --ingredients/--meals, skip this many recipes.")
+    parser.add_argument("--after-id", type=int,
+                        help="With --ingredients/--meals, only show recipes with a greater recipe_id (next page).")
+    parser.add_argument("--search", help="Find recipes whose name or description contains these words "
+                                             "(best match first; --meals and --limit apply).")
+    parser.add_argument("--pantry", help="List recipes that need only these comma-separated ingredients "
+                                             "(optionally served at one of --meals).")
+    parser.add_argument("--rebuild-signatures", action="store_true",
+                        help="Recompute the per-recipe ingredient and meal signatures used by --pantry.")
+    parser.add_argument("--alias", nargs=2, metavar=("ALIAS", "INGREDIENT"),
+                        help="Let ALIAS stand for INGREDIENT in queries and ingredient lines, "
+                             "e.g. --alias \"whole milk\" milk.")
+    parser.add_argument("--import", dest="import_file", help="Bulk import recipes from a .jsonl or .csv file.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Recipes per transaction during --import.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="With --import, parse and validate in this many processes while one process writes.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default",
+                        help="Connection tuning profile (PRAGMA settings).")
+    parser.add_argument("--export", help="Stream all recipes to a .jsonl or .csv file (optionally .gz).")
+    parser.add_argument("--compress", action="store_true", help="With --export, gzip the output.")
+    parser.add_argument("--resume-after", type=int, default=0,
+                        help="With --export, only export recipes with a greater recipe_id.")
+    parser.add_argument("--batch-in", help="Match every JSONL query in this file against the catalogue at once.")
+    parser.add_argument("--batch-out", help="With --batch-in, write one JSONL result per query here.")
+    parser.add_argument("--serve", action="store_true",
+                        help="Answer JSON proposal requests line by line from stdin until EOF.")
+    parser.add_argument("--socket", help="With --serve, listen on this Unix socket instead of stdin.")
+    parser.add_argument("--index", action="store_true",
+                        help="With --serve, answer from an in-memory ingredient index.")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="With --serve, answer from an in-memory copy that is reloaded when the file changes.")
+    parser.add_argument("--snapshot-interval", type=float, default=1.0,
+                        help="With --snapshot, seconds between checks of the database file for changes.")
+    parser.add_argument("--cache-size", type=int, default=1024,
+                        help="With --serve, number of proposal results kept in the LRU cache (0 disables it).")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Treat db as the JSON manifest of a catalogue split over several database files.")
+    parser.add_argument("--shard-count", type=int, default=4,
+                        help="With --sharded, number of shard files to create when the manifest does not exist.")
+    parser.add_argument("--rebalance", type=int, help="With --sharded, move all recipes into this many new shards.")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Time the database calls and print a report at exit (or on SIGUSR1) to stderr.")
+    parser.add_argument("--instrument-json", help="With --instrument, also write the report as JSON here.")
     args = parser.parse_args()
 
-    db = DBConnection(args.db)
+    if args.limit == 0:
+        # An empty page would be reported as "There are no such recipes in the database."
+        print("Provide a --limit of at least 1.")
+        exit()
+
+    if args.instrument:
+        instrumentation.enable(args.instrument_json, getattr(signal, "SIGUSR1", None))
+
+    if args.sharded:
+        try:
+            if os.path.exists(args.db):
+                catalogue = ShardedCatalogue(args.db, args.profile)
+            else:
+                catalogue = ShardedCatalogue.create(args.db, args.shard_count, args.profile)
+            if args.rebalance is not None:
+                moved = catalogue.rebalance(args.rebalance)
+                print(f"Moved {moved} recipes into {catalogue.shard_count} shards.")
+            elif args.import_file is not None:
+                try:
+                    print(ShardedRecipeImporter(catalogue, args.batch_size).import_file(args.import_file))
+                except OSError as e:
+                    print(f"Cannot read {args.import_file}: {e.strerror or e}.")
+            elif args.ingredients is not None and args.meals is not None:
+                optional_args = OptionalArguments(catalogue.shards[0], args)
+                optional_args.check_user_ingredients()
+                optional_args.check_user_meals()
+                found = catalogue.propose_recipes(optional_args.resolved_ingredients(), args.meals.split(','),
+                                                  args.limit, args.offset, args.after_id)
+                shown = optional_args.inform_user(name for _, name in found)
+                if args.limit and shown == args.limit:
+                    print(f"More recipes may follow; continue with --after-id {found[-1][0]}.")
+            else:
+                print("With --sharded, use --import, --ingredients with --meals, or --rebalance.")
+        except (ShardError, ImportFormatError, UnknownMealError, MeasureError, QuantityError, UserIngredientError,
+                UserMealError, PaginationError, BatchSizeError) as e:
+            print(e)
+        exit()
+
+    db = DBConnection(args.db, args.profile)
     db.turn_on_foreign_keys()
     data = Data(db)
-    data.create_tables()
-    data.seed_tables()
+    data.migrate()
+
+    if args.import_file is not None:
+        try:
+            if args.workers > 1:
+                importer = ParallelRecipeImporter(db, args.batch_size, args.workers)
+            else:
+                importer = RecipeImporter(db, args.batch_size)
+            stats = importer.import_file(args.import_file)
+        except (ImportFormatError, UnknownMealError, MeasureError, QuantityError, BatchSizeError) as e:
+            print(e)
+            exit()
+        except OSError as e:
+            print(f"Cannot read {args.import_file}: {e.strerror or e}.")
+            exit()
+        print(stats)
+        exit()
+
+    if args.export is not None:
+        try:
+            path, count = RecipeExporter(db).export(args.export, compress=args.compress, after_id=args.resume_after)
+        except ExportFormatError as e:
+            print(e)
+            exit()
+        print(f"Exported {count} recipes to {path}.")
+        exit()
+
+    if args.batch_in is not None:
+        if args.batch_out is None:
+            print("Provide --batch-out for the results.")
+            exit()
+        try:
+            start = time.perf_counter()
+            matched = BitsetMatcher(db).match_file(args.batch_in, args.batch_out)
+        except ServerRequestError as e:
+            print(e)
+            exit()
+        except OSError as e:
+            # Either the query file could not be read or the result file could not be written.
+            print(f"Cannot open {e.filename or args.batch_in}: {e.strerror or e}.")
+            exit()
+        seconds = time.perf_counter() - start
+        print(f"Matched {matched} queries in {seconds:.2f}s, {matched / max(seconds, 1e-9):.0f} queries/s.")
+        exit()
+
+    if args.serve:
+        snapshot = None
+        index = None
+        if args.snapshot:
+            try:
+                # With --index the reloader builds each snapshot's index before swapping it in.
+                snapshot = SnapshotReader(args.db, args.snapshot_interval,
+                                          IngredientIndex if args.index else None).start()
+            except SnapshotError as e:
+                print(e)
+                exit()
+            db, index = snapshot.view()
+        elif args.index:
+            index = IngredientIndex(db)
+        server = ProposalServer(db, index, ProposalCache(args.cache_size) if args.cache_size > 0 else None, snapshot)
+        if args.socket is not None:
+            server.serve_socket(args.socket)
+        else:
+            server.serve_stream(sys.stdin, sys.stdout)
+        exit()
+
+    if args.alias is not None:
+        try:
+            IngredientAliases(db).add(*args.alias)
+        except AliasError as e:
+            print(e)
+            exit()
+        print(f'"{args.alias[0]}" now stands for {LookupCache.for_connection(db).resolve_ingredient(args.alias[0])}.')
+        exit()
+
+    if args.rebuild_signatures:
+        count = RecipeSignatures(db).rebuild()
+        db.conn.commit()
+        print(f"Rebuilt signatures for {count} recipes.")
+        exit()
+
+    if args.pantry is not None:
+        optional_args = OptionalArguments(db, args)
+        try:
+            if args.meals is not None:
+                optional_args.check_user_meals()
+            optional_args.propose_cookable(RecipeSignatures.for_connection(db))
+        except (UserMealError, UnknownMealError) as e:
+            print(e)
+            exit()
+        optional_args.inform_user()
+        exit()
+
+    if args.search is not None:
+        optional_args = OptionalArguments(db, args)
+        try:
+            if args.meals is not None:
+                optional_args.check_user_meals()
+            found = RecipeSearch(db).search(args.search, args.meals.split(',') if args.meals else None,
+                                            20 if args.limit is None else args.limit)
+        except (UserMealError, SearchError, SearchUnavailableError, PaginationError) as e:
+            print(e)
+            exit()
+        optional_args.inform_user(name for _, name, _ in found)
+        exit()
 
     try:
         optional_args = OptionalArguments(db, args)
@@ -39,15 +249,25 @@ if __name__ == '__main__':
         except UserMealError as e:
             print(e)
             exit()
-        optional_args.propose_recipes()
-        optional_args.inform_user()
+        if args.top is not None:
+            # One query: seek the posting rows in SQL instead of loading the whole index.
+            optional_args.rank_recipes(QuantityScanRanker(db), args.top)
+            optional_args.inform_user()
+            exit()
+        # Names are printed as rows arrive instead of being collected first.
+        try:
+            shown = optional_args.inform_user(
+                name for _, name in optional_args.stream_recipes(args.limit, args.offset, args.after_id))
+        except PaginationError as e:
+            print(e)
+            exit()
+        if args.limit and shown == args.limit and optional_args.last_recipe_id is not None:
+            print(f"More recipes may follow; continue with --after-id {optional_args.last_recipe_id}.")
         exit()
 
     UserInputCollector.print_initial_instruction()
     while True:
         user_input = UserInputCollector()
-        recipes_db_store = RecipesDBStore(db)
-        quality_table_data = QuantityTableData(db)
 
         recipe_obj = user_input.gather_recipes()
         try:
@@ -55,13 +275,13 @@ if __name__ == '__main__':
         except MealNumberError as e:
             print(e)
             continue
-        recipe_id = recipes_db_store.create_recipe(recipe_obj)
-        recipes_db_store.create_serve(serve_obj.meal_ids, recipe_id)
 
-        input_checker = UserInputChecker(db, recipe_id)
+        # Nothing is written until all ingredient lines are in; then one transaction stores the whole recipe.
         try:
-            input_checker.execute_checks()
+            with RecipeUnitOfWork(db) as unit_of_work:
+                unit_of_work.add_recipe(recipe_obj)
+                unit_of_work.add_serve(serve_obj.meal_ids)
+                UserInputChecker(db, None, unit_of_work).execute_checks()
         except QuantityError as e:
             print(e)
             continue
-